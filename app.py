@@ -1,30 +1,192 @@
 import os
+import uuid
 import shutil
+import json
+import time
+import socket
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
 # Ensure dotenv is loaded
 load_dotenv()
 
-from extractor import extract_highlights, ocr_full_pdf
+from extractor import extract_highlights, ocr_full_pdf, highlight_stream_path, read_highlight_stream, hash_file, configure_ocr_cache, get_ocr_cache, configure_mistral_rate_limiter
+from job_store import create_job_store
 
-# Global thread-safe progress store for active tasks
-PROGRESS_STORE = {}
-PROGRESS_LOCK = threading.Lock()
+# Job state, progress, timing and results of every task, shared by all app processes ("sqlite") or per process ("memory");
+# created by create_app()
+JOB_STORE = None
+ACTIVE_JOB_STATUSES = ("queued", "waiting", "running")
+
+# Notified whenever a task's progress or job status changes in this process; wakes the SSE streams.
+# Streams also re-read the store every second to pick up updates written by other processes.
+PROGRESS_CHANGED = threading.Condition()
+
+# Jobs are owned by the process that runs them, which touches them every JOB_HEARTBEAT_SECONDS. Active jobs without
+# a heartbeat for JOB_ORPHAN_TIMEOUT seconds (their process died or was restarted) are failed by any live process,
+# so they stop counting towards JOB_QUEUE_MAX and their clients get an error instead of waiting forever.
+JOB_OWNER = None
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+JOB_ORPHAN_TIMEOUT = float(os.getenv("JOB_ORPHAN_TIMEOUT", "60"))
+
+def run_job_heartbeat():
+    while True:
+        try:
+            JOB_STORE.heartbeat(JOB_OWNER, ACTIVE_JOB_STATUSES)
+            if JOB_STORE.fail_orphaned(JOB_ORPHAN_TIMEOUT, ACTIVE_JOB_STATUSES):
+                with PROGRESS_CHANGED:
+                    PROGRESS_CHANGED.notify_all()
+        except Exception as e:
+            app.logger.error(f"Job heartbeat failed: {e}")
+        time.sleep(JOB_HEARTBEAT_SECONDS)
+
+# Seconds a progress stream waits for an unknown task to appear before ending
+PROGRESS_STREAM_GRACE = float(os.getenv("PROGRESS_STREAM_GRACE", "5"))
+
+# Start of every phase of every task run by this process: {phase: (started_at, current at start)}, for throughput and ETA
+PHASE_STARTS = {}
 
 app = Flask(__name__, static_folder="static", template_folder="templates")
 
 # Configure upload folder
 UPLOAD_FOLDER = Path("./uploads")
-UPLOAD_FOLDER.mkdir(exist_ok=True)
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
 # Configure highlights output folder
 HIGHLIGHTS_FOLDER = Path("./highlights")
-HIGHLIGHTS_FOLDER.mkdir(exist_ok=True)
+
+# Number of worker processes used to parse (and full-OCR) the pages of each upload (1 = serial)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", "1"))
+
+# Batch size for EasyOCR inference on highlight crops and full pages (0 = one image at a time)
+EASYOCR_BATCH_SIZE = int(os.getenv("EASYOCR_BATCH_SIZE", "0"))
+
+# Content-addressed cache of whole-document results (empty RESULT_CACHE_DIR disables it)
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "./cache").strip() or None
+RESULT_CACHE_MAX_BYTES = int(float(os.getenv("RESULT_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+
+# Page-level checkpoints of running extractions, so a restarted job resumes where it stopped (empty disables them)
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", "./cache/checkpoints").strip() or None
+
+# How compiled_highlights.pdf is built for Mistral OCR: "raster" crops or "vector" clips of the source pages
+COMPILED_PDF_MODE = os.getenv("COMPILED_PDF_MODE", "raster").strip().lower()
+
+# Run olmOCR/Mistral OCR on batches of crops while the remaining pages are still being parsed
+PIPELINE_OCR = os.getenv("PIPELINE_OCR", "false").strip().lower() in ("1", "true", "yes")
+PIPELINE_BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", "16"))
+
+# Per-crop OCR cache shared by all engines (empty OCR_CACHE_PATH disables it)
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "./cache/ocr_cache.sqlite").strip() or None
+
+# Mistral's pages-per-minute budget, shared by every app process through this file (empty keeps it per process)
+MISTRAL_RATE_LIMIT_STATE = os.getenv("MISTRAL_RATE_LIMIT_STATE", "./cache/mistral_rate.sqlite").strip() or None
+MISTRAL_RATE_LIMITER = None
+
+# Extraction jobs run in the background; submissions beyond JOB_QUEUE_MAX pending jobs are rejected
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "20"))
+
+# Every OCR engine has its own bounded job pool, so a backlog on one engine never holds up the jobs of another.
+# Concurrent EasyOCR jobs feed the shared micro-batching service; "auto" runs on EasyOCR, "native" on the JOB_WORKERS pool.
+ENGINE_WORKERS = {
+    "native": int(os.getenv("JOB_WORKERS", "2")),
+    "easyocr": int(os.getenv("EASYOCR_CONCURRENCY", "4")),
+    "olmocr": int(os.getenv("OLMOCR_CONCURRENCY", "2")),
+    "mistralocr": int(os.getenv("MISTRAL_CONCURRENCY", "4"))
+}
+ENGINE_THREAD_PREFIXES = {"native": "extract-job", "easyocr": "extract-easyocr", "olmocr": "extract-olmocr", "mistralocr": "extract-mistral"}
+ENGINE_EXECUTORS = {}
+ENGINE_EXECUTOR_KEYS = {"auto": "easyocr", "easyocr": "easyocr", "olmocr": "olmocr", "mistralocr": "mistralocr"}
+
+# Jobs waiting for their document (content hash) to be free, by document. Every app process sharing JOB_STORE holds a
+# document through a claim in the store, so one job at a time writes its upload and output directories. A job is
+# handed to its engine's pool only once its document is claimed, so waiting never takes a pool slot; identical
+# requests after the first are then served from the result cache. Documents claimed by another process are
+# polled every DOC_CLAIM_POLL_SECONDS.
+DOC_QUEUES = {}
+DOC_CLAIMED = set()
+DOC_QUEUES_GUARD = threading.Lock()
+DOC_CLAIM_POLL_SECONDS = float(os.getenv("DOC_CLAIM_POLL_SECONDS", "1"))
+
+def dispatch_document(doc_key: str) -> bool:
+    """Claims doc_key and hands its next waiting job to the engine's pool; called with DOC_QUEUES_GUARD held."""
+    queue = DOC_QUEUES.get(doc_key)
+    if not queue or doc_key in DOC_CLAIMED:
+        return False
+    try:
+        if not JOB_STORE.claim(doc_key, JOB_OWNER, JOB_ORPHAN_TIMEOUT):
+            return False
+    except Exception as e:
+        app.logger.error(f"Failed to claim document {doc_key}: {e}")
+        return False
+    DOC_CLAIMED.add(doc_key)
+    executor, *job = queue.pop(0)
+    executor.submit(run_document_job, *job)
+    return True
+
+def submit_job(job_id: str, doc_key: str, *args, **kwargs):
+    """Runs run_extraction_job on its OCR engine's pool now, or after the jobs already queued on the same document."""
+    executor = ENGINE_EXECUTORS[ENGINE_EXECUTOR_KEYS.get(kwargs["ocr_engine"], "native")]
+    with DOC_QUEUES_GUARD:
+        DOC_QUEUES.setdefault(doc_key, []).append((executor, job_id, doc_key, args, kwargs))
+        if not dispatch_document(doc_key):
+            set_job(job_id, status="waiting")
+
+def run_document_job(job_id: str, doc_key: str, args: tuple, kwargs: dict):
+    """Runs one job, then hands the next job waiting on the same document to its engine's pool."""
+    try:
+        run_extraction_job(job_id, *args, **kwargs)
+    finally:
+        with DOC_QUEUES_GUARD:
+            DOC_CLAIMED.discard(doc_key)
+            if not DOC_QUEUES[doc_key]:
+                del DOC_QUEUES[doc_key]
+                try:
+                    JOB_STORE.release(doc_key, JOB_OWNER)
+                except Exception as e:
+                    app.logger.error(f"Failed to release document {doc_key}: {e}")
+            else:
+                dispatch_document(doc_key)
+
+def run_document_waiter():
+    """Dispatches jobs whose document is held by another process once that process releases it."""
+    while True:
+        with DOC_QUEUES_GUARD:
+            for doc_key in [k for k, queue in DOC_QUEUES.items() if queue and k not in DOC_CLAIMED]:
+                dispatch_document(doc_key)
+        time.sleep(DOC_CLAIM_POLL_SECONDS)
+
+APP_INIT_LOCK = threading.Lock()
+
+def create_app() -> Flask:
+    """
+    Creates the folders, job store, OCR cache, Mistral rate limiter and engine pools, and starts the background
+    threads; once per process, and returns the app. Nothing of this runs at import time: page-parsing workers are
+    spawned processes, which re-import this module as __mp_main__ when it is started with `python3 app.py`.
+    WSGI servers load the app through the factory, e.g. gunicorn "app:create_app()".
+    """
+    global JOB_STORE, JOB_OWNER, MISTRAL_RATE_LIMITER
+    with APP_INIT_LOCK:
+        if JOB_STORE is not None:
+            return app
+        UPLOAD_FOLDER.mkdir(exist_ok=True)
+        HIGHLIGHTS_FOLDER.mkdir(exist_ok=True)
+        configure_ocr_cache(OCR_CACHE_PATH)
+        MISTRAL_RATE_LIMITER = configure_mistral_rate_limiter(MISTRAL_RATE_LIMIT_STATE)
+        for engine, workers in ENGINE_WORKERS.items():
+            ENGINE_EXECUTORS[engine] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=ENGINE_THREAD_PREFIXES[engine])
+        JOB_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+        JOB_STORE = create_job_store(
+            os.getenv("JOB_STORE", "sqlite").strip().lower(),
+            os.getenv("JOB_STORE_PATH", "./cache/jobs.sqlite"),
+            ttl=float(os.getenv("JOB_TTL_SECONDS", str(24 * 3600)))
+        )
+        threading.Thread(target=run_job_heartbeat, name="job-heartbeat", daemon=True).start()
+        threading.Thread(target=run_document_waiter, name="document-waiter", daemon=True).start()
+    return app
 
 @app.route("/")
 def index():
@@ -35,10 +197,85 @@ def get_progress():
     task_id = request.args.get("task_id")
     if not task_id:
         return jsonify({"error": "Missing task_id"}), 400
-    with PROGRESS_LOCK:
-        progress = PROGRESS_STORE.get(task_id, {"current": 0, "total": 0})
+    progress = JOB_STORE.get_progress(task_id) or {"current": 0, "total": 0}
     return jsonify(progress)
 
+@app.route("/api/progress/stream", methods=["GET"])
+def stream_progress():
+    """
+    Server-Sent Events: pushes the task's progress whenever it changes, then an "end" event.
+    Unknown or expired tasks get an "end" event with status "unknown" after PROGRESS_STREAM_GRACE seconds.
+    """
+    task_id = request.args.get("task_id")
+    if not task_id:
+        return jsonify({"error": "Missing task_id"}), 400
+
+    def events():
+        last_seq = -1
+        last_sent = time.time()
+        missing_since = None
+        while True:
+            job = JOB_STORE.get(task_id)
+            if job is None:
+                missing_since = missing_since or time.time()
+                if time.time() - missing_since >= PROGRESS_STREAM_GRACE:
+                    yield f"event: end\ndata: {json.dumps({'status': 'unknown'})}\n\n"
+                    return
+                job = {}
+            else:
+                missing_since = None
+            progress = job.get("progress") or {"current": 0, "total": 0}
+            status = job.get("status")
+            seq = progress.get("seq", 0)
+            if seq != last_seq:
+                last_seq = seq
+                last_sent = time.time()
+                yield f"data: {json.dumps(progress)}\n\n"
+            elif time.time() - last_sent >= 15:
+                last_sent = time.time()
+                yield ": keepalive\n\n"
+            if status in ("done", "failed"):
+                yield f"event: end\ndata: {json.dumps({'status': status})}\n\n"
+                return
+            with PROGRESS_CHANGED:
+                PROGRESS_CHANGED.wait(timeout=1)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/api/ocr-cache/stats", methods=["GET"])
+def get_ocr_cache_stats():
+    cache = get_ocr_cache()
+    if not cache:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **cache.stats()})
+
+@app.route("/api/rate-limit/stats", methods=["GET"])
+def get_rate_limit_stats():
+    return jsonify(MISTRAL_RATE_LIMITER.stats())
+
+@app.route("/api/highlights/partial", methods=["GET"])
+def get_partial_highlights():
+    task_id = request.args.get("task_id")
+    if not task_id:
+        return jsonify({"error": "Missing task_id"}), 400
+    try:
+        offset = int(request.args.get("offset", "0"))
+    except ValueError:
+        return jsonify({"error": "Invalid offset"}), 400
+    stream_path = (JOB_STORE.get(task_id) or {}).get("stream_path")
+    if not stream_path:
+        return jsonify({"highlights": [], "updates": [], "offset": offset})
+    entries, new_offset = read_highlight_stream(stream_path, offset)
+    return jsonify({
+        "highlights": [e for e in entries if "_update" not in e],
+        "updates": [e for e in entries if "_update" in e],
+        "offset": new_offset
+    })
+
 @app.route("/api/extract", methods=["POST"])
 def extract():
     if "pdf" not in request.files:
@@ -73,36 +310,114 @@ def extract():
     except ValueError:
         return jsonify({"error": "Invalid numeric arguments"}), 400
         
+    JOB_STORE.fail_orphaned(JOB_ORPHAN_TIMEOUT, ACTIVE_JOB_STATUSES)
+    if JOB_STORE.count(ACTIVE_JOB_STATUSES) >= JOB_QUEUE_MAX:
+        return jsonify({"error": "Too many extraction jobs are pending, please try again later"}), 503
+        
     # Save the file securely
     filename = secure_filename(pdf_file.filename)
-    if not filename or filename.endswith(".pdf") is False:
+    if not filename or not filename.lower().endswith(".pdf"):
         filename = "temp_uploaded_file.pdf"
         
-    pdf_path = UPLOAD_FOLDER / filename
-    pdf_file.save(pdf_path)
+    # Uploads and their outputs are stored by content hash, so files that merely share a name never touch each
+    # other's crops or JSON. Jobs on the same content share both directories and take turns (see submit_job);
+    # identical requests after the first are served from the result cache
+    tmp_path = UPLOAD_FOLDER / f".upload_{uuid.uuid4().hex}.pdf"
+    pdf_file.save(tmp_path)
+    doc_key = hash_file(tmp_path)[:16]
+    upload_dir = UPLOAD_FOLDER / doc_key
+    pdf_path = upload_dir / filename
+    output_dir = HIGHLIGHTS_FOLDER / doc_key
     
-    # Initialize progress store entry
-    if task_id:
-        with PROGRESS_LOCK:
-            if len(PROGRESS_STORE) > 100:
-                oldest_keys = list(PROGRESS_STORE.keys())[:50]
-                for k in oldest_keys:
-                    PROGRESS_STORE.pop(k, None)
-            PROGRESS_STORE[task_id] = {"current": 0, "total": 0}
- 
+    # Every upload becomes a job; the client's task_id doubles as the job id so progress and partial results line up
+    job_id = task_id or uuid.uuid4().hex
+    if (JOB_STORE.get(job_id) or {}).get("status") in ACTIVE_JOB_STATUSES:
+        tmp_path.unlink()
+        return jsonify({"error": "A job with this task_id is already running"}), 409
+    JOB_STORE.evict_expired()
+    
+    output_json_path = output_dir / f"{pdf_path.stem}_highlights.json"
+    JOB_STORE.create(
+        job_id,
+        status="queued",
+        owner=JOB_OWNER,
+        progress={"current": 0, "total": 0},
+        stream_path=str(highlight_stream_path(output_json_path))
+    )
+    with PROGRESS_CHANGED:
+        PHASE_STARTS.pop(job_id, None)
+    
+    submit_job(
+        job_id,
+        doc_key,
+        tmp_path,
+        pdf_path,
+        upload_dir,
+        output_dir,
+        output_json_path,
+        full_ocr=full_ocr,
+        merge_threshold=merge_threshold,
+        context=context,
+        context_margin=context_margin,
+        olmocr_server=olmocr_server,
+        olmocr_api_key=olmocr_api_key,
+        olmocr_model=olmocr_model,
+        ocr_engine=ocr_engine,
+        mistral_api_key=mistral_api_key
+    )
+    return jsonify({"success": True, "job_id": job_id, "status": "queued"}), 202
+
+def set_job(job_id: str, **fields):
+    with PROGRESS_CHANGED:
+        JOB_STORE.update(job_id, **fields)
+        PROGRESS_CHANGED.notify_all()
+
+def update_progress(task_id: str, current, total, phase="parsing", percent=None):
+    """
+    Records a progress report with per-phase throughput and ETA; unchanged reports are dropped.
+    The top-level fields hold the latest report, and "phases" the latest report of every phase,
+    since phases overlap when remote OCR is pipelined with parsing.
+    """
+    now = time.time()
+    with PROGRESS_CHANGED:
+        previous = JOB_STORE.get_progress(task_id) or {}
+        phases = previous.get("phases") or {}
+        last = phases.get(phase) or {}
+        if (last.get("current"), last.get("total"), last.get("percent")) == (current, total, percent):
+            return
+        start = PHASE_STARTS.setdefault(task_id, {}).setdefault(phase, (now, current))
+        
+        # Units (pages, crops or chunks) per second since the phase started, and the time left at that rate
+        rate = None
+        eta_seconds = None
+        elapsed = now - start[0]
+        if elapsed > 0 and current > start[1]:
+            rate = (current - start[1]) / elapsed
+            eta_seconds = round(max(0, total - current) / rate, 1)
+            rate = round(rate, 3)
+        
+        report = {"current": current, "total": total, "percent": percent, "rate": rate, "eta_seconds": eta_seconds}
+        JOB_STORE.set_progress(task_id, {
+            **report,
+            "phase": phase,
+            "phases": {**phases, phase: report},
+            "seq": previous.get("seq", 0) + 1
+        })
+        PROGRESS_CHANGED.notify_all()
+
+def run_extraction_job(job_id, tmp_path, pdf_path, upload_dir, output_dir, output_json_path, full_ocr,
+                       merge_threshold, context, context_margin, olmocr_server, olmocr_api_key,
+                       olmocr_model, ocr_engine, mistral_api_key):
+    """Runs one extraction job; called on its OCR engine's pool once no other job uses its document's directories."""
     def progress_cb(current, total, phase="parsing", percent=None):
-        if task_id:
-            with PROGRESS_LOCK:
-                PROGRESS_STORE[task_id] = {
-                    "current": current,
-                    "total": total,
-                    "phase": phase,
-                    "percent": percent
-                }
- 
-    output_json_path = HIGHLIGHTS_FOLDER / f"{pdf_path.stem}_highlights.json"
+        update_progress(job_id, current, total, phase, percent)
     
+    set_job(job_id, status="running", started_at=time.time())
     try:
+        upload_dir.mkdir(exist_ok=True)
+        output_dir.mkdir(exist_ok=True)
+        os.replace(tmp_path, pdf_path)
+        
         # Perform extraction
         highlights = []
         if not full_ocr:
@@ -110,7 +425,7 @@ def extract():
                 pdf_path=str(pdf_path),
                 merge_threshold=merge_threshold,
                 save_images=True,
-                save_dir=str(HIGHLIGHTS_FOLDER),
+                save_dir=str(output_dir),
                 context=context,
                 context_margin=context_margin,
                 progress_callback=progress_cb,
@@ -120,37 +435,48 @@ def extract():
                 olmocr_api_key=olmocr_api_key,
                 olmocr_model=olmocr_model,
                 ocr_engine=ocr_engine,
-                mistral_api_key=mistral_api_key
+                mistral_api_key=mistral_api_key,
+                workers=EXTRACT_WORKERS,
+                ocr_batch_size=EASYOCR_BATCH_SIZE,
+                cache_dir=RESULT_CACHE_DIR,
+                cache_max_bytes=RESULT_CACHE_MAX_BYTES,
+                compiled_pdf_mode=COMPILED_PDF_MODE,
+                checkpoint_dir=CHECKPOINT_DIR,
+                pipeline_ocr=PIPELINE_OCR,
+                pipeline_batch_size=PIPELINE_BATCH_SIZE
             )
         
         # Run full OCR if requested, before deleting the uploaded PDF
         full_ocr_txt_path = None
         if full_ocr:
-            full_ocr_text = ocr_full_pdf(
+            # Pages are streamed to the collated text file in order as they complete
+            full_ocr_file = output_dir / f"{pdf_path.stem}_full_ocr.txt"
+            ocr_full_pdf(
                 pdf_path=str(pdf_path),
                 ocr_engine=ocr_engine,
                 olmocr_server=olmocr_server,
                 olmocr_api_key=olmocr_api_key,
                 olmocr_model=olmocr_model,
                 mistral_api_key=mistral_api_key,
-                progress_callback=progress_cb
+                progress_callback=progress_cb,
+                ocr_batch_size=EASYOCR_BATCH_SIZE,
+                cache_dir=RESULT_CACHE_DIR,
+                cache_max_bytes=RESULT_CACHE_MAX_BYTES,
+                workers=EXTRACT_WORKERS,
+                output_path=str(full_ocr_file)
             )
-            # Save collated text file
-            full_ocr_file = HIGHLIGHTS_FOLDER / f"{pdf_path.stem}_full_ocr.txt"
-            with open(full_ocr_file, "w", encoding="utf-8") as f:
-                f.write(full_ocr_text)
-            full_ocr_txt_path = f"highlights/{pdf_path.stem}_full_ocr.txt"
+            full_ocr_txt_path = f"highlights/{output_dir.name}/{pdf_path.stem}_full_ocr.txt"
 
         # Clean up the uploaded PDF file to conserve space
         if pdf_path.exists():
             pdf_path.unlink()
             
         compiled_pdf_path = None
-        compiled_pdf = HIGHLIGHTS_FOLDER / pdf_path.stem / "compiled_highlights.pdf"
+        compiled_pdf = output_dir / pdf_path.stem / "compiled_highlights.pdf"
         if compiled_pdf.exists():
-            compiled_pdf_path = f"highlights/{pdf_path.stem}/compiled_highlights.pdf"
+            compiled_pdf_path = f"highlights/{output_dir.name}/{pdf_path.stem}/compiled_highlights.pdf"
             
-        return jsonify({
+        set_job(job_id, status="done", finished_at=time.time(), result={
             "success": True, 
             "highlights": highlights,
             "compiled_pdf_path": compiled_pdf_path,
@@ -158,13 +484,42 @@ def extract():
         })
         
     except Exception as e:
+        app.logger.error(f"Extraction job {job_id} failed: {e}")
         if pdf_path.exists():
             pdf_path.unlink()
-        return jsonify({"error": f"Extraction failed: {str(e)}"}), 500
+        if tmp_path.exists():
+            tmp_path.unlink()
+        set_job(job_id, status="failed", finished_at=time.time(), error=f"Extraction failed: {str(e)}")
+    finally:
+        try:
+            upload_dir.rmdir()
+        except OSError:
+            pass
+        with PROGRESS_CHANGED:
+            PHASE_STARTS.pop(job_id, None)
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job_status(job_id):
+    job = JOB_STORE.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    status = {k: v for k, v in job.items() if k not in ("result", "stream_path")}
+    return jsonify({**status, "job_id": job_id, "progress": job.get("progress") or {"current": 0, "total": 0}})
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    job = JOB_STORE.get(job_id)
+    if not job:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["status"] == "failed":
+        return jsonify({"error": job.get("error", "Extraction failed")}), 500
+    if job["status"] != "done":
+        return jsonify({"job_id": job_id, "status": job["status"]}), 202
+    return jsonify(job["result"])
 
 @app.route("/highlights/<path:filename>")
 def serve_highlight_image(filename):
     return send_from_directory(HIGHLIGHTS_FOLDER, filename)
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    create_app().run(host="0.0.0.0", port=5000, debug=True)
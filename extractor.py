@@ -1,9 +1,8 @@
 import os
-import sys
 import json
 import shutil
+import itertools
 import logging
-import subprocess
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -20,53 +19,367 @@ logger = logging.getLogger(__name__)
 _EASYOCR_READER = None
 
 class TokenBucketRateLimiter:
-    def __init__(self, limit_per_minute: int = 500):
-        import time
+    """
+    Token bucket allowing at most limit_per_minute pages in any rolling 60 second window.
+
+    The bucket holds up to burst pages (a tenth of the budget by default) and refills at
+    (limit_per_minute - burst) pages per minute, so a full bucket plus a minute of refill never
+    exceeds the budget. acquire() reserves its pages in O(1) and then sleeps until the bucket has
+    refilled enough to cover them. Pages of one acquire beyond burst were earned before they are
+    sent, so they are charged again afterwards; callers should keep acquires within burst pages. Reservations may take the bucket below zero, so waiting callers are served
+    in arrival order. With a state_path, the bucket lives in a SQLite file and is shared by every
+    process using the same path (e.g. several app workers). Wait-time metrics are kept per process.
+    """
+    def __init__(self, limit_per_minute: int = 500, state_path: str = None, name: str = "mistral", burst: int = None):
         import threading
         self.limit = limit_per_minute
-        self.history = []  # list of (timestamp, page_count)
+        self.burst = min(limit_per_minute - 1, burst if burst is not None else max(1, limit_per_minute // 10))
+        self.rate = (limit_per_minute - self.burst) / 60.0
+        self.name = name
+        self.state_path = state_path
         self.lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = None
+        self._conn = None
+        self.acquires = 0
+        self.throttled = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        if state_path:
+            import sqlite3
+            Path(state_path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(state_path), timeout=30, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (name TEXT PRIMARY KEY, tokens REAL, updated REAL)")
+
+    def _take(self, tokens: float, updated, page_count: int, now: float) -> tuple:
+        """Refills the bucket up to now and takes page_count from it; returns (tokens, wait_seconds)."""
+        if updated is not None:
+            tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        tokens -= page_count
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        return tokens - max(0, page_count - self.burst), wait
+
+    def _reserve(self, page_count: int) -> float:
+        import time
+        page_count = min(page_count, self.limit)
+        with self.lock:
+            now = time.time()
+            if self._conn is None:
+                self._tokens, wait = self._take(self._tokens, self._updated, page_count, now)
+                self._updated = now
+            else:
+                # BEGIN IMMEDIATE takes the database write lock, so the read-modify-write is atomic across processes
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute("SELECT tokens, updated FROM rate_limits WHERE name = ?", (self.name,)).fetchone()
+                    tokens, updated = row if row else (float(self.burst), None)
+                    tokens, wait = self._take(tokens, updated, page_count, now)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO rate_limits (name, tokens, updated) VALUES (?, ?, ?)", (self.name, tokens, now)
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            self.acquires += 1
+            if wait > 0:
+                self.throttled += 1
+                self.wait_seconds_total += wait
+                self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        if wait > 0:
+            logger.info(f"Mistral OCR Rate limit reached. Sleeping for {wait:.2f} seconds before processing {page_count} pages.")
+        return wait
 
     def acquire(self, page_count: int):
         import time
-        if page_count > self.limit:
-            page_count = self.limit
+        wait = self._reserve(page_count)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, page_count: int):
+        import asyncio
+        wait = self._reserve(page_count)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "limit_per_minute": self.limit,
+                "burst": self.burst,
+                "shared": self._conn is not None,
+                "acquires": self.acquires,
+                "throttled": self.throttled,
+                "wait_seconds_total": round(self.wait_seconds_total, 3),
+                "wait_seconds_max": round(self.wait_seconds_max, 3)
+            }
+
+mistral_rate_limiter = TokenBucketRateLimiter(500, state_path=os.getenv("MISTRAL_RATE_LIMIT_STATE", "").strip() or None)
+
+def configure_mistral_rate_limiter(state_path: str = None, limit_per_minute: int = 500):
+    """Replaces the process-wide Mistral limiter, sharing its bucket through state_path when given."""
+    global mistral_rate_limiter
+    mistral_rate_limiter = TokenBucketRateLimiter(limit_per_minute, state_path=state_path)
+    return mistral_rate_limiter
+
+MISTRAL_OCR_MODEL = "mistral-ocr-latest"
+MISTRAL_API_BASE = os.getenv("MISTRAL_API_BASE", "https://api.mistral.ai/v1")
+# Chunks uploaded and OCRed concurrently by run_mistral_ocr
+MISTRAL_MAX_IN_FLIGHT = int(os.getenv("MISTRAL_MAX_IN_FLIGHT", "4"))
+# Retries of failed Mistral API calls, with exponential backoff (seconds) and jitter
+MISTRAL_MAX_RETRIES = int(os.getenv("MISTRAL_MAX_RETRIES", "4"))
+MISTRAL_BACKOFF_BASE = 1.0
+MISTRAL_BACKOFF_MAX = 60.0
+# Adaptive chunk sizing of run_mistral_ocr: byte budget of one uploaded chunk, seconds one chunk
+# should take to upload and OCR, and the page bounds of a chunk
+MISTRAL_CHUNK_MAX_BYTES = int(float(os.getenv("MISTRAL_CHUNK_MAX_MB", "20")) * 1024 * 1024)
+MISTRAL_CHUNK_TARGET_SECONDS = float(os.getenv("MISTRAL_CHUNK_TARGET_SECONDS", "60"))
+MISTRAL_CHUNK_MAX_PAGES = int(os.getenv("MISTRAL_CHUNK_MAX_PAGES", "250"))
+EASYOCR_LANGS = ['ar', 'en']
+
+class EasyOCRService:
+    """
+    In-process OCR worker that owns the EasyOCR model.
+
+    A single daemon thread loads the reader and serves readtext requests coming from any
+    number of threads through a queue. Requests that arrive within `max_wait` seconds of each
+    other are grouped into a micro-batch (at most `max_batch` images / `max_batch_pixels` pixels).
+    Images of a micro-batch are bucketed by size like EasyOCRBatcher does, padded with white to
+    their bucket size, and every bucket holding more than one image shares one readtext_batched call.
+    Padding only extends the bottom and right edges, so result coordinates stay those of the image.
+    """
+    BUCKET = 64  # Bucket granularity in pixels
+
+    def __init__(self, langs: list = None, max_batch: int = 8, max_wait: float = 0.02, max_batch_pixels: int = 16_000_000):
+        import queue
+        import threading
+        self.langs = langs or EASYOCR_LANGS
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.max_batch_pixels = max_batch_pixels
+        self.images_processed = 0
+        self.batches_processed = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def readtext(self, image) -> list:
+        """Drop-in replacement for easyocr.Reader.readtext(image)."""
+        return self.submit(image).result()
+
+    def readtext_batched(self, images: list, batch_size: int = None) -> list:
+        """Drop-in replacement for easyocr.Reader.readtext_batched(images)."""
+        futures = [self.submit(image) for image in images]
+        return [future.result() for future in futures]
+
+    def submit(self, image):
+        """Queues an image for OCR and returns a Future resolving to the EasyOCR results."""
+        import numpy as np
+        from concurrent.futures import Future
+        self._ensure_started()
+        future = Future()
+        self._queue.put((np.asarray(image), future))
+        return future
 
+    def _ensure_started(self):
+        import threading
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="easyocr-service", daemon=True)
+                self._thread.start()
+
+    def _load_reader(self):
+        global _EASYOCR_READER
+        if _EASYOCR_READER is None:
+            import easyocr
+            logger.info(f"Initializing EasyOCR reader for {self.langs}...")
+            _EASYOCR_READER = easyocr.Reader(self.langs)
+        return _EASYOCR_READER
+
+    def _run(self):
+        import time
+        import queue
         while True:
-            with self.lock:
-                now = time.time()
-                # Clear entries older than 60 seconds
-                self.history = [entry for entry in self.history if now - entry[0] < 60]
-                
-                current_pages = sum(entry[1] for entry in self.history)
-                if current_pages + page_count <= self.limit:
-                    self.history.append((now, page_count))
-                    return
-                
-                # Find how long we need to wait
-                target_remaining = self.limit - page_count
-                temp_sum = 0
-                wait_until = now
-                for ts, count in reversed(self.history):
-                    if temp_sum + count > target_remaining:
-                        wait_until = ts + 60
-                        break
-                    temp_sum += count
-                
-                sleep_time = max(0.1, wait_until - now)
-                
-            logger.info(f"Mistral OCR Rate limit reached. Sleeping for {sleep_time:.2f} seconds before processing {page_count} pages.")
-            time.sleep(sleep_time)
+            batch = [self._queue.get()]
+            pixels = batch[0][0].shape[0] * batch[0][0].shape[1]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch and pixels < self.max_batch_pixels:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                pixels += item[0].shape[0] * item[0].shape[1]
+            self._process(batch)
+
+    def _process(self, batch: list):
+        try:
+            reader = self._load_reader()
+        except Exception as e:
+            logger.error(f"Failed to initialize EasyOCR reader: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
 
-mistral_rate_limiter = TokenBucketRateLimiter(500)
+        # Only identically shaped images can share a detector pass, so crops are padded to their size bucket
+        import numpy as np
+        groups = {}
+        for image, future in batch:
+            bucket_h = -(-image.shape[0] // self.BUCKET) * self.BUCKET
+            bucket_w = -(-image.shape[1] // self.BUCKET) * self.BUCKET
+            groups.setdefault((bucket_h, bucket_w, image.shape[2:], image.dtype.str), []).append((image, future))
+        for (bucket_h, bucket_w, channels, _), group in groups.items():
+            try:
+                if len(group) == 1:
+                    results = [reader.readtext(group[0][0])]
+                else:
+                    padded = []
+                    for image, _ in group:
+                        canvas = np.full((bucket_h, bucket_w, *channels), 255, dtype=image.dtype)
+                        canvas[:image.shape[0], :image.shape[1]] = image
+                        padded.append(canvas)
+                    results = reader.readtext_batched(padded, batch_size=self.max_batch)
+                for (_, future), result in zip(group, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in group:
+                    future.set_exception(e)
+        self.images_processed += len(batch)
+        self.batches_processed += 1
+        logger.debug(f"EasyOCR service ran a micro-batch of {len(batch)} images in {len(groups)} size buckets")
+
+_EASYOCR_SERVICE = EasyOCRService(
+    max_batch=int(os.getenv("EASYOCR_MAX_BATCH", "8")),
+    max_wait=float(os.getenv("EASYOCR_MAX_WAIT_MS", "20")) / 1000.0
+)
 
 def get_easyocr_reader():
-    global _EASYOCR_READER
-    if _EASYOCR_READER is None:
-        import easyocr
-        logger.info("Initializing EasyOCR reader for ['ar', 'en']...")
-        _EASYOCR_READER = easyocr.Reader(['ar', 'en'])
-    return _EASYOCR_READER
+    """Returns the process-wide EasyOCR service, which exposes the reader's readtext API."""
+    return _EASYOCR_SERVICE
+
+def pixel_hash(image) -> str:
+    """SHA-256 of an image's pixels and geometry. Accepts fitz Pixmaps, PIL images and numpy arrays."""
+    import hashlib
+    import numpy as np
+    digest = hashlib.sha256()
+    if isinstance(image, fitz.Pixmap):
+        digest.update(f"pix:{image.width}x{image.height}x{image.n}".encode())
+        digest.update(image.samples)
+    else:
+        # PIL images hash like the numpy arrays EasyOCR receives
+        arr = np.ascontiguousarray(np.asarray(image))
+        digest.update(f"np:{arr.dtype}:{arr.shape}".encode())
+        digest.update(arr.tobytes())
+    return digest.hexdigest()
+
+class OCRCache:
+    """
+    Persistent per-crop OCR result cache shared by all engines, stored in SQLite.
+
+    Entries are keyed by the pixel hash of the crop plus the engine and model that produced
+    the text, so identical crops are only OCRed once, across documents and processes.
+    The total size of the cached texts is capped; the least recently used entries are
+    evicted first. Hit/miss counters are kept per process.
+    """
+    def __init__(self, path, max_bytes: int = 256 * 1024 * 1024):
+        import sqlite3
+        import threading
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                "key TEXT PRIMARY KEY, engine TEXT, model TEXT, text TEXT, size INTEGER, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ocr_cache_last_used ON ocr_cache (last_used)")
+
+    @staticmethod
+    def make_key(image, engine: str, model: str = None) -> str:
+        return f"{engine}:{model or ''}:{pixel_hash(image)}"
+
+    def get(self, key: str):
+        import time
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM ocr_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._conn:
+                self._conn.execute("UPDATE ocr_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            return row[0]
+
+    def put(self, key: str, text: str, engine: str = None, model: str = None):
+        import time
+        size = len(text.encode("utf-8")) + len(key)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ocr_cache (key, engine, model, text, size, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, engine, model, text, size, time.time())
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop the least recently used entries until we are back under the cap
+        removed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM ocr_cache ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM ocr_cache WHERE key = ?", (key,))
+            total -= size
+            removed += 1
+        logger.info(f"OCR cache evicted {removed} entries")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+_OCR_CACHE = None
+
+def configure_ocr_cache(path: str = None, max_bytes: int = None):
+    """
+    Enables (or with path=None disables) the process-wide OCR cache.
+    The settings are mirrored into the environment so spawned page workers share the same cache.
+    """
+    global _OCR_CACHE
+    if path:
+        max_bytes = max_bytes or int(float(os.getenv("OCR_CACHE_MAX_MB", "256")) * 1024 * 1024)
+        os.environ["OCR_CACHE_PATH"] = str(path)
+        os.environ["OCR_CACHE_MAX_MB"] = str(max_bytes / (1024 * 1024))
+        _OCR_CACHE = OCRCache(path, max_bytes)
+    else:
+        os.environ.pop("OCR_CACHE_PATH", None)
+        _OCR_CACHE = None
+    return _OCR_CACHE
+
+def get_ocr_cache():
+    """Returns the process-wide OCRCache, or None when OCR_CACHE_PATH is not configured."""
+    global _OCR_CACHE
+    path = os.getenv("OCR_CACHE_PATH", "").strip()
+    if _OCR_CACHE is None and path:
+        try:
+            configure_ocr_cache(path)
+        except Exception as e:
+            logger.error(f"Failed to open OCR cache {path}: {e}")
+            os.environ.pop("OCR_CACHE_PATH", None)
+    return _OCR_CACHE
+
+def _easyocr_model() -> str:
+    return "easyocr-" + "+".join(EASYOCR_LANGS)
 
 def has_arabic(text: str) -> bool:
     """Check if the text contains any Arabic characters."""
@@ -81,6 +394,39 @@ def has_arabic(text: str) -> bool:
         for char in text
     )
 
+def arabic_ratio(text: str) -> float:
+    """Share of the letters in text that are Arabic."""
+    letters = [char for char in text or "" if char.isalpha()]
+    if not letters:
+        return 0.0
+    return sum(1 for char in letters if has_arabic(char)) / len(letters)
+
+def is_garbled_text(text: str) -> bool:
+    """
+    Heuristic for broken text layers: (cid:N) glyph codes, replacement, private-use or
+    control characters, or mostly symbols instead of letters and digits.
+    """
+    import re
+    chars = [char for char in text or "" if not char.isspace()]
+    if not chars:
+        return False
+    if len(re.findall(r"\(cid:\d+\)", text)) >= 3:
+        return True
+    bad = sum(1 for char in chars if char == "\ufffd" or "\ue000" <= char <= "\uf8ff" or ord(char) < 32)
+    if bad / len(chars) > 0.05:
+        return True
+    return sum(1 for char in chars if char.isalnum()) / len(chars) < 0.5
+
+def classify_page_text(text: str) -> str:
+    """Why a page's text layer needs OCR ("empty", "arabic" or "garbled"), or "native" if it can be used as is."""
+    if not text or not text.strip():
+        return "empty"
+    if arabic_ratio(text) >= 0.5:
+        return "arabic"
+    if is_garbled_text(text):
+        return "garbled"
+    return "native"
+
 def get_easyocr_blocks(results: list) -> list:
     """Extract standard block format from EasyOCR results list."""
     if not results:
@@ -135,231 +481,950 @@ def sort_and_format_ocr_blocks(blocks: list) -> str:
 
     return "\n".join(sorted_text_lines)
 
-def extract_text_via_easyocr(img_annots, page_rect, rect, context_margin=None) -> str:
-    """Crops the rendered page image (at zoom 4.0), runs EasyOCR on it, and returns sorted text."""
+# Render scales (pixels per PDF point) of the different image consumers
+DISPLAY_RENDER_SCALE = 4.0  # Saved highlight crops / compiled highlights PDF
+EASYOCR_RENDER_SCALE = 2.0  # EasyOCR input
+
+def easyocr_crop_rect(page_rect, rect, context_margin=None):
+    """Region of the page EasyOCR reads for a quote, or for its context when context_margin is given."""
+    if context_margin is not None:
+        return fitz.Rect(
+            page_rect.x0,
+            max(page_rect.y0, rect.y0 - context_margin),
+            page_rect.x1,
+            min(page_rect.y1, rect.y1 + context_margin)
+        )
+    return fitz.Rect(rect)
+
+def display_crop_rect(page_rect, rect, vertical_margin: float = 15.0):
+    """Full page width strip around a highlight, as saved to the highlight images."""
+    return fitz.Rect(
+        page_rect.x0,
+        max(page_rect.y0, rect.y0 - vertical_margin),
+        page_rect.x1,
+        min(page_rect.y1, rect.y1 + vertical_margin)
+    )
+
+class PageRenderPlanner:
+    """
+    Renders only the regions of a page that are actually needed, at the scale each consumer needs.
+
+    Consumers request regions per scale first. On render (or the first crop), the requested regions of each
+    scale are merged into vertical bands, and every band is rendered once with
+    page.get_pixmap(clip=...). Crops are then cut out of the bands on the same pixel grid a full
+    page render would use, so no full page is rasterised and nothing is rendered large and
+    downsized afterwards.
+    """
+    def __init__(self, page, annots: bool = True):
+        self.page = page
+        self.page_rect = page.rect
+        self.annots = annots
+        self._requests = {}  # scale -> list of pixel boxes
+        self._bands = None  # scale -> list of (x, y, width, height, image)
+
+    def pixel_box(self, scale: float, rect) -> tuple:
+        """Pixel box of a page region, rounded the same way PIL crops a full page render."""
+        return tuple(int(round(v)) for v in (
+            (rect.x0 - self.page_rect.x0) * scale,
+            (rect.y0 - self.page_rect.y0) * scale,
+            (rect.x1 - self.page_rect.x0) * scale,
+            (rect.y1 - self.page_rect.y0) * scale
+        ))
+
+    def request(self, scale: float, rect):
+        self._requests.setdefault(scale, []).append(self.pixel_box(scale, rect))
+        self._bands = None
+
+    def _clamp(self, scale: float, box: tuple) -> tuple:
+        import math
+        page_w = math.ceil(self.page_rect.width * scale)
+        page_h = math.ceil(self.page_rect.height * scale)
+        x0, y0, x1, y1 = box
+        return (max(0, x0), max(0, y0), min(page_w, x1), min(page_h, y1))
+
+    def render(self):
+        """Renders every requested band. Called automatically by the first crop()."""
+        self._bands = {}
+        for scale, boxes in self._requests.items():
+            clamped = [self._clamp(scale, box) for box in boxes]
+            clamped = sorted((box for box in clamped if box[2] > box[0] and box[3] > box[1]), key=lambda box: box[1])
+
+            # Merge regions that overlap vertically into bands spanning their union
+            bands = []
+            for box in clamped:
+                if bands and box[1] <= bands[-1][3]:
+                    last = bands[-1]
+                    bands[-1] = (min(last[0], box[0]), last[1], max(last[2], box[2]), max(last[3], box[3]))
+                else:
+                    bands.append(box)
+
+            rendered = []
+            for x0, y0, x1, y1 in bands:
+                clip = fitz.Rect(
+                    self.page_rect.x0 + x0 / scale,
+                    self.page_rect.y0 + y0 / scale,
+                    self.page_rect.x0 + x1 / scale,
+                    self.page_rect.y0 + y1 / scale
+                )
+                pix = self.page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip, annots=self.annots)
+                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                rendered.append((pix.x, pix.y, pix.width, pix.height, img))
+            self._bands[scale] = rendered
+
+    def crop(self, scale: float, rect):
+        """Returns the requested region as a PIL image rendered at the given scale."""
+        if self._bands is None:
+            self.render()
+        box = self.pixel_box(scale, rect)
+        cx0, cy0, cx1, cy1 = self._clamp(scale, box)
+        for bx, by, bw, bh, img in self._bands.get(scale, []):
+            if bx <= cx0 and cy0 >= by and cx1 <= bx + bw and cy1 <= by + bh:
+                # Parts of the box outside the page come out black, like cropping a full render
+                return img.crop((box[0] - bx, box[1] - by, box[2] - bx, box[3] - by))
+        raise ValueError(f"Region {rect} at scale {scale} was not requested from the render planner")
+
+def extract_text_via_easyocr(crop_img) -> str:
+    """Runs EasyOCR on a crop rendered at EASYOCR_RENDER_SCALE and returns sorted text."""
     try:
         import numpy as np
         reader = get_easyocr_reader()
-        
-        if context_margin is not None:
-            crop_rect = fitz.Rect(
-                page_rect.x0,
-                max(page_rect.y0, rect.y0 - context_margin),
-                page_rect.x1,
-                min(page_rect.y1, rect.y1 + context_margin)
-            )
-        else:
-            crop_rect = rect
-
-        crop_box = (
-            (crop_rect.x0 - page_rect.x0) * 4.0,
-            (crop_rect.y0 - page_rect.y0) * 4.0,
-            (crop_rect.x1 - page_rect.x0) * 4.0,
-            (crop_rect.y1 - page_rect.y0) * 4.0
-        )
-        cropped_img = img_annots.crop(crop_box)
-        
-        target_size = (int(cropped_img.width * 0.5), int(cropped_img.height * 0.5))
-        resized_img = cropped_img.resize(target_size, Image.Resampling.BILINEAR)
-
-        img_np = np.array(resized_img)
-        ocr_res = reader.readtext(img_np)
-        blocks = get_easyocr_blocks(ocr_res)
-        text = sort_and_format_ocr_blocks(blocks)
-        return text.strip()
+        img_np = np.array(crop_img)
+        return _cached_easyocr_text(reader, img_np)
     except Exception as e:
         logger.error(f"EasyOCR extraction failed: {e}")
         return "[EasyOCR Extraction Failed]"
 
-def run_olmocr_ocr(compiled_pdf_path: str, task_id: str, server: str = "http://localhost:11434/v1", api_key: str = None, model: str = "richardyoung/olmocr2:7b-q8", progress_callback = None) -> dict:
+def _cached_easyocr_text(reader, img_np) -> str:
+    """Runs EasyOCR on one image and returns its sorted text, consulting the OCR cache first."""
+    cache = get_ocr_cache()
+    cache_key = None
+    if cache:
+        cache_key = OCRCache.make_key(img_np, "easyocr", _easyocr_model())
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+    ocr_res = reader.readtext(img_np)
+    blocks = get_easyocr_blocks(ocr_res)
+    text = sort_and_format_ocr_blocks(blocks).strip()
+    if cache:
+        cache.put(cache_key, text, "easyocr", _easyocr_model())
+    return text
+
+def run_easyocr_batch(images: list, batch_size: int = 8) -> list:
+    """
+    Runs EasyOCR on a list of equally sized images in a single batched call.
+    Returns the sorted text of every image, in input order.
+    """
+    import numpy as np
+    reader = get_easyocr_reader()
+    results = reader.readtext_batched([np.array(img) for img in images], batch_size=batch_size)
+    return [sort_and_format_ocr_blocks(get_easyocr_blocks(res)).strip() for res in results]
+
+class EasyOCRBatcher:
+    """
+    Collects OCR crops (possibly across pages) and runs them through EasyOCR in size-bucketed batches.
+
+    Each crop is registered together with the container and key its text belongs to
+    (e.g. a highlight item and "text"/"context"); flush() fills them in. Crops of a bucket
+    are padded with white to the bucket size so they can share one detector/recognizer pass.
+    A batch holds at most `batch_size` images and `max_batch_pixels` pixels.
+    """
+    BUCKET = 64  # Bucket granularity in pixels
+    COLLECT_FACTOR = 4  # How many batches worth of crops are collected before flushing
+
+    def __init__(self, batch_size: int = 8, max_batch_pixels: int = 16_000_000):
+        self.batch_size = max(1, batch_size)
+        self.max_batch_pixels = max_batch_pixels
+        self.jobs = []  # list of (image, target, key, failure_text)
+        self.pending_pixels = 0
+
+    def add(self, image, target, key, failure_text: str = "[EasyOCR Extraction Failed]"):
+        cache = get_ocr_cache()
+        if cache:
+            cached = cache.get(OCRCache.make_key(image, "easyocr", _easyocr_model()))
+            if cached is not None:
+                target[key] = cached
+                return
+        self.jobs.append((image, target, key, failure_text))
+        self.pending_pixels += image.width * image.height
+
+    def should_flush(self) -> bool:
+        return (
+            len(self.jobs) >= self.batch_size * self.COLLECT_FACTOR
+            or self.pending_pixels >= self.max_batch_pixels * self.COLLECT_FACTOR
+        )
+
+    def flush(self):
+        jobs, self.jobs = self.jobs, []
+        self.pending_pixels = 0
+        if not jobs:
+            return
+
+        buckets = {}
+        for job in jobs:
+            image = job[0]
+            bucket_w = -(-image.width // self.BUCKET) * self.BUCKET
+            bucket_h = -(-image.height // self.BUCKET) * self.BUCKET
+            buckets.setdefault((bucket_w, bucket_h), []).append(job)
+
+        for (bucket_w, bucket_h), bucket_jobs in buckets.items():
+            per_batch = max(1, min(self.batch_size, self.max_batch_pixels // (bucket_w * bucket_h)))
+            for i in range(0, len(bucket_jobs), per_batch):
+                batch = bucket_jobs[i:i + per_batch]
+                try:
+                    padded = []
+                    for image, _, _, _ in batch:
+                        canvas = Image.new("RGB", (bucket_w, bucket_h), (255, 255, 255))
+                        canvas.paste(image, (0, 0))
+                        padded.append(canvas)
+                    texts = run_easyocr_batch(padded, batch_size=self.batch_size)
+                    cache = get_ocr_cache()
+                    if cache:
+                        for (image, _, _, _), text in zip(batch, texts):
+                            cache.put(OCRCache.make_key(image, "easyocr", _easyocr_model()), text, "easyocr", _easyocr_model())
+                except Exception as e:
+                    logger.error(f"EasyOCR batch of {len(batch)} crops ({bucket_w}x{bucket_h}) failed: {e}")
+                    texts = [failure_text for _, _, _, failure_text in batch]
+                for (_, target, key, _), text in zip(batch, texts):
+                    target[key] = text
+        logger.info(f"EasyOCR batcher processed {len(jobs)} crops in {len(buckets)} size buckets")
+
+# olmOCR page prompt (olmOCR 2 "no anchoring" YAML prompt); the reply is markdown
+# with a front matter section holding the page's language/rotation attributes
+OLMOCR_PROMPT = (
+    "Attached is one page of a document that you must process. "
+    "Just return the plain text representation of this document as if you were reading it naturally. "
+    "Convert equations to LateX and tables to HTML.\n"
+    "If there are any figures or charts, label them with the following markdown syntax "
+    "![Alt text describing the contents of the figure](page_startx_starty_width_height.png)\n"
+    "Return your output as markdown, with a front matter section on top specifying values for the "
+    "primary_language, is_rotation_valid, rotation_correction, is_table, and is_diagram parameters."
+)
+# Longest side (px) of the page renders sent to olmOCR; local servers get smaller renders
+OLMOCR_TARGET_IMAGE_DIM = int(os.getenv("OLMOCR_TARGET_IMAGE_DIM", "1288"))
+OLMOCR_LOCAL_IMAGE_DIM = 600
+# Pages OCRed concurrently by run_olmocr_ocr: adapted per server between 1 and OLMOCR_MAX_CONCURRENCY
+# (starting from one page for local servers), unless OLMOCR_MAX_IN_FLIGHT fixes it
+OLMOCR_MAX_IN_FLIGHT = int(os.getenv("OLMOCR_MAX_IN_FLIGHT", "0")) or None
+OLMOCR_MAX_CONCURRENCY = int(os.getenv("OLMOCR_MAX_CONCURRENCY", "16"))
+OLMOCR_REMOTE_INITIAL_CONCURRENCY = 4
+OLMOCR_MAX_RETRIES = int(os.getenv("OLMOCR_MAX_RETRIES", "3"))
+OLMOCR_MAX_TOKENS = 8000
+
+_OLMOCR_SESSION = None
+
+def get_olmocr_session():
+    """Process-wide requests.Session keeping connections to the olmOCR server alive between pages."""
+    global _OLMOCR_SESSION
+    if _OLMOCR_SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, (OLMOCR_MAX_IN_FLIGHT or OLMOCR_MAX_CONCURRENCY) * 2))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _OLMOCR_SESSION = session
+    return _OLMOCR_SESSION
+
+class AIMDConcurrencyController:
+    """
+    Limits the requests in flight to a server, adapting the limit to what the server sustains
+    (additive increase, multiplicative decrease).
+
+    Every request's latency is compared to the lowest latency seen so far (the baseline, which
+    creeps up slowly so it follows the server). While latency stays within latency_tolerance times
+    the baseline, the limit grows by one per limit successful requests; once requests only queue
+    up on the server (latency above tolerance) or fail with overload errors (429, 5xx, timeouts),
+    the limit is multiplied by backoff. With min_limit == max_limit the limit is fixed.
+    acquire() and release() hand out the slots, so a controller shared by several jobs bounds
+    their total.
+    """
+    def __init__(self, initial: int = 1, min_limit: int = 1, max_limit: int = None,
+                 latency_tolerance: float = 2.0, backoff: float = 0.5, alpha: float = 0.3, name: str = "olmocr"):
+        import threading
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit or OLMOCR_MAX_CONCURRENCY)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.alpha = alpha
+        self.name = name
+        self.latency = None
+        self.baseline = None
+        self.in_flight = 0
+        self._since_change = 0
+        self._cond = threading.Condition()
+
+    @property
+    def adaptive(self) -> bool:
+        return self.min_limit < self.max_limit
+
+    def acquire(self, block: bool = True) -> bool:
+        """Takes a slot, waiting for one if block; returns False if none is free and not block."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                if not block:
+                    return False
+                self._cond.wait()
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def record(self, latency: float = None, ok: bool = True):
+        """Records one request: its latency if it succeeded, or ok=False if the server was overloaded."""
+        if not self.adaptive:
+            return
+        with self._cond:
+            old_limit = int(self.limit)
+            self._since_change += 1
+            if ok and latency is not None:
+                self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                else:
+                    self.baseline += 0.01 * (latency - self.baseline)
+            overloaded = not ok or (self.latency is not None and self.latency > self.baseline * self.latency_tolerance)
+            if overloaded:
+                # Back off at most once per round of requests, so one burst of slow replies counts once
+                if self._since_change >= old_limit:
+                    self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                    self.latency = None
+                    self._since_change = 0
+            elif self._since_change >= old_limit:
+                self.limit = min(float(self.max_limit), self.limit + 1)
+                self._since_change = 0
+            if int(self.limit) != old_limit:
+                logger.info(f"{self.name} concurrency {old_limit} -> {int(self.limit)} (latency {self.latency or 0:.2f}s, baseline {self.baseline or 0:.2f}s, {'error' if not ok else 'ok'})")
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "latency": round(self.latency, 3) if self.latency is not None else None,
+                "baseline": round(self.baseline, 3) if self.baseline is not None else None
+            }
+
+_OLMOCR_CONTROLLERS = {}
+
+def get_olmocr_controller(server: str, max_in_flight: int = None) -> AIMDConcurrencyController:
+    """
+    Concurrency controller of an olmOCR server, shared by every job using that server so that
+    the learnt limit carries over between jobs. A max_in_flight (or OLMOCR_MAX_IN_FLIGHT) fixes the limit;
+    fixed-limit controllers are shared per (server, limit), so the cap holds across concurrent jobs too.
+    """
+    max_in_flight = max_in_flight or OLMOCR_MAX_IN_FLIGHT
+    key = (server, max_in_flight)
+    controller = _OLMOCR_CONTROLLERS.get(key)
+    if controller is None:
+        if max_in_flight:
+            controller = AIMDConcurrencyController(max_in_flight, min_limit=max_in_flight, max_limit=max_in_flight, name=f"olmOCR {server}")
+        else:
+            initial = 1 if is_local_server(server) else OLMOCR_REMOTE_INITIAL_CONCURRENCY
+            controller = AIMDConcurrencyController(initial, name=f"olmOCR {server}")
+        controller = _OLMOCR_CONTROLLERS.setdefault(key, controller)
+    return controller
+
+def is_local_server(server: str) -> bool:
+    return not server or "localhost" in server or "127.0.0.1" in server
+
+def parse_olmocr_response(content: str) -> tuple:
+    """Splits an olmOCR reply into (front matter dict, page text)."""
+    content = (content or "").strip()
+    attributes = {}
+    if content.startswith("---"):
+        header, sep, body = content[3:].partition("\n---")
+        if sep:
+            for line in header.strip().splitlines():
+                key, colon, value = line.partition(":")
+                if colon:
+                    value = value.strip()
+                    attributes[key.strip()] = {"true": True, "false": False}.get(value.lower(), value)
+            content = body.strip()
+    return attributes, content
+
+def _run_olmocr_page(session, server: str, api_key: str, model: str, png_bytes: bytes, label: str, controller: AIMDConcurrencyController = None) -> str:
+    """
+    OCRs one page render (or crop, named label in the logs) through the server's /chat/completions endpoint and returns its text.
+    Connection errors, 429/5xx responses and truncated replies are retried (with a slightly higher
+    temperature, as olmOCR does); a page the model reports as rotated is re-sent upright once.
+    Every request's latency, or overload error, is reported to controller.
+    Raises RuntimeError when the page still fails.
+    """
+    import io
+    import time
+    import base64
+    import random
+    import requests
+
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    url = f"{server.rstrip('/')}/chat/completions"
+    rotated = False
+    error = None
+    for attempt in range(OLMOCR_MAX_RETRIES + 1):
+        if attempt:
+            time.sleep(random.uniform(0, min(30.0, 2 ** (attempt - 1))))
+        payload = {
+            "model": model,
+            "messages": [{
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": OLMOCR_PROMPT},
+                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{base64.b64encode(png_bytes).decode()}"}}
+                ]
+            }],
+            "max_tokens": OLMOCR_MAX_TOKENS,
+            "temperature": 0.1 * attempt
+        }
+        started = time.time()
+        try:
+            resp = session.post(url, headers=headers, json=payload, timeout=600)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if controller:
+                controller.record(ok=False)
+            error = str(e)
+            continue
+        if resp.status_code != 200:
+            error = f"status {resp.status_code}: {resp.text[:500]}"
+            if resp.status_code == 429 or resp.status_code >= 500:
+                if controller:
+                    controller.record(ok=False)
+                continue
+            break
+        if controller:
+            controller.record(time.time() - started)
+        try:
+            choice = resp.json()["choices"][0]
+            content = choice["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            error = f"malformed response: {e}"
+            continue
+        if choice.get("finish_reason") == "length":
+            error = "reply truncated at max_tokens"
+            continue
+        attributes, text = parse_olmocr_response(content)
+        rotation = str(attributes.get("rotation_correction", "0"))
+        if attributes.get("is_rotation_valid") is False and rotation in ("90", "180", "270") and not rotated:
+            logger.info(f"olmOCR {label}: model reports a {rotation} degree rotation, re-sending it upright")
+            with Image.open(io.BytesIO(png_bytes)) as image:
+                buffer = io.BytesIO()
+                image.rotate(-int(rotation), expand=True).save(buffer, format="PNG")
+            png_bytes = buffer.getvalue()
+            rotated = True
+            continue
+        return text
+    raise RuntimeError(f"olmOCR failed for {label}: {error}")
+
+def _run_olmocr_sources(
+    sources,
+    total: int,
+    server: str,
+    api_key: str = None,
+    model: str = "richardyoung/olmocr2:7b-q8",
+    progress_callback = None,
+    max_in_flight: int = None,
+    statuses: dict = None,
+    on_result = None,
+    kind: str = "page"
+) -> dict:
+    """
+    OCRs (key, load_png) sources through olmOCR and returns {key: text}.
+    load_png() is called on this thread (PyMuPDF stays on one thread) while earlier requests are
+    in flight, as many as the server's AIMDConcurrencyController allows (max_in_flight fixes the
+    number instead). Progress is reported per finished source, on_result(key, text) is called for
+    every recognised one, and statuses is filled with "ok", "empty" (no text) or "failed".
+    """
+    import queue
+    from concurrent.futures import ThreadPoolExecutor
+
+    controller = get_olmocr_controller(server, max_in_flight)
+    session = get_olmocr_session()
+    ocr_results = {}
+    statuses = statuses if statuses is not None else {}
+    sources = iter(sources)
+    finished = queue.Queue()
+    in_flight = 0
+    completed = 0
+    exhausted = False
+
+    if progress_callback:
+        progress_callback(0, total, phase="ocr", percent=0)
+
+    def process(png_bytes, key):
+        try:
+            finished.put((key, _run_olmocr_page(session, server, api_key, model, png_bytes, f"{kind} {key}", controller), None))
+        except Exception as e:
+            finished.put((key, None, e))
+        finally:
+            controller.release()
+
+    with ThreadPoolExecutor(max_workers=controller.max_limit, thread_name_prefix="olmocr") as executor:
+        while not exhausted or in_flight:
+            # Wait for a slot only when nothing of ours is in flight; otherwise collect a finished source first
+            if not exhausted and controller.acquire(block=not in_flight):
+                source = next(sources, None)
+                if source is None:
+                    controller.release()
+                    exhausted = True
+                    continue
+                key, load_png = source
+                try:
+                    png_bytes = load_png()
+                except Exception as e:
+                    controller.release()
+                    logger.error(f"Failed to prepare {kind} {key} for olmOCR: {e}")
+                    statuses[key] = "failed"
+                    completed += 1
+                    continue
+                executor.submit(process, png_bytes, key)
+                in_flight += 1
+                continue
+
+            key, text, error = finished.get()
+            in_flight -= 1
+            completed += 1
+            if error is not None:
+                logger.error(str(error))
+                statuses[key] = "failed"
+            else:
+                ocr_results[key] = text
+                statuses[key] = "ok" if text else "empty"
+                if on_result:
+                    on_result(key, text)
+            if progress_callback:
+                progress_callback(completed, total, phase="ocr", percent=int(completed / max(total, 1) * 100))
+    return ocr_results
+
+def run_olmocr_ocr(
+    compiled_pdf_path: str,
+    task_id: str,
+    server: str = "http://localhost:11434/v1",
+    api_key: str = None,
+    model: str = "richardyoung/olmocr2:7b-q8",
+    progress_callback = None,
+    max_in_flight: int = None,
+    target_longest_image_dim: int = None,
+    page_status: dict = None
+) -> dict:
     """
-    Runs the olmocr pipeline on the compiled highlights PDF.
+    Runs olmOCR on the compiled highlights PDF through the server's OpenAI-compatible
+    /chat/completions endpoint, one rendered page per request over a pooled session.
     Returns a dictionary mapping page numbers (1-indexed) to their parsed OCR text.
+
+    Pages are rendered on this thread while requests are in flight, as many as the server's
+    AIMDConcurrencyController allows (max_in_flight fixes the number instead); progress is
+    reported per finished page. If given, page_status is filled with the final
+    status of every page: "ok", "empty" (no text) or "failed".
     """
     compiled_pdf = Path(compiled_pdf_path)
     if not compiled_pdf.exists():
         logger.error(f"Compiled highlights PDF not found for OCR: {compiled_pdf}")
         return {}
 
-    # Read pages count to know total items
     try:
         doc = fitz.open(compiled_pdf)
         num_pages = len(doc)
-        doc.close()
     except Exception as e:
         logger.error(f"Failed to read compiled highlights PDF page count: {e}")
-        num_pages = 0
+        return {}
 
     if num_pages == 0:
+        doc.close()
         return {}
 
-    # Define unique temporary workspace folder to prevent conflicts
-    workspace_dir = Path("uploads") / f"olmocr_workspace_{task_id}"
-    if workspace_dir.exists():
-        try:
-            shutil.rmtree(workspace_dir)
-        except Exception as e:
-            logger.warning(f"Could not remove existing workspace dir {workspace_dir}: {e}")
-    workspace_dir.mkdir(parents=True, exist_ok=True)
-
-    # Build the olmocr.pipeline subprocess command
-    cmd = [
-        sys.executable,
-        "-u",  # Unbuffered output to read progress in real time
-        "-m", "olmocr.pipeline",
-        str(workspace_dir),
-        "--pdfs", str(compiled_pdf)
-    ]
-    if server:
-        cmd.extend(["--server", server])
-    if api_key:
-        cmd.extend(["--api_key", api_key])
-    if model:
-        cmd.extend(["--model", model])
-
-    # If running on a local server, limit concurrency to prevent system/Ollama overload
-    is_local = False
-    if server:
-        is_local = "localhost" in server or "127.0.0.1" in server
-    else:
-        is_local = True
-
-    if is_local:
-        cmd.extend(["--workers", "1", "--max_concurrent_requests", "1", "--target_longest_image_dim", "600"])
-        logger.info("Local server detected: Limiting olmocr to 1 worker, 1 concurrent request, and 600px image dimension.")
+    # Local servers (e.g. Ollama) get smaller renders, and their concurrency starts from one request
+    server = server or "http://localhost:11434/v1"
+    target_dim = target_longest_image_dim or (OLMOCR_LOCAL_IMAGE_DIM if is_local_server(server) else OLMOCR_TARGET_IMAGE_DIM)
+    logger.info(f"olmOCR [{task_id}]: {num_pages} pages from {compiled_pdf} via {server} ({target_dim}px renders)")
 
-    logger.info(f"Running olmocr pipeline command: {' '.join(cmd)}")
-    
-    if progress_callback:
-        progress_callback(0, num_pages, phase="ocr", percent=0)
+    def render(page_index):
+        page = doc.load_page(page_index)
+        scale = target_dim / max(page.rect.width, page.rect.height)
+        return page.get_pixmap(matrix=fitz.Matrix(scale, scale)).tobytes("png")
 
+    statuses = page_status if page_status is not None else {}
     try:
-        # Start the pipeline subprocess and capture output
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
-        
-        # Read output in real-time and parse progress
-        completed_pages = 0
-        failed_pages = 0
-        finished_col_idx = -1
-        errored_col_idx = -1
-        worker_finished = {}
-        worker_errored = {}
+        ocr_results = _run_olmocr_sources(
+            ((i + 1, lambda i=i: render(i)) for i in range(num_pages)), num_pages,
+            server, api_key, model, progress_callback, max_in_flight, statuses
+        )
+    finally:
+        doc.close()
 
-        while True:
-            line = proc.stdout.readline()
-            if not line and proc.poll() is not None:
-                break
-            if line:
-                # Log pipeline output locally so it is visible in the systemd journal
-                logger.info(f"[olmocr pipeline] {line.strip()}")
-                
-                # Check for WorkerTracker table headers and data rows to parse progress live
-                if "|" in line:
-                    parts = [p.strip() for p in line.split("|")]
-                    if parts and parts[0] == "Worker ID":
-                        if "finished" in parts:
-                            finished_col_idx = parts.index("finished")
-                        if "errored" in parts:
-                            errored_col_idx = parts.index("errored")
-                        continue
-                    
-                    if finished_col_idx != -1 or errored_col_idx != -1:
-                        if parts[0].isdigit():
-                            try:
-                                w_id = int(parts[0])
-                                if finished_col_idx != -1 and len(parts) > finished_col_idx:
-                                    worker_finished[w_id] = int(parts[finished_col_idx])
-                                if errored_col_idx != -1 and len(parts) > errored_col_idx:
-                                    worker_errored[w_id] = int(parts[errored_col_idx])
-                                
-                                completed_pages = sum(worker_finished.values())
-                                failed_pages = sum(worker_errored.values())
-                                
-                                total_done = min(num_pages, completed_pages + failed_pages)
-                                pct = int((total_done / num_pages) * 100) if num_pages > 0 else 0
-                                if progress_callback:
-                                    progress_callback(total_done, num_pages, phase="ocr", percent=pct)
-                            except Exception as e:
-                                logger.warning(f"Error parsing WorkerTracker row: {e}")
-
-                # Fallback to end-of-run summary metrics if printed
-                if "Completed pages:" in line:
-                    try:
-                        parts = line.split("Completed pages:")
-                        count = int(parts[1].strip().split()[0].replace(",", ""))
-                        completed_pages = max(completed_pages, count)
-                        total_done = min(num_pages, completed_pages + failed_pages)
-                        pct = int((total_done / num_pages) * 100) if num_pages > 0 else 0
-                        if progress_callback:
-                            progress_callback(total_done, num_pages, phase="ocr", percent=pct)
-                    except Exception as e:
-                        logger.warning(f"Error parsing Completed pages count: {e}")
-                elif "Failed pages:" in line:
-                    try:
-                        parts = line.split("Failed pages:")
-                        count = int(parts[1].strip().split()[0].replace(",", ""))
-                        failed_pages = max(failed_pages, count)
-                        total_done = min(num_pages, completed_pages + failed_pages)
-                        pct = int((total_done / num_pages) * 100) if num_pages > 0 else 0
-                        if progress_callback:
-                            progress_callback(total_done, num_pages, phase="ocr", percent=pct)
-                    except Exception as e:
-                        logger.warning(f"Error parsing Failed pages count: {e}")
-                
-        proc.wait()
-        logger.info(f"olmocr pipeline finished with exit code {proc.returncode}")
-        
+    failed = sorted(p for p, status in statuses.items() if status == "failed")
+    logger.info(f"olmOCR completed. Got results for {len(ocr_results)} pages out of {num_pages}.")
+    if failed:
+        logger.error(f"olmOCR failed for {len(failed)} pages after retries: {failed}")
+    return ocr_results
+
+def crop_cache_key(image_path, engine: str, model: str = None):
+    """OCR cache key of a saved crop (by its pixels), or None if the crop cannot be read."""
+    try:
+        with Image.open(image_path) as image:
+            return OCRCache.make_key(image.convert("RGB"), engine, model)
     except Exception as e:
-        logger.error(f"Error running olmocr subprocess: {e}")
-        if workspace_dir.exists():
-            shutil.rmtree(workspace_dir)
-        return {}
+        logger.warning(f"Could not read crop {image_path} for OCR cache lookup: {e}")
+        return None
+
+def load_crop_png(image_path, target_longest_image_dim: int) -> bytes:
+    """PNG bytes of a saved crop, sent as-is unless its longest side exceeds target_longest_image_dim."""
+    import io
+    with Image.open(image_path) as image:
+        if max(image.size) <= target_longest_image_dim:
+            return Path(image_path).read_bytes()
+        image.thumbnail((target_longest_image_dim, target_longest_image_dim))
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+def run_olmocr_crops(
+    image_paths: dict,
+    task_id: str = None,
+    server: str = "http://localhost:11434/v1",
+    api_key: str = None,
+    model: str = "richardyoung/olmocr2:7b-q8",
+    progress_callback = None,
+    checkpoint_path: str = None,
+    max_in_flight: int = None,
+    target_longest_image_dim: int = None,
+    crop_status: dict = None
+) -> dict:
+    """
+    Runs olmOCR directly on the saved highlight crops, {highlight_index: image_path}, and returns
+    {highlight_index: text}; no compiled PDF is built or re-rendered on the way.
+    Crops found in the OCR cache (keyed by their pixels) are answered locally. With a
+    checkpoint_path, every recognised crop is appended to the checkpoint, so a rerun only
+    sends the crops that are still missing. If given, crop_status is filled with the final
+    status of every crop: "ok", "empty" (no text) or "failed".
+    """
+    server = server or "http://localhost:11434/v1"
+    target_dim = target_longest_image_dim or (OLMOCR_LOCAL_IMAGE_DIM if is_local_server(server) else OLMOCR_TARGET_IMAGE_DIM)
+    model_name = ocr_model_name("olmocr", model)
+    total = len(image_paths)
+    ocr_results = _load_ocr_checkpoint(checkpoint_path, kind="crops")
+    ocr_results = {k: v for k, v in ocr_results.items() if k in image_paths}
+    if ocr_results:
+        logger.info(f"Resuming olmOCR: {len(ocr_results)} of {total} crops recorded in {checkpoint_path}")
+
+    cache = get_ocr_cache()
+    cache_keys = {}
+    missing = []
+    for index, image_path in image_paths.items():
+        if index in ocr_results:
+            continue
+        if cache:
+            cache_keys[index] = crop_cache_key(image_path, "olmocr", model_name)
+            cached = cache.get(cache_keys[index]) if cache_keys[index] else None
+            if cached is not None:
+                ocr_results[index] = cached
+                continue
+        missing.append(index)
+    statuses = crop_status if crop_status is not None else {}
+    statuses.update({index: "ok" for index in ocr_results})
+    if cache:
+        logger.info(f"OCR cache: {total - len(missing)} of {total} crops cached or recorded for olmocr, {len(missing)} to process")
+    logger.info(f"olmOCR [{task_id}]: {len(missing)} crops via {server} ({target_dim}px max)")
+
+    done_before = total - len(missing)
+    if not missing:
+        if progress_callback:
+            progress_callback(total, total, phase="ocr", percent=100)
+        return ocr_results
 
-    # Find the resulting JSONL file
-    results_dir = workspace_dir / "results"
-    jsonl_files = list(results_dir.glob("*.jsonl"))
-    
-    ocr_results = {}
-    if jsonl_files:
-        jsonl_file = jsonl_files[0]
-        try:
-            with open(jsonl_file, "r", encoding="utf-8") as f:
-                for line in f:
-                    if not line.strip():
-                        continue
-                    doc_data = json.loads(line)
-                    text = doc_data.get("text", "")
-                    spans = doc_data.get("attributes", {}).get("pdf_page_numbers", [])
-                    
-                    for start, end, page_num in spans:
-                        page_text = text[start:end].strip()
-                        ocr_results[page_num] = page_text
-        except Exception as e:
-            logger.error(f"Failed to read/parse olmocr JSONL result file {jsonl_file}: {e}")
-    else:
-        logger.error(f"No JSONL output file found in workspace: {results_dir}")
+    def progress(current, _total, phase="ocr", percent=None):
+        if progress_callback:
+            done = done_before + current
+            progress_callback(done, total, phase="ocr", percent=int(done / total * 100))
+
+    checkpoint = HighlightStreamWriter(checkpoint_path, append=True) if checkpoint_path else None
+
+    def on_result(index, text):
+        if text and cache and cache_keys.get(index):
+            cache.put(cache_keys[index], text, "olmocr", model_name)
+        if checkpoint and text:
+            checkpoint.append({"crops": {str(index): text}})
 
-    # Clean up workspace directory
     try:
-        if workspace_dir.exists():
-            shutil.rmtree(workspace_dir)
-    except Exception as e:
-        logger.warning(f"Failed to clean up olmocr workspace {workspace_dir}: {e}")
+        ocr_results.update(_run_olmocr_sources(
+            ((index, lambda path=image_paths[index]: load_crop_png(path, target_dim)) for index in missing), len(missing),
+            server, api_key, model, progress, max_in_flight, statuses, on_result, kind="crop"
+        ))
+    finally:
+        if checkpoint:
+            checkpoint.close()
 
-    if progress_callback:
-        progress_callback(num_pages, num_pages, phase="ocr", percent=100)
+    failed = sorted(k for k, status in statuses.items() if status == "failed")
+    logger.info(f"olmOCR completed. Got results for {len(ocr_results)} crops out of {total}.")
+    if failed:
+        logger.error(f"olmOCR failed for {len(failed)} crops after retries: {failed}")
+    return ocr_results
+
+_MISTRAL_SESSION = None
+_MISTRAL_DELETE_EXECUTOR = None
+
+def get_mistral_session():
+    """Process-wide requests.Session with a connection pool sized for the concurrent chunk pipeline."""
+    global _MISTRAL_SESSION
+    if _MISTRAL_SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, MISTRAL_MAX_IN_FLIGHT * 2))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _MISTRAL_SESSION = session
+    return _MISTRAL_SESSION
+
+def _delete_mistral_file_later(session, base_url: str, api_key: str, file_id: str):
+    """Deletes an uploaded file from the Mistral Files API on a background thread."""
+    global _MISTRAL_DELETE_EXECUTOR
+    if _MISTRAL_DELETE_EXECUTOR is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _MISTRAL_DELETE_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mistral-delete")
+
+    def delete():
+        try:
+            logger.info(f"Deleting remote file {file_id} from Mistral Files API...")
+            del_resp = session.delete(f"{base_url}/files/{file_id}", headers={"Authorization": f"Bearer {api_key}"}, timeout=60)
+            logger.info(f"Delete response status: {del_resp.status_code}")
+        except Exception as ex:
+            logger.warning(f"Failed to delete remote file {file_id}: {ex}")
+
+    _MISTRAL_DELETE_EXECUTOR.submit(delete)
+
+class MistralAPIError(RuntimeError):
+    """A Mistral API call that still failed after its retries (status_code is None for malformed responses)."""
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+# Failures that smaller chunks cannot fix (bad key, no credits, no access)
+MISTRAL_FATAL_STATUS = {401, 402, 403}
+
+def _retry_after_seconds(resp):
+    """Delay requested by a Retry-After header (seconds or HTTP date), or None."""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        import time
+        from email.utils import parsedate_to_datetime
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
 
+def _mistral_request(session, method: str, url: str, max_retries: int = None, **kwargs):
+    """
+    Sends a Mistral API request, retrying connection errors, 429 and 5xx responses with
+    exponential backoff and full jitter; a Retry-After header overrides the computed delay.
+    Returns the last response, or raises the last connection error.
+    """
+    import time
+    import random
+    import requests
+    
+    max_retries = MISTRAL_MAX_RETRIES if max_retries is None else max_retries
+    for attempt in range(max_retries + 1):
+        resp = None
+        try:
+            resp = session.request(method, url, **kwargs)
+            if resp.status_code != 429 and resp.status_code < 500:
+                return resp
+            if attempt == max_retries:
+                return resp
+            reason = f"status {resp.status_code}"
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == max_retries:
+                raise
+            reason = str(e)
+        delay = _retry_after_seconds(resp)
+        if delay is None:
+            delay = random.uniform(0, min(MISTRAL_BACKOFF_MAX, MISTRAL_BACKOFF_BASE * 2 ** attempt))
+        logger.warning(f"Mistral {method} {url} failed ({reason}), retry {attempt + 1}/{max_retries} in {delay:.2f}s")
+        time.sleep(delay)
+
+def _run_mistral_chunk(session, base_url: str, api_key: str, pdf_bytes: bytes, chunk_start: int, chunk_end: int, timings: dict = None) -> dict:
+    """
+    Uploads one chunk PDF, runs OCR on it and returns {absolute_page_number: markdown}.
+    Raises MistralAPIError when a call still fails after its retries.
+    If given, timings is filled with the "upload" and "ocr" seconds of the chunk.
+    """
+    import time
+    
+    chunk_len = chunk_end - chunk_start
+    timings = timings if timings is not None else {}
+    started = time.time()
+    ocr_results = {}
+    file_id = None
+    try:
+        # 1. Upload chunk file to Mistral
+        headers = {"Authorization": f"Bearer {api_key}"}
+        files = {
+            "file": (f"chunk_{chunk_start}_{chunk_end}.pdf", pdf_bytes, "application/pdf")
+        }
+        logger.info(f"Uploading PDF chunk ({chunk_len} pages, {chunk_start} to {chunk_end}) to Mistral Files API...")
+        resp = _mistral_request(session, "POST", f"{base_url}/files", headers=headers, files=files, data={"purpose": "ocr"}, timeout=300)
+        
+        logger.info(f"Upload response status: {resp.status_code}")
+        if resp.status_code != 200:
+            raise MistralAPIError(f"Mistral file upload failed! Status: {resp.status_code}, Body: {resp.text[:1000]}", resp.status_code)
+        
+        upload_json = resp.json()
+        file_id = upload_json.get("id")
+        if not file_id:
+            raise MistralAPIError(f"No 'id' in Mistral upload response! Full response: {upload_json}")
+        
+        logger.info(f"Uploaded successfully, file_id: {file_id}")
+        
+        # 1.5 Get Signed URL for the file
+        logger.info(f"Fetching signed URL for file_id {file_id}...")
+        url_resp = _mistral_request(session, "GET", f"{base_url}/files/{file_id}/url", headers=headers, timeout=60)
+        
+        if url_resp.status_code != 200:
+            raise MistralAPIError(f"Failed to get signed URL! Status: {url_resp.status_code}, Body: {url_resp.text[:1000]}", url_resp.status_code)
+            
+        signed_url = url_resp.json().get("url")
+        if not signed_url:
+            raise MistralAPIError(f"No 'url' in signed URL response! Full response: {url_resp.json()}")
+        
+        # 2. Run OCR on uploaded file using the signed URL
+        timings["upload"] = time.time() - started
+        started = time.time()
+        ocr_headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        ocr_payload = {
+            "model": MISTRAL_OCR_MODEL,
+            "document": {
+                "type": "document_url",
+                "document_url": signed_url
+            }
+        }
+        logger.info(f"Triggering Mistral OCR for file_id {file_id} with signed URL...")
+        resp = _mistral_request(session, "POST", f"{base_url}/ocr", headers=ocr_headers, json=ocr_payload, timeout=600)
+        
+        logger.info(f"OCR response status: {resp.status_code}")
+        if resp.status_code != 200:
+            raise MistralAPIError(f"Mistral OCR request failed! Status: {resp.status_code}, Body: {resp.text[:2000]}", resp.status_code)
+        
+        timings["ocr"] = time.time() - started
+        ocr_json = resp.json()
+        ocr_pages = ocr_json.get("pages", [])
+        logger.info(f"OCR returned {len(ocr_pages)} pages for chunk {chunk_start}-{chunk_end}")
+        
+        if not ocr_pages:
+            # Log the full response for debugging
+            logger.warning(f"Mistral OCR returned 0 pages! Full response (truncated): {str(ocr_json)[:2000]}")
+        
+        # Parse pages
+        for page in ocr_pages:
+            page_index_in_chunk = page.get("index", 0)
+            markdown_text = page.get("markdown", "")
+            absolute_page = chunk_start + page_index_in_chunk + 1
+            ocr_results[absolute_page] = markdown_text
+            if markdown_text:
+                logger.debug(f"Page {absolute_page}: got {len(markdown_text)} chars of text")
+            else:
+                logger.warning(f"Page {absolute_page}: OCR returned empty markdown")
+    finally:
+        # 3. Always delete the file from Mistral Files API, without holding up the pipeline
+        if file_id:
+            _delete_mistral_file_later(session, base_url, api_key, file_id)
     return ocr_results
 
-def run_mistral_ocr(compiled_pdf_path: str, api_key: str, progress_callback = None) -> dict:
+class AdaptiveChunkSizer:
+    """
+    Picks the page count of the next remote OCR chunk, so that a chunk stays under max_bytes
+    and is expected to upload and OCR within target_seconds.
+
+    Bytes per page start from the average of the source PDF and are learnt from the chunks built;
+    upload seconds per byte and OCR seconds per page are learnt from the chunks completed
+    (exponentially weighted, so the estimates follow the document and the API's current speed).
+    Large scans are therefore split finer, and light documents batched more coarsely.
+    """
+    def __init__(self, max_bytes: int = None, target_seconds: float = None, min_pages: int = 1, max_pages: int = None,
+                 bytes_per_page: float = None, alpha: float = 0.3):
+        self.max_bytes = max_bytes or MISTRAL_CHUNK_MAX_BYTES
+        self.target_seconds = target_seconds or MISTRAL_CHUNK_TARGET_SECONDS
+        self.min_pages = max(1, min_pages)
+        self.max_pages = max(self.min_pages, max_pages or MISTRAL_CHUNK_MAX_PAGES)
+        self.alpha = alpha
+        self.bytes_per_page = bytes_per_page
+        self.upload_seconds_per_byte = None
+        self.ocr_seconds_per_page = None
+
+    def _ewma(self, current, sample: float) -> float:
+        return sample if current is None else current + self.alpha * (sample - current)
+
+    def record_size(self, pages: int, size: int):
+        """Records the byte size of a built chunk of pages."""
+        if pages > 0 and size > 0:
+            self.bytes_per_page = self._ewma(self.bytes_per_page, size / pages)
+
+    def record_timing(self, pages: int, size: int, upload_seconds: float = None, ocr_seconds: float = None):
+        """Records how long a completed chunk took to upload and to OCR."""
+        if upload_seconds is not None and size > 0:
+            self.upload_seconds_per_byte = self._ewma(self.upload_seconds_per_byte, upload_seconds / size)
+        if ocr_seconds is not None and pages > 0:
+            self.ocr_seconds_per_page = self._ewma(self.ocr_seconds_per_page, ocr_seconds / pages)
+
+    def seconds_per_page(self):
+        """Expected upload + OCR seconds per page, or None before the first chunk completes."""
+        if self.ocr_seconds_per_page is None and self.upload_seconds_per_byte is None:
+            return None
+        upload = (self.upload_seconds_per_byte or 0.0) * (self.bytes_per_page or 0.0)
+        return upload + (self.ocr_seconds_per_page or 0.0)
+
+    def next_pages(self, remaining: int = None) -> int:
+        pages = self.max_pages
+        if self.bytes_per_page:
+            pages = min(pages, int(self.max_bytes // self.bytes_per_page))
+        per_page = self.seconds_per_page()
+        if per_page:
+            pages = min(pages, int(self.target_seconds // per_page))
+        pages = max(self.min_pages, pages)
+        return min(pages, remaining) if remaining is not None else pages
+
+def run_mistral_ocr(
+    compiled_pdf_path: str,
+    api_key: str,
+    progress_callback = None,
+    chunk_size: int = None,
+    max_in_flight: int = None,
+    base_url: str = None,
+    page_status: dict = None,
+    chunk_sizer: AdaptiveChunkSizer = None
+) -> dict:
     """
     Runs Mistral OCR on the compiled highlights PDF, splitting into chunks if necessary
     to handle files gracefully and obey the 500 pages per minute rate limit.
+    Up to max_in_flight chunks are uploaded and OCRed concurrently over a pooled session,
+    while the next chunk PDFs are being built; base_url (MISTRAL_API_BASE) can point at a mock server.
+
+    Failed calls are retried with backoff; a chunk that still fails is split in halves and
+    resubmitted, down to single pages, and pages missing from a chunk's response are resubmitted
+    on their own. If given, page_status is filled with the final status of every page:
+    "ok", "empty" (OCR returned no text) or "failed".
+
+    Unless a fixed chunk_size (pages) is given, chunk sizes are picked by an AdaptiveChunkSizer
+    (chunk_sizer, seeded with this PDF's average page size when new), which learns from the
+    byte size of the chunks built and the upload and OCR times of the chunks completed.
     """
-    import fitz
-    import requests
-    import time
+    import queue
     import traceback
+    from concurrent.futures import ThreadPoolExecutor
     
     if not api_key:
         logger.error("Mistral OCR called without an API key!")
@@ -383,171 +1448,407 @@ def run_mistral_ocr(compiled_pdf_path: str, api_key: str, progress_callback = No
         doc.close()
         return {}
 
-    logger.info(f"Mistral OCR: Processing {num_pages} pages from {compiled_pdf}")
+    base_url = (base_url or MISTRAL_API_BASE).rstrip("/")
+    max_in_flight = max(1, max_in_flight or MISTRAL_MAX_IN_FLIGHT)
+    session = get_mistral_session()
+    logger.info(f"Mistral OCR: Processing {num_pages} pages from {compiled_pdf} ({max_in_flight} chunks in flight)")
 
     # Mistral rate limit of 500 pages per minute.
-    # We will chunk the document into pieces of at most 100 pages each,
-    # and acquire rate limit tickets before sending each chunk.
-    chunk_size = 100
+    # We will chunk the document into pieces sized by the byte budget and latency target
+    # (or chunk_size pages each), and acquire rate limit tickets before sending each chunk.
+    if chunk_size is None and chunk_sizer is None:
+        chunk_sizer = AdaptiveChunkSizer(max_pages=min(MISTRAL_CHUNK_MAX_PAGES, mistral_rate_limiter.burst))
+    if chunk_sizer is not None and chunk_sizer.bytes_per_page is None:
+        chunk_sizer.bytes_per_page = compiled_pdf.stat().st_size / num_pages
     ocr_results = {}
+    statuses = page_status if page_status is not None else {}
+    # Chunks to resubmit (split or missing pages) go ahead of new chunks taken from next_page
+    pending = []
+    next_page = 0
+    finished = queue.Queue()
+    in_flight = 0
+    completed = 0
     
     if progress_callback:
         progress_callback(0, num_pages, phase="ocr", percent=0)
 
-    # Temporary directory for chunk PDFs
-    temp_dir = compiled_pdf.parent / "mistral_chunks"
-    temp_dir.mkdir(exist_ok=True)
-    
+    def build_chunk(chunk_start, chunk_end):
+        chunk_doc = fitz.open()
+        chunk_doc.insert_pdf(doc, from_page=chunk_start, to_page=chunk_end - 1)
+        pdf_bytes = chunk_doc.tobytes()
+        chunk_doc.close()
+        return pdf_bytes
+
+    def process_chunk(pdf_bytes, chunk_start, chunk_end):
+        timings = {}
+        try:
+            chunk_results = _run_mistral_chunk(session, base_url, api_key, pdf_bytes, chunk_start, chunk_end, timings)
+            finished.put((chunk_start, chunk_end, len(pdf_bytes), timings, chunk_results, None))
+        except Exception as e:
+            finished.put((chunk_start, chunk_end, len(pdf_bytes), timings, None, e))
+
     try:
-        for chunk_start in range(0, num_pages, chunk_size):
-            chunk_end = min(chunk_start + chunk_size, num_pages)
-            chunk_len = chunk_end - chunk_start
-            
-            # Acquire rate limit for chunk_len pages
-            mistral_rate_limiter.acquire(chunk_len)
-            
-            # Save the chunk to a separate PDF
-            chunk_doc = fitz.open()
-            chunk_doc.insert_pdf(doc, from_page=chunk_start, to_page=chunk_end - 1)
-            chunk_pdf_path = temp_dir / f"chunk_{chunk_start}_{chunk_end}.pdf"
-            chunk_doc.save(str(chunk_pdf_path))
-            chunk_doc.close()
-            
-            file_id = None
-            try:
-                # 1. Upload chunk file to Mistral
-                upload_url = "https://api.mistral.ai/v1/files"
-                headers = {"Authorization": f"Bearer {api_key}"}
-                
-                with open(chunk_pdf_path, "rb") as f:
-                    files = {
-                        "file": (chunk_pdf_path.name, f, "application/pdf")
-                    }
-                    logger.info(f"Uploading PDF chunk ({chunk_len} pages, {chunk_start} to {chunk_end}) to Mistral Files API...")
-                    resp = requests.post(upload_url, headers=headers, files=files, data={"purpose": "ocr"})
-                
-                logger.info(f"Upload response status: {resp.status_code}")
-                if resp.status_code != 200:
-                    logger.error(f"Mistral file upload failed! Status: {resp.status_code}, Body: {resp.text[:1000]}")
-                    continue
-                
-                upload_json = resp.json()
-                logger.info(f"Upload response keys: {list(upload_json.keys())}")
-                file_id = upload_json.get("id")
-                if not file_id:
-                    logger.error(f"No 'id' in Mistral upload response! Full response: {upload_json}")
-                    continue
-                
-                logger.info(f"Uploaded successfully, file_id: {file_id}")
-                
-                # 1.5 Get Signed URL for the file
-                signed_url_req = f"https://api.mistral.ai/v1/files/{file_id}/url"
-                logger.info(f"Fetching signed URL for file_id {file_id}...")
-                url_resp = requests.get(signed_url_req, headers={"Authorization": f"Bearer {api_key}"})
-                
-                if url_resp.status_code != 200:
-                    logger.error(f"Failed to get signed URL! Status: {url_resp.status_code}, Body: {url_resp.text[:1000]}")
-                    continue
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="mistral-ocr") as executor:
+            # Chunk PDFs are built here (PyMuPDF stays on one thread) while earlier chunks are in flight
+            while pending or next_page < num_pages or in_flight:
+                if (pending or next_page < num_pages) and in_flight < max_in_flight:
+                    try:
+                        if pending:
+                            chunk_start, chunk_end = pending.pop(0)
+                            pdf_bytes = build_chunk(chunk_start, chunk_end)
+                        else:
+                            chunk_start = next_page
+                            if chunk_sizer is None:
+                                chunk_end = min(chunk_start + chunk_size, num_pages)
+                            else:
+                                chunk_end = chunk_start + chunk_sizer.next_pages(num_pages - chunk_start)
+                            next_page = chunk_end
+                            pdf_bytes = build_chunk(chunk_start, chunk_end)
+                            # Pages heavier than estimated: shrink the chunk to the byte budget and leave the rest for the next one
+                            while chunk_sizer is not None and len(pdf_bytes) > chunk_sizer.max_bytes and chunk_end - chunk_start > 1:
+                                chunk_sizer.record_size(chunk_end - chunk_start, len(pdf_bytes))
+                                chunk_end = chunk_start + min(chunk_end - chunk_start - 1, chunk_sizer.next_pages())
+                                next_page = chunk_end
+                                pdf_bytes = build_chunk(chunk_start, chunk_end)
+                            if chunk_sizer is not None:
+                                chunk_sizer.record_size(chunk_end - chunk_start, len(pdf_bytes))
+                    except Exception as e:
+                        logger.error(f"Failed to prepare Mistral OCR chunk {chunk_start}-{chunk_end}: {e}")
+                        statuses.update({p: "failed" for p in range(chunk_start + 1, chunk_end + 1)})
+                        completed += chunk_end - chunk_start
+                        continue
                     
-                signed_url = url_resp.json().get("url")
-                if not signed_url:
-                    logger.error(f"No 'url' in signed URL response! Full response: {url_resp.json()}")
-                    continue
-                
-                # 2. Run OCR on uploaded file using the signed URL
-                ocr_url = "https://api.mistral.ai/v1/ocr"
-                ocr_headers = {
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                }
-                ocr_payload = {
-                    "model": "mistral-ocr-latest",
-                    "document": {
-                        "type": "document_url",
-                        "document_url": signed_url
-                    }
-                }
-                logger.info(f"Triggering Mistral OCR for file_id {file_id} with signed URL...")
-                resp = requests.post(ocr_url, headers=ocr_headers, json=ocr_payload)
-                
-                logger.info(f"OCR response status: {resp.status_code}")
-                if resp.status_code != 200:
-                    logger.error(f"Mistral OCR request failed! Status: {resp.status_code}, Body: {resp.text[:2000]}")
+                    # Acquire rate limit for chunk_len pages
+                    mistral_rate_limiter.acquire(chunk_end - chunk_start)
+                    executor.submit(process_chunk, pdf_bytes, chunk_start, chunk_end)
+                    in_flight += 1
                     continue
                 
-                ocr_json = resp.json()
-                ocr_pages = ocr_json.get("pages", [])
-                logger.info(f"OCR returned {len(ocr_pages)} pages. Response top-level keys: {list(ocr_json.keys())}")
-                
-                if not ocr_pages:
-                    # Log the full response for debugging
-                    logger.warning(f"Mistral OCR returned 0 pages! Full response (truncated): {str(ocr_json)[:2000]}")
-                
-                # Parse pages
-                for page in ocr_pages:
-                    page_index_in_chunk = page.get("index", 0)
-                    markdown_text = page.get("markdown", "")
-                    absolute_page = chunk_start + page_index_in_chunk + 1
-                    ocr_results[absolute_page] = markdown_text
-                    if markdown_text:
-                        logger.debug(f"Page {absolute_page}: got {len(markdown_text)} chars of text")
-                    else:
-                        logger.warning(f"Page {absolute_page}: OCR returned empty markdown")
-                    
-                # Clean up chunk file locally
-                if chunk_pdf_path.exists():
-                    chunk_pdf_path.unlink()
+                chunk_start, chunk_end, chunk_bytes, timings, chunk_results, error = finished.get()
+                in_flight -= 1
+                chunk_pages = range(chunk_start + 1, chunk_end + 1)
+                if chunk_sizer is not None:
+                    chunk_sizer.record_timing(len(chunk_pages), chunk_bytes, timings.get("upload"), timings.get("ocr"))
+                if error is not None:
+                    logger.error(f"Error processing Mistral OCR chunk {chunk_start}-{chunk_end}: {error}")
+                    if not isinstance(error, MistralAPIError):
+                        logger.error("".join(traceback.format_exception(type(error), error, error.__traceback__)))
+                    fatal = isinstance(error, MistralAPIError) and error.status_code in MISTRAL_FATAL_STATUS
+                    if chunk_end - chunk_start > 1 and not fatal:
+                        # Retry the two halves separately, ahead of the remaining chunks
+                        middle = (chunk_start + chunk_end) // 2
+                        logger.info(f"Splitting failed Mistral OCR chunk {chunk_start}-{chunk_end} and resubmitting")
+                        pending[:0] = [(chunk_start, middle), (middle, chunk_end)]
+                        continue
+                    statuses.update({p: "failed" for p in chunk_pages})
+                    completed += len(chunk_pages)
+                else:
+                    ocr_results.update(chunk_results)
+                    missing = [p for p in chunk_pages if p not in chunk_results]
+                    if missing and chunk_end - chunk_start > 1:
+                        logger.warning(f"Mistral OCR chunk {chunk_start}-{chunk_end} returned no result for pages {missing}, resubmitting them")
+                        pending[:0] = [(p - 1, p) for p in missing]
+                    for p in chunk_pages:
+                        if p in chunk_results:
+                            statuses[p] = "ok" if chunk_results[p] else "empty"
+                        elif chunk_end - chunk_start == 1:
+                            statuses[p] = "empty"
+                    completed += len(chunk_pages) - (len(missing) if chunk_end - chunk_start > 1 else 0)
                     
-            except requests.exceptions.HTTPError as e:
-                logger.error(f"HTTP error processing Mistral OCR chunk {chunk_start}-{chunk_end}: {e}")
-                if hasattr(e, 'response') and e.response is not None:
-                    logger.error(f"Response body: {e.response.text[:2000]}")
-            except Exception as e:
-                logger.error(f"Error processing Mistral OCR chunk {chunk_start}-{chunk_end}: {e}")
-                logger.error(traceback.format_exc())
-            finally:
-                # 3. Always attempt to delete the file from Mistral Files API
-                if file_id:
-                    try:
-                        delete_url = f"https://api.mistral.ai/v1/files/{file_id}"
-                        logger.info(f"Deleting remote file {file_id} from Mistral Files API...")
-                        del_resp = requests.delete(delete_url, headers={"Authorization": f"Bearer {api_key}"})
-                        logger.info(f"Delete response status: {del_resp.status_code}")
-                    except Exception as ex:
-                        logger.warning(f"Failed to delete remote file {file_id}: {ex}")
-            
-            # Progress callback update
-            if progress_callback:
-                completed = min(chunk_end, num_pages)
-                pct = int((completed / num_pages) * 100)
-                progress_callback(completed, num_pages, phase="ocr", percent=pct)
-                
+                # Progress callback update
+                if progress_callback:
+                    pct = int((completed / num_pages) * 100)
+                    progress_callback(completed, num_pages, phase="ocr", percent=pct)
     finally:
         doc.close()
-        # Clean up temp_dir if empty or exists
-        if temp_dir.exists():
-            try:
-                shutil.rmtree(temp_dir)
-            except Exception as e:
-                logger.warning(f"Could not remove temp chunks dir {temp_dir}: {e}")
     
+    failed = sorted(p for p, status in statuses.items() if status == "failed")
     logger.info(f"Mistral OCR completed. Got results for {len(ocr_results)} pages out of {num_pages}.")
+    if failed:
+        logger.error(f"Mistral OCR failed for {len(failed)} pages after retries: {failed}")
     return ocr_results
 
-# Supported annotation types
-# 2: FreeText, 4: Square, 5: Circle, 8: Highlight, 9: Underline, 10: StrikeOut, 11: Squiggly, 15: Ink
-SUPPORTED_ANNOT_TYPES = {2, 4, 5, 8, 9, 10, 11, 15}
-
-def get_annot_type_id(annot) -> int:
-    """Helper to extract integer type ID of an annotation in a backward-compatible way."""
-    annot_type = annot.type
-    if isinstance(annot_type, tuple):
-        return annot_type[0]
-    return annot_type
+class PageTextIndex:
+    """
+    Records a page's text layer once and answers clipped text queries from that recording.
 
-def merge_rects(rects: list, threshold: float = 20.0) -> list:
+    The page is interpreted a single time into a fitz.DisplayList. Every clip query then
+    replays only the display list nodes whose bounding boxes touch the clip (MuPDF culls the
+    rest spatially) into a text page bounded by the clip rect. This is exactly what
+    page.get_text("text", clip=rect) does, minus re-walking the whole page each time,
+    so the output is byte-identical.
     """
-    Merge rectangles that are vertically close (within threshold) and on the same page.
+    # Extra points around the clip when culling display list nodes. Node bounds come from glyph
+    # outlines, which can be tighter than the character boxes MuPDF clips the text against.
+    CULL_MARGIN = 36.0
+
+    def __init__(self, page):
+        self.page = page
+        # Same as page.get_text: text coordinates are reported for the unrotated page
+        old_rotation = page.rotation
+        if old_rotation != 0:
+            page.set_rotation(0)
+        try:
+            self.display_list = page.get_displaylist()
+        finally:
+            if old_rotation != 0:
+                page.set_rotation(old_rotation)
+        self.rect = self.display_list.rect
+        self._cache = {}
+
+    def get_text(self, clip=None) -> str:
+        """Equivalent of page.get_text("text", clip=clip)."""
+        clip = fitz.Rect(clip) if clip is not None else fitz.Rect(self.rect)
+        key = tuple(clip)
+        if key not in self._cache:
+            try:
+                self._cache[key] = self._extract(clip)
+            except Exception as e:
+                logger.warning(f"Text index lookup failed, falling back to page.get_text: {e}")
+                self._cache[key] = self.page.get_text("text", clip=clip)
+        return self._cache[key]
+
+    def _extract(self, clip) -> str:
+        mupdf = fitz.mupdf
+        stext_page = mupdf.FzStextPage(mupdf.FzRect(clip.x0, clip.y0, clip.x1, clip.y1))
+        device = mupdf.fz_new_stext_device(stext_page, mupdf.FzStextOptions(fitz.TEXTFLAGS_TEXT))
+        m = self.CULL_MARGIN
+        area = mupdf.FzRect(clip.x0 - m, clip.y0 - m, clip.x1 + m, clip.y1 + m)
+        mupdf.fz_run_display_list(self.display_list.this, device, mupdf.FzMatrix(), area, mupdf.FzCookie())
+        mupdf.fz_close_device(device)
+        return fitz.TextPage(stext_page).extractText()
+
+def _load_ocr_checkpoint(checkpoint_path, num_pages: int = None, kind: str = "pages") -> dict:
+    """
+    Texts recorded by earlier runs of the same remote OCR pass, as {page_number: text}
+    (or {highlight_index: text} for kind="crops"). With num_pages, only entries recorded
+    for a document of that many pages are used.
+    """
+    results = {}
+    if checkpoint_path and Path(checkpoint_path).exists():
+        entries, _ = read_highlight_stream(checkpoint_path)
+        for entry in entries:
+            if kind in entry and (num_pages is None or entry.get(f"num_{kind}") == num_pages):
+                results.update({int(k): v for k, v in entry.get(kind, {}).items()})
+    return results
+
+def run_remote_ocr(
+    pdf_path: str,
+    ocr_engine: str,
+    task_id: str = None,
+    olmocr_server: str = "http://localhost:11434/v1",
+    olmocr_api_key: str = None,
+    olmocr_model: str = "richardyoung/olmocr2:7b-q8",
+    mistral_api_key: str = None,
+    progress_callback = None,
+    checkpoint_path: str = None,
+    chunk_pages: int = 100,
+    page_status: dict = None,
+    cache_keys: dict = None
+) -> dict:
+    """
+    Runs olmOCR or Mistral OCR on every page of a PDF and returns {page_number: text}.
+    If given, page_status is filled with the final status of every page: "ok", "empty" or "failed".
+    When the OCR cache is enabled, every page is keyed by the pixel hash of its rendering, or by
+    cache_keys ({page_number: key}, e.g. the crop keys of a compiled highlights PDF) without rendering;
+    cached pages are answered locally and only the remaining pages are sent to the engine,
+    packed into a subset PDF.
+    With a checkpoint_path, the pages are sent in chunks of chunk_pages and the results of
+    every finished chunk are appended to the checkpoint, so a rerun resumes from the first
+    unfinished chunk.
+    """
+    import uuid
+    pdf_path = Path(pdf_path)
+    model = ocr_model_name(ocr_engine, olmocr_model)
+    # One sizer for every chunk, so what the first chunks learn carries over to the next ones
+    mistral_chunk_sizer = AdaptiveChunkSizer(max_pages=min(MISTRAL_CHUNK_MAX_PAGES, mistral_rate_limiter.burst))
+    statuses = page_status if page_status is not None else {}
+
+    def run_engine(path, progress=progress_callback, engine_status=statuses):
+        if ocr_engine == "olmocr":
+            return run_olmocr_ocr(
+                compiled_pdf_path=str(path),
+                task_id=task_id or f"{pdf_path.stem}_{uuid.uuid4().hex[:8]}",
+                server=olmocr_server,
+                api_key=olmocr_api_key,
+                model=olmocr_model,
+                progress_callback=progress,
+                page_status=engine_status
+            )
+        return run_mistral_ocr(
+            compiled_pdf_path=str(path),
+            api_key=mistral_api_key,
+            progress_callback=progress,
+            page_status=engine_status,
+            chunk_sizer=mistral_chunk_sizer
+        )
+
+    cache = get_ocr_cache()
+    if not cache and not checkpoint_path:
+        return run_engine(pdf_path)
+
+    try:
+        doc = fitz.open(pdf_path)
+    except Exception as e:
+        logger.error(f"Failed to open {pdf_path} for OCR cache lookup: {e}")
+        return run_engine(pdf_path)
+
+    num_pages = len(doc)
+    ocr_results = _load_ocr_checkpoint(checkpoint_path, num_pages)
+    if ocr_results:
+        logger.info(f"Resuming {ocr_engine}: {len(ocr_results)} of {num_pages} pages recorded in {checkpoint_path}")
+    page_keys = {}
+    missing = []
+    checkpoint = None
+    try:
+        for page_index in range(num_pages):
+            page_num = page_index + 1
+            if page_num in ocr_results:
+                continue
+            if cache:
+                if cache_keys is not None:
+                    page_keys[page_num] = cache_keys.get(page_num)
+                else:
+                    page_keys[page_num] = OCRCache.make_key(doc.load_page(page_index).get_pixmap(), ocr_engine, model)
+                cached = cache.get(page_keys[page_num]) if page_keys[page_num] else None
+                if cached is not None:
+                    ocr_results[page_num] = cached
+                    continue
+            missing.append(page_num)
+        statuses.update({page_num: "ok" for page_num in ocr_results})
+        if cache:
+            logger.info(f"OCR cache: {num_pages - len(missing)} of {num_pages} pages cached or recorded for {ocr_engine}, {len(missing)} to process")
+
+        if not missing:
+            if progress_callback:
+                progress_callback(num_pages, num_pages, phase="ocr", percent=100)
+            return ocr_results
+
+        if checkpoint_path:
+            checkpoint = HighlightStreamWriter(checkpoint_path, append=True)
+            chunks = [missing[i:i + chunk_pages] for i in range(0, len(missing), chunk_pages)]
+        else:
+            chunks = [missing]
+
+        done_before = num_pages - len(missing)
+        for chunk in chunks:
+            def chunk_progress(current, total, phase="ocr", percent=None, offset=done_before):
+                if progress_callback:
+                    done = offset + current
+                    progress_callback(done, num_pages, phase="ocr", percent=int(done / num_pages * 100))
+
+            engine_status = {}
+            if len(chunk) == num_pages:
+                engine_results = run_engine(pdf_path, engine_status=engine_status)
+                page_map = {page_num: page_num for page_num in chunk}
+            else:
+                # Pack the pages that still need OCR into a subset PDF
+                subset_path = pdf_path.parent / f"{pdf_path.stem}_ocr_pending_{uuid.uuid4().hex[:8]}.pdf"
+                subset = fitz.open()
+                for page_num in chunk:
+                    subset.insert_pdf(doc, from_page=page_num - 1, to_page=page_num - 1)
+                subset.save(str(subset_path))
+                subset.close()
+                try:
+                    engine_results = run_engine(subset_path, chunk_progress, engine_status)
+                finally:
+                    subset_path.unlink(missing_ok=True)
+                page_map = {i + 1: page_num for i, page_num in enumerate(chunk)}
+
+            chunk_results = {}
+            for engine_page, page_num in page_map.items():
+                statuses[page_num] = engine_status.get(engine_page, "failed")
+                text = engine_results.get(engine_page)
+                if text is None:
+                    continue
+                ocr_results[page_num] = text
+                if text:
+                    chunk_results[page_num] = text
+                    if cache and page_keys.get(page_num):
+                        cache.put(page_keys[page_num], text, ocr_engine, model)
+            if checkpoint:
+                checkpoint.append({"num_pages": num_pages, "pages": {str(k): v for k, v in chunk_results.items()}})
+                checkpoint.sync()
+            done_before += len(chunk)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+        doc.close()
+    return ocr_results
+
+# Supported annotation types
+# 2: FreeText, 4: Square, 5: Circle, 8: Highlight, 9: Underline, 10: StrikeOut, 11: Squiggly, 15: Ink
+SUPPORTED_ANNOT_TYPES = {2, 4, 5, 8, 9, 10, 11, 15}
+
+def get_annot_type_id(annot) -> int:
+    """Helper to extract integer type ID of an annotation in a backward-compatible way."""
+    annot_type = annot.type
+    if isinstance(annot_type, tuple):
+        return annot_type[0]
+    return annot_type
+
+# PyMuPDF annotation type ids by PDF /Subtype name, for annotations read straight from the page objects
+ANNOT_SUBTYPE_IDS = {
+    "Text": 0, "Link": 1, "FreeText": 2, "Line": 3, "Square": 4, "Circle": 5, "Polygon": 6, "PolyLine": 7,
+    "Highlight": 8, "Underline": 9, "Squiggly": 10, "StrikeOut": 11, "Redact": 12, "Stamp": 13, "Caret": 14,
+    "Ink": 15, "Popup": 16, "FileAttachment": 17, "Sound": 18, "Movie": 19, "RichMedia": 20, "Widget": 21,
+    "Screen": 22, "PrinterMark": 23, "TrapNet": 24, "Watermark": 25, "3D": 26, "Projection": 27
+}
+
+def _pdf_key(doc, xref: int, key: str) -> str:
+    """Value of a key of a PDF object as PDF source, following one indirect reference."""
+    import re
+    kind, value = doc.xref_get_key(xref, key)
+    if kind == "xref":
+        ref = re.match(r"(\d+)\s+\d+\s+R", value)
+        return doc.xref_object(int(ref.group(1)), compressed=True) if ref else ""
+    return "" if kind == "null" else value
+
+def prescan_annotations(doc) -> list:
+    """
+    Indexes the annotations of every page as {"page", "type", "rect"} dicts (1-based page,
+    PyMuPDF type id, [x0, y0, x1, y1] in unrotated PDF space) by reading each page object's
+    /Annots array, without loading the pages.
+    Returns None when the document cannot be prescanned (not a PDF, inline annotation
+    dictionaries, unreadable page tree); callers then fall back to loading every page.
+    """
+    import re
+    if not doc.is_pdf:
+        return None
+    index = []
+    try:
+        for page_num in range(len(doc)):
+            annots = _pdf_key(doc, doc.page_xref(page_num), "Annots")
+            if not annots:
+                continue
+            if "<<" in annots:
+                return None
+            for ref in re.findall(r"(\d+)\s+\d+\s+R", annots):
+                xref = int(ref)
+                subtype = _pdf_key(doc, xref, "Subtype").lstrip("/")
+                if subtype not in ANNOT_SUBTYPE_IDS:
+                    continue
+                try:
+                    rect = [float(v) for v in _pdf_key(doc, xref, "Rect").strip("[] ").split()][:4]
+                except ValueError:
+                    rect = None
+                index.append({"page": page_num + 1, "type": ANNOT_SUBTYPE_IDS[subtype], "rect": rect})
+    except Exception as e:
+        logger.warning(f"Annotation prescan failed, loading every page instead: {e}")
+        return None
+    return index
+
+def annotation_page_weights(annot_index: list, types=SUPPORTED_ANNOT_TYPES) -> dict:
+    """Number of annotations of the given types per (0-indexed) page of an annotation index."""
+    weights = {}
+    for annot in annot_index:
+        if annot["type"] in types:
+            weights[annot["page"] - 1] = weights.get(annot["page"] - 1, 0) + 1
+    return weights
+
+def merge_rects(rects: list, threshold: float = 20.0) -> list:
+    """
+    Merge rectangles that are vertically close (within threshold) and on the same page.
     This groups multi-line highlights into single cohesive blocks.
     """
     if not rects:
@@ -579,34 +1880,899 @@ def merge_rects(rects: list, threshold: float = 20.0) -> list:
     merged.append(current)
     return merged
 
-def compile_highlights_pdf(extracted_data, save_images, pdf_save_dir):
-    """Compile all highlight styled crop images into a single PDF document."""
+class HighlightsPDFBuilder:
+    """Builds compiled_highlights.pdf one page per crop as highlights are emitted.
+
+    Each saved PNG is embedded as-is on a page of the same size in points (72 dpi).
+    MuPDF keeps inserted images decoded until their document is closed, so with an
+    output_path the pages are built in batches of flush_every and every batch is appended
+    to <output>.pdf.tmp with an incremental save; memory stays at one batch of crops.
+
+    With a source_doc (vector mode), highlights on pages that have a text layer are
+    added as show_pdf_page clips of the source page instead, which keeps the output
+    vector and small; only pages without text (or not drawable as clips) are rasterised.
+    """
+
+    def __init__(self, output_path=None, source_doc=None, flush_every: int = 32):
+        self.output_path = Path(output_path) if output_path else None
+        self.tmp_path = self.output_path.with_suffix(".pdf.tmp") if self.output_path else None
+        self.flush_every = flush_every
+        self.doc = fitz.open()
+        self.page_count = 0
+        self.vector_count = 0
+        self.flushed_count = 0
+        self.page_keys = []
+        self.source_doc = source_doc if source_doc is not None and source_doc.is_pdf else None
+        self._vector_pages = {}
+
+    def _can_clip(self, page_num: int) -> bool:
+        """Whether a source page has a text layer and can be shown as an upright clip."""
+        if page_num not in self._vector_pages:
+            try:
+                src_page = self.source_doc[page_num]
+                self._vector_pages[page_num] = src_page.rotation == 0 and bool(src_page.get_text("text").strip())
+            except Exception as e:
+                logger.error(f"Failed to inspect page {page_num + 1} for vector compilation: {e}")
+                self._vector_pages[page_num] = False
+        return self._vector_pages[page_num]
+
+    def add_highlight(self, result_item: dict, key=None):
+        """
+        Append the page for one highlight result, as a vector clip when possible; returns False if it
+        could not be added. The key (e.g. the highlight index) of every added page is kept in page_keys,
+        so page N of the output belongs to page_keys[N - 1].
+        """
+        added = self._add_highlight(result_item)
+        if added:
+            self.page_keys.append(key)
+        return added
+
+    def _add_highlight(self, result_item: dict) -> bool:
+        if self.source_doc is not None:
+            page_num = result_item["page"] - 1
+            if self._can_clip(page_num):
+                pages_before = self.doc.page_count
+                try:
+                    src_rect = self.source_doc[page_num].rect
+                    clip = display_crop_rect(src_rect, fitz.Rect(result_item["rect"]))
+                    page = self.doc.new_page(
+                        width=clip.width * DISPLAY_RENDER_SCALE,
+                        height=clip.height * DISPLAY_RENDER_SCALE
+                    )
+                    page.show_pdf_page(page.rect, self.source_doc, page_num, clip=clip)
+                    self.vector_count += 1
+                    self._page_added()
+                    return True
+                except Exception as e:
+                    logger.error(f"Vector clip failed for page {page_num + 1}, falling back to image: {e}")
+                    if self.doc.page_count > pages_before:
+                        self.doc.delete_page(-1)
+        if result_item.get("image_path"):
+            return self.add_image(result_item["image_path"])
+        return False
+
+    def add_image(self, image_path):
+        """Append a page for one crop image; returns False if it could not be added."""
+        p = Path(image_path)
+        pages_before = self.doc.page_count
+        try:
+            with Image.open(p) as im:  # Reads the header only
+                width, height = im.size
+            page = self.doc.new_page(width=width, height=height)
+            page.insert_image(page.rect, filename=str(p))
+        except Exception as e:
+            logger.error(f"Failed to add image to compiled PDF: {p}, error: {e}")
+            if self.doc.page_count > pages_before:
+                self.doc.delete_page(-1)
+            return False
+        self._page_added()
+        return True
+
+    def _page_added(self):
+        self.page_count += 1
+        if self.output_path and self.doc.page_count >= self.flush_every:
+            self._flush()
+
+    def _flush(self):
+        """Append the pages of the current batch to the temp file and start a new batch."""
+        if not self.doc.page_count:
+            return
+        try:
+            if not self.flushed_count:
+                self.doc.save(self.tmp_path, garbage=1, deflate=True)
+            else:
+                out = fitz.open(self.tmp_path)
+                try:
+                    out.insert_pdf(self.doc)
+                    out.save(self.tmp_path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP, deflate=True)
+                finally:
+                    out.close()
+        except Exception as e:
+            # The batch is kept and written with the next one
+            logger.error(f"Failed to write highlight pages to {self.tmp_path}: {e}")
+            return
+        self.flushed_count += self.doc.page_count
+        self.doc.close()
+        self.doc = fitz.open()
+
+    def tobytes(self) -> bytes:
+        """The PDF built so far by a builder without an output_path (e.g. to upload a batch of highlights)."""
+        return self.doc.tobytes(garbage=1, deflate=True)
+
+    def close(self):
+        """Write the PDF atomically if any pages were added; returns its path or None."""
+        try:
+            if not self.page_count:
+                return None
+            self._flush()
+            if self.flushed_count != self.page_count:
+                raise RuntimeError(f"only {self.flushed_count} of {self.page_count} pages were written")
+            os.replace(self.tmp_path, self.output_path)
+            if self.vector_count:
+                logger.info(f"Compiled {self.page_count} highlights ({self.vector_count} as vector clips) into a single PDF: {self.output_path}")
+            else:
+                logger.info(f"Compiled all {self.page_count} images into a single PDF: {self.output_path}")
+            return self.output_path
+        except Exception as e:
+            logger.error(f"Failed to compile highlight images to PDF: {e}")
+            return None
+        finally:
+            self.discard()
+
+    def discard(self):
+        """Drop the pages built so far and the temp file, if it is still there."""
+        self.doc.close()
+        if self.tmp_path and self.tmp_path.exists():
+            self.tmp_path.unlink()
+
+def compile_highlights_pdf(extracted_data, save_images, pdf_save_dir, source_doc=None):
+    """Compile all highlight styled crop images (or vector clips of source_doc) into a single PDF document."""
     if save_images and pdf_save_dir:
-        img_paths = []
+        builder = HighlightsPDFBuilder(pdf_save_dir / "compiled_highlights.pdf", source_doc)
         for item in extracted_data:
-            if item.get("image_path"):
-                p = Path(item["image_path"])
-                if p.exists():
-                    img_paths.append(p)
-                    
-        if img_paths:
+            if item.get("image_path") and Path(item["image_path"]).exists():
+                builder.add_highlight(item)
+        return builder.close()
+    return None
+
+class RemoteOCRPipeline:
+    """
+    Sends highlight crops to olmOCR or Mistral OCR in batches while the pages are still being parsed.
+
+    add() is called on the parsing thread for every highlight with a crop; every batch_size crops
+    are submitted to background threads, so remote OCR overlaps parsing instead of waiting for it.
+    PyMuPDF stays on the parsing thread: Mistral batch PDFs are built in add(), and crops of
+    Mistral batches that still failed are OCRed again by run_mistral_ocr (with its chunk splitting)
+    in finish(). finish() waits for every batch and returns {highlight_index: text}.
+    OCR progress is reported as crops done out of crops submitted so far, and statuses holds
+    the final status of every crop: "ok", "empty" (no text) or "failed".
+    """
+    def __init__(
+        self,
+        ocr_engine: str,
+        batch_size: int = 16,
+        source_doc = None,
+        task_id: str = None,
+        olmocr_server: str = "http://localhost:11434/v1",
+        olmocr_api_key: str = None,
+        olmocr_model: str = "richardyoung/olmocr2:7b-q8",
+        mistral_api_key: str = None,
+        progress_callback = None,
+        checkpoint_path: str = None
+    ):
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        self.ocr_engine = ocr_engine
+        self.batch_size = max(1, batch_size)
+        self.source_doc = source_doc
+        self.task_id = task_id
+        self.olmocr_server = olmocr_server
+        self.olmocr_api_key = olmocr_api_key
+        self.olmocr_model = olmocr_model
+        self.mistral_api_key = mistral_api_key
+        self.progress_callback = progress_callback
+        self.model = ocr_model_name(ocr_engine, olmocr_model)
+        self.results = _load_ocr_checkpoint(checkpoint_path, kind="crops")
+        if self.results:
+            logger.info(f"Resuming {ocr_engine}: {len(self.results)} crops recorded in {checkpoint_path}")
+        self.checkpoint = HighlightStreamWriter(checkpoint_path, append=True) if checkpoint_path else None
+        self.statuses = {index: "ok" for index in self.results}
+        self.failed = []
+        self.submitted = 0
+        self._batch = []
+        self._futures = []
+        self._batch_count = 0
+        self._batch_done = {}
+        self._lock = threading.Lock()
+        # olmOCR batches share the server's concurrency controller, so two of them keep it busy between batches
+        workers = MISTRAL_MAX_IN_FLIGHT if ocr_engine == "mistralocr" else 2
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{ocr_engine}-pipeline")
+
+    def add(self, index: int, result_item: dict):
+        """Queues the crop of highlight index, submitting a batch once batch_size crops are queued."""
+        if index in self.results or not result_item.get("image_path"):
+            return
+        if self.ocr_engine == "mistralocr" and get_ocr_cache():
+            key = crop_cache_key(result_item["image_path"], self.ocr_engine, self.model)
+            cached = get_ocr_cache().get(key) if key else None
+            if cached is not None:
+                self.results[index] = cached
+                self.statuses[index] = "ok"
+                return
+            result_item = {**result_item, "_cache_key": key}
+        self._batch.append((index, result_item))
+        if len(self._batch) >= self.batch_size:
+            self._submit()
+
+    def _submit(self):
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        batch_id = self._batch_count
+        self._batch_count += 1
+        with self._lock:
+            self.submitted += len(batch)
+            self._batch_done[batch_id] = 0
+        if self.ocr_engine == "olmocr":
+            self._futures.append(self._executor.submit(self._run_olmocr_batch, batch_id, batch))
+            return
+        try:
+            builder = HighlightsPDFBuilder(source_doc=self.source_doc)
             try:
-                images = []
-                for p in img_paths:
-                    try:
-                        im = Image.open(p).convert("RGB")
-                        images.append(im)
-                    except Exception as e:
-                        logger.error(f"Failed to open image for PDF compilation: {p}, error: {e}")
-                        
-                if images:
-                    pdf_output_path = pdf_save_dir / "compiled_highlights.pdf"
-                    images[0].save(pdf_output_path, save_all=True, append_images=images[1:])
-                    for im in images:
-                        im.close()
-                    logger.info(f"Compiled all {len(images)} images into a single PDF: {pdf_output_path}")
+                for index, item in batch:
+                    builder.add_highlight(item, index)
+                page_keys = builder.page_keys
+                pdf_bytes = builder.tobytes() if page_keys else None
+            finally:
+                builder.doc.close()
+        except Exception as e:
+            logger.error(f"Failed to build Mistral OCR batch of {len(batch)} highlights: {e}")
+            self.failed.extend(batch)
+            self._report(batch_id, len(batch))
+            return
+        self._futures.append(self._executor.submit(self._run_mistral_batch, batch_id, batch, page_keys, pdf_bytes))
+
+    def _report(self, batch_id: int, done: int):
+        with self._lock:
+            self._batch_done[batch_id] = done
+            done, submitted = sum(self._batch_done.values()), self.submitted
+        if self.progress_callback:
+            try:
+                self.progress_callback(done, submitted, phase="ocr", percent=int(done / submitted * 100))
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {e}")
+
+    def _record(self, texts: dict, statuses: dict):
+        with self._lock:
+            self.results.update(texts)
+            self.statuses.update(statuses)
+            if self.checkpoint:
+                recorded = {str(k): v for k, v in texts.items() if v}
+                if recorded:
+                    self.checkpoint.append({"crops": recorded})
+
+    def _run_olmocr_batch(self, batch_id: int, batch: list):
+        statuses = {}
+        texts = run_olmocr_crops(
+            {index: item["image_path"] for index, item in batch},
+            task_id=self.task_id,
+            server=self.olmocr_server,
+            api_key=self.olmocr_api_key,
+            model=self.olmocr_model,
+            progress_callback=lambda current, total, phase="ocr", percent=None: self._report(batch_id, current),
+            crop_status=statuses
+        )
+        self._record(texts, statuses)
+
+    def _run_mistral_batch(self, batch_id: int, batch: list, page_keys: list, pdf_bytes: bytes):
+        """OCRs a batch PDF; page N holds the crop of highlight page_keys[N - 1]."""
+        texts = {}
+        if page_keys:
+            try:
+                mistral_rate_limiter.acquire(len(page_keys))
+                texts = _run_mistral_chunk(get_mistral_session(), MISTRAL_API_BASE.rstrip("/"), self.mistral_api_key, pdf_bytes, 0, len(page_keys))
+            except Exception as e:
+                logger.error(f"Mistral OCR batch of {len(page_keys)} highlights failed, retrying it after parsing: {e}")
+        results = {index: texts[i + 1] for i, index in enumerate(page_keys) if i + 1 in texts}
+        cache = get_ocr_cache()
+        if cache:
+            for index, item in batch:
+                if results.get(index) and item.get("_cache_key"):
+                    cache.put(item["_cache_key"], results[index], self.ocr_engine, self.model)
+        with self._lock:
+            self.failed.extend((index, item) for index, item in batch if index not in results)
+        self._record(results, {index: "ok" if text else "empty" for index, text in results.items()})
+        self._report(batch_id, len(batch))
+
+    def _retry_failed_mistral(self):
+        """OCRs the crops of failed Mistral batches again through run_mistral_ocr, on this thread."""
+        import uuid
+        failed = sorted(self.failed, key=lambda entry: entry[0])
+        self.failed = []
+        builder = HighlightsPDFBuilder(source_doc=self.source_doc)
+        retry_path = Path(failed[0][1]["image_path"]).parent / f"_ocr_retry_{uuid.uuid4().hex[:8]}.pdf"
+        texts = {}
+        statuses = {}
+        try:
+            for index, item in failed:
+                builder.add_highlight(item, index)
+            if builder.page_keys:
+                builder.doc.save(str(retry_path))
+                texts = run_mistral_ocr(str(retry_path), self.mistral_api_key, page_status=statuses)
+        except Exception as e:
+            logger.error(f"Retrying {len(failed)} Mistral OCR highlights failed: {e}")
+        finally:
+            builder.doc.close()
+            retry_path.unlink(missing_ok=True)
+        self._record(
+            {index: texts[i + 1] for i, index in enumerate(builder.page_keys) if i + 1 in texts},
+            {index: statuses.get(i + 1, "failed") for i, index in enumerate(builder.page_keys)}
+        )
+
+    def finish(self) -> dict:
+        """Submits the last batch, waits for every batch and returns {highlight_index: text}."""
+        self._submit()
+        try:
+            for future in self._futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"{self.ocr_engine} pipeline batch failed: {e}")
+            if self.failed and self.ocr_engine == "mistralocr":
+                self._retry_failed_mistral()
+        finally:
+            self.close()
+        return self.results
+
+    def close(self, cancel: bool = False):
+        self._executor.shutdown(wait=True, cancel_futures=cancel)
+        if self.checkpoint:
+            self.checkpoint.close()
+
+def process_page_highlights(
+    page,
+    page_num: int,
+    merge_threshold: float = 20.0,
+    save_images: bool = True,
+    pdf_save_dir: Path = None,
+    context: bool = False,
+    context_margin: float = 80.0,
+    ocr_engine: str = "auto",
+    ocr_batcher: EasyOCRBatcher = None
+) -> list:
+    """
+    Extracts the merged highlight blocks of a single (0-indexed) page.
+    Returns the page's result items in highlight order. When an ocr_batcher is given, EasyOCR
+    crops are queued on it and the items get their OCR text once the batcher is flushed.
+    """
+    # Get all annotation rects that are of supported types
+    rects = []
+    for annot in page.annots():
+        type_id = get_annot_type_id(annot)
+        if type_id in SUPPORTED_ANNOT_TYPES:
+            rect = annot.rect
+            if rect.width > 0 and rect.height > 0:
+                rects.append(rect)
+                
+    if not rects:
+        return []
+        
+    # Merge close annotation rects into single blocks
+    merged_rects = merge_rects(rects, threshold=merge_threshold)
+    logger.info(f"Page {page_num + 1}: Found {len(rects)} highlights, merged into {len(merged_rects)} blocks")
+    
+    if save_images and pdf_save_dir:
+        pdf_save_dir.mkdir(parents=True, exist_ok=True)
+        
+    page_rect = page.rect
+    text_index = PageTextIndex(page)
+    planner = PageRenderPlanner(page, annots=True)
+        
+    # First pass: native text and OCR decisions, registering every region that needs rendering
+    plans = []
+    for idx, rect in enumerate(merged_rects):
+        # Extract native text
+        native_text = ""
+        try:
+            native_text = text_index.get_text(rect).strip()
+        except Exception as e:
+            logger.error(f"Native text extraction failed for page {page_num + 1}: {e}")
+        
+        native_context = ""
+        if context:
+            try:
+                c_rect = fitz.Rect(
+                    page_rect.x0,
+                    max(page_rect.y0, rect.y0 - context_margin),
+                    page_rect.x1,
+                    min(page_rect.y1, rect.y1 + context_margin)
+                )
+                native_context = text_index.get_text(c_rect).strip()
+            except Exception as e:
+                logger.error(f"Native context failed for page {page_num + 1}: {e}")
+
+        run_easyocr_for_quote = False
+        run_easyocr_for_context = False
+
+        if ocr_engine == "easyocr":
+            run_easyocr_for_quote = True
+            if context:
+                run_easyocr_for_context = True
+        elif ocr_engine == "auto":
+            if not native_text or native_text == "[No selectable text found]" or has_arabic(native_text):
+                run_easyocr_for_quote = True
+            if context and (not native_context or native_context == "[No selectable context found]" or has_arabic(native_context)):
+                run_easyocr_for_context = True
+        elif ocr_engine == "olmocr":
+            if context and (not native_context or native_context == "[No selectable context found]" or has_arabic(native_context)):
+                run_easyocr_for_context = True
+
+        # Visual image (with highlights) at display scale, OCR regions at EasyOCR's scale
+        if save_images:
+            planner.request(DISPLAY_RENDER_SCALE, display_crop_rect(page_rect, rect))
+        ocr_jobs = []
+        if run_easyocr_for_quote:
+            ocr_jobs.append(("text", easyocr_crop_rect(page_rect, rect)))
+        if run_easyocr_for_context:
+            ocr_jobs.append(("context", easyocr_crop_rect(page_rect, rect, context_margin=context_margin)))
+        for _, crop_rect in ocr_jobs:
+            planner.request(EASYOCR_RENDER_SCALE, crop_rect)
+        plans.append((rect, native_text, native_context, ocr_jobs))
+
+    try:
+        planner.render()
+    except Exception as e:
+        logger.error(f"Failed to render page {page_num + 1}: {e}")
+        planner = None
+        
+    # Second pass: crops, OCR and result items
+    page_results = []
+    for idx, (rect, native_text, native_context, ocr_jobs) in enumerate(plans):
+        highlight_id = idx + 1
+        image_path = None
+        
+        # Save visual image (with highlights) if save_images is enabled
+        if save_images and planner:
+            try:
+                styled_img = planner.crop(DISPLAY_RENDER_SCALE, display_crop_rect(page_rect, rect))
+                image_filename = f"page_{page_num + 1}_highlight_{highlight_id}.png"
+                img_path = pdf_save_dir / image_filename
+                styled_img.save(img_path, format="PNG")
+                image_path = str(img_path)
+            except Exception as e:
+                logger.error(f"Error saving image for page {page_num + 1}, highlight {highlight_id}: {e}")
+
+        # Determine text content using fallback logic
+        extracted_text = native_text or "[No selectable text found]"
+        context_text = native_context or "[No selectable context found]" if context else None
+        current_engine = "native"
+
+        if not planner:
+            ocr_jobs = []
+        if any(key == "text" for key, _ in ocr_jobs):
+            current_engine = "easyocr"
+
+        result_item = {
+            "page": page_num + 1,
+            "rect": [rect.x0, rect.y0, rect.x1, rect.y1],
+            "image_path": image_path,
+            "text": extracted_text,
+            "ocr_engine": current_engine
+        }
+        if context:
+            result_item["context"] = context_text
+
+        for key, crop_rect in ocr_jobs:
+            try:
+                crop_img = planner.crop(EASYOCR_RENDER_SCALE, crop_rect)
             except Exception as e:
-                logger.error(f"Failed to compile highlight images to PDF: {e}")
+                logger.error(f"EasyOCR extraction failed: {e}")
+                result_item[key] = "[EasyOCR Extraction Failed]"
+                continue
+            if ocr_batcher:
+                ocr_batcher.add(crop_img, result_item, key)
+            else:
+                result_item[key] = extract_text_via_easyocr(crop_img)
+        page_results.append(result_item)
+
+    return page_results
+
+_PAGE_WORKER_DOC = None
+
+def _init_page_worker(pdf_path: str):
+    """Process pool initializer: every worker opens its own fitz document."""
+    global _PAGE_WORKER_DOC
+    _PAGE_WORKER_DOC = fitz.open(pdf_path)
+
+def _run_pages(load_page, page_nums, page_options: dict, batch_options: dict = None, on_page_start = None, annotated_pages = None):
+    """
+    Processes the given pages and yields (page_num, page_results) in order.
+    With batch_options, EasyOCR crops are collected across pages and each page is held back
+    until the batch holding its crops has been flushed.
+    Pages missing from annotated_pages (when given) are yielded with no results without being loaded.
+    """
+    batcher = EasyOCRBatcher(**batch_options) if batch_options else None
+    held = []
+    for page_num in page_nums:
+        if on_page_start:
+            on_page_start(page_num)
+        if annotated_pages is not None and page_num not in annotated_pages:
+            held.append((page_num, []))
+            continue
+        page = load_page(page_num)
+        held.append((page_num, process_page_highlights(page, page_num, ocr_batcher=batcher, **page_options)))
+        if batcher is None or batcher.should_flush():
+            if batcher:
+                batcher.flush()
+            yield from held
+            held = []
+    if batcher:
+        batcher.flush()
+    yield from held
+
+def _process_page_range(page_nums: list, page_options: dict, batch_options: dict = None, annotated_pages = None) -> list:
+    """Runs inside a pool worker and returns (page_num, page_results) pairs for the given pages."""
+    return list(_run_pages(_PAGE_WORKER_DOC.load_page, page_nums, page_options, batch_options, annotated_pages=annotated_pages))
+
+def _weighted_page_chunks(page_nums: list, weights: dict, num_chunks: int) -> list:
+    """Splits page_nums into contiguous chunks of roughly equal total weight (pages without weight are free)."""
+    import math
+    target = max(1, math.ceil(sum(weights.get(n, 0) for n in page_nums) / num_chunks))
+    chunks = [[]]
+    chunk_weight = 0
+    for page_num in page_nums:
+        weight = weights.get(page_num, 0)
+        if weight and chunk_weight >= target:
+            chunks.append([])
+            chunk_weight = 0
+        chunks[-1].append(page_num)
+        chunk_weight += weight
+    return chunks
+
+def iter_page_highlights(doc, pdf_path: Path, page_options: dict, workers: int = None, progress_callback = None, batch_options: dict = None, start_page: int = 0, page_weights: dict = None):
+    """
+    Yields (page_num, page_results) for every page of the document from start_page on, in page order.
+    With workers > 1 the page range is split into contiguous chunks that are processed
+    by a process pool, and the results are merged back in page order.
+    batch_options (batch_size, max_batch_pixels) enable batched EasyOCR inference.
+    page_weights ({page_num: supported annotation count}, see prescan_annotations) restricts the
+    work to annotated pages, balances the chunks by annotation count and drives the progress percentage.
+    """
+    total_pages = len(doc)
+    if page_weights is not None:
+        total_weight = sum(page_weights.values())
+        weight_done = sum(w for n, w in page_weights.items() if n < start_page)
+    else:
+        total_weight = total_pages
+        weight_done = start_page
+
+    def report(current, weight):
+        if progress_callback:
+            try:
+                pct = int(weight / total_weight * 100) if total_weight else 100
+                progress_callback(current, total_pages, phase="parsing", percent=pct)
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {e}")
+
+    def weight_of(page_num):
+        return page_weights.get(page_num, 0) if page_weights is not None else 1
+
+    page_nums = list(range(start_page, total_pages))
+    annotated = [n for n in page_nums if n in page_weights] if page_weights is not None else page_nums
+    annotated_pages = set(page_weights) if page_weights is not None else None
+
+    if not workers or workers <= 1 or len(annotated) <= 1:
+        def on_page_start(page_num):
+            nonlocal weight_done
+            report(page_num + 1, weight_done)
+            weight_done += weight_of(page_num)
+        yield from _run_pages(doc.load_page, page_nums, page_options, batch_options, on_page_start=on_page_start, annotated_pages=annotated_pages)
+        return
+
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    # Several chunks per worker keep the pool balanced and the progress updates frequent
+    chunks = _weighted_page_chunks(page_nums, {n: weight_of(n) for n in annotated}, workers * 4)
+    logger.info(f"Parsing {len(annotated)} of {len(page_nums)} pages with {workers} worker processes in {len(chunks)} chunks")
+
+    # EasyOCR/torch are not fork-safe, so the workers are always spawned
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_page_worker, initargs=(str(pdf_path),)) as executor:
+        pending = {}
+        futures = {}
+        pages_done = start_page
+        for i, chunk in enumerate(chunks):
+            chunk_annotated = annotated_pages & set(chunk) if annotated_pages is not None else None
+            if chunk_annotated is not None and not chunk_annotated:
+                # Nothing to parse, so the chunk is resolved without a round trip to the pool
+                pending[i] = [(page_num, []) for page_num in chunk]
+                pages_done += len(chunk)
+            else:
+                futures[executor.submit(_process_page_range, chunk, page_options, batch_options, chunk_annotated)] = i
+        next_chunk = 0
+        for future in as_completed(futures):
+            chunk_idx = futures[future]
+            pending[chunk_idx] = future.result()
+            pages_done += len(chunks[chunk_idx])
+            weight_done += sum(weight_of(n) for n in chunks[chunk_idx])
+            report(pages_done, weight_done)
+            # Release finished chunks in page order
+            while next_chunk in pending:
+                for page_num, page_results in pending.pop(next_chunk):
+                    yield page_num, page_results
+                next_chunk += 1
+
+def highlight_stream_path(output_json_path) -> Path:
+    """Path of the NDJSON stream that backs a JSON output file (foo.json -> foo.jsonl)."""
+    output_json_path = Path(output_json_path)
+    if output_json_path.suffix == ".json":
+        return output_json_path.with_suffix(".jsonl")
+    return Path(f"{output_json_path}.jsonl")
+
+class HighlightStreamWriter:
+    """
+    Append-only NDJSON writer for highlight records.
+    Every highlight is written as one line and flushed immediately so the stream can be tailed,
+    while fsync is batched to every `fsync_every` records or `fsync_interval` seconds.
+    Later changes to an already written highlight (e.g. OCR post-passes) are appended as
+    {"_update": index, ...fields} lines instead of rewriting the file.
+    With append=True an existing file is extended instead of truncated (used for checkpoints).
+    """
+    def __init__(self, path, fsync_every: int = 50, fsync_interval: float = 2.0, append: bool = False):
+        import time
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.count = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._f = open(self.path, "a" if append else "w", encoding="utf-8")
+
+    def append(self, record: dict):
+        self._write_line(record)
+        self.count += 1
+
+    def update(self, index: int, **fields):
+        self._write_line({"_update": index, **fields})
+
+    def _write_line(self, obj: dict):
+        import time
+        try:
+            self._f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            self._f.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+        except Exception as e:
+            logger.error(f"Failed to append to highlight stream {self.path}: {e}")
+
+    def sync(self):
+        import time
+        if self._unsynced:
+            os.fsync(self._f.fileno())
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._f.closed:
+            return
+        try:
+            self.sync()
+        finally:
+            self._f.close()
+
+def read_highlight_stream(stream_path, offset: int = 0) -> tuple:
+    """
+    Reads the complete lines appended to a highlight stream since byte `offset`.
+    Returns (entries, new_offset). A partially written trailing line is left for the next call,
+    so this can be polled while the stream is still being written.
+    """
+    stream_path = Path(stream_path)
+    if not stream_path.exists():
+        return [], offset
+    entries = []
+    with open(stream_path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            if line.strip():
+                entries.append(json.loads(line))
+    return entries, offset
+
+def load_highlight_stream(stream_path) -> list:
+    """Replays a highlight stream (records plus their updates) into the list of highlights."""
+    entries, _ = read_highlight_stream(stream_path)
+    highlights = []
+    for entry in entries:
+        if "_update" in entry:
+            index = entry.pop("_update")
+            if 0 <= index < len(highlights):
+                highlights[index].update(entry)
+        else:
+            highlights.append(entry)
+    return highlights
+
+def compact_highlight_stream(stream_path, output_json_path, remove_stream: bool = True) -> list:
+    """
+    Compacts a highlight stream into the JSON array format of output_json_path.
+    The JSON file is replaced atomically, so readers never see a half written file.
+    """
+    highlights = load_highlight_stream(stream_path)
+    if highlights:
+        tmp_path = Path(f"{output_json_path}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(highlights, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, output_json_path)
+    if remove_stream:
+        Path(stream_path).unlink(missing_ok=True)
+    return highlights
+
+def hash_file(path, chunk_size: int = 1 << 20) -> str:
+    """Returns the SHA-256 hex digest of a file's content."""
+    import hashlib
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def ocr_model_name(ocr_engine: str, olmocr_model: str = None) -> str:
+    """Name of the OCR model whose output an engine setting depends on."""
+    if ocr_engine == "olmocr":
+        return olmocr_model
+    if ocr_engine == "mistralocr":
+        return MISTRAL_OCR_MODEL
+    if ocr_engine in ("auto", "easyocr"):
+        return _easyocr_model()
+    return None
+
+def document_cache_key(pdf_hash: str, kind: str, **params) -> str:
+    """Cache key of a document result: the PDF content hash plus every parameter that affects the output."""
+    import hashlib
+    payload = json.dumps({"pdf": pdf_hash, "kind": kind, "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResultCache:
+    """
+    Content-addressed on-disk cache of whole-document results.
+
+    Every entry is a directory named after its key holding meta.json (the result plus
+    bookkeeping) and an artifacts/ folder (highlight crops, compiled PDF). Entries are written
+    to a temp directory and renamed into place, so concurrent writers never expose partial
+    entries. The total size is bounded by evicting the least recently used entries;
+    hits refresh an entry by touching its meta.json.
+    """
+    def __init__(self, cache_dir, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def get(self, key: str):
+        """Returns (entry_dir, meta) for a cached key, or None."""
+        entry_dir = self.cache_dir / key
+        meta_path = entry_dir / "meta.json"
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            os.utime(meta_path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {entry_dir}: {e}")
+            return None
+        return entry_dir, meta
+
+    def put(self, key: str, result, artifacts: list = None, **extra_meta):
+        """Stores a result and copies its artifact files into the cache."""
+        import uuid
+        entry_dir = self.cache_dir / key
+        if entry_dir.exists():
+            return
+        tmp_dir = self.cache_dir / f".{key}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            artifacts_dir = tmp_dir / "artifacts"
+            artifacts_dir.mkdir(parents=True)
+            size = 0
+            for artifact in artifacts or []:
+                artifact = Path(artifact)
+                shutil.copy2(artifact, artifacts_dir / artifact.name)
+                size += artifact.stat().st_size
+            meta = {"key": key, "result": result, **extra_meta}
+            meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+            meta["size"] = size + len(meta_bytes)
+            with open(tmp_dir / "meta.json", "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.rename(tmp_dir, entry_dir)
+        except OSError as e:
+            # Another process stored the same key first
+            if not entry_dir.exists():
+                logger.error(f"Failed to store cache entry {key}: {e}")
+        except Exception as e:
+            logger.error(f"Failed to store cache entry {key}: {e}")
+        finally:
+            if tmp_dir.exists():
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for meta_path in self.cache_dir.glob("*/meta.json"):
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    size = json.load(f).get("size", 0)
+                entries.append((meta_path.stat().st_mtime, size, meta_path.parent))
+                total += size
+            except Exception:
+                continue
+        entries.sort()
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            logger.info(f"Evicting result cache entry {entry_dir.name} ({size} bytes)")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+class ExtractionCheckpoint:
+    """
+    Page-level checkpoint of one extraction (same PDF and settings), kept as two NDJSON files.
+
+    <key>.pages.jsonl gets a {"page": n, "results": [...]} record as every page is finished,
+    in page order, and <key>.ocr.jsonl the finished chunks of the remote OCR post-pass
+    (written by run_remote_ocr). Both are removed once the extraction completes.
+    """
+    def __init__(self, checkpoint_dir, key: str):
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.pages_path = self.checkpoint_dir / f"{key}.pages.jsonl"
+        self.ocr_path = self.checkpoint_dir / f"{key}.ocr.jsonl"
+        self._writer = None
+
+    def load_pages(self) -> list:
+        """
+        Results of the leading run of finished pages as [(page_num, page_results)].
+        A page whose saved crops no longer exist ends the run and is processed again.
+        """
+        if not self.pages_path.exists():
+            return []
+        entries, _ = read_highlight_stream(self.pages_path)
+        by_page = {entry["page"]: entry["results"] for entry in entries if "page" in entry}
+        done = []
+        while len(done) in by_page:
+            page_results = by_page[len(done)]
+            if any(item.get("image_path") and not Path(item["image_path"]).exists() for item in page_results):
+                break
+            done.append((len(done), page_results))
+        return done
+
+    def record_page(self, page_num: int, page_results: list):
+        if self._writer is None:
+            self._writer = HighlightStreamWriter(self.pages_path, append=True)
+        self._writer.append({"page": page_num, "results": page_results})
+
+    def close(self):
+        if self._writer:
+            self._writer.close()
+
+    def remove(self):
+        self.close()
+        self.pages_path.unlink(missing_ok=True)
+        self.ocr_path.unlink(missing_ok=True)
+
+def _has_ocr_failures(texts) -> bool:
+    """Results holding OCR failure markers are not worth caching."""
+    return any(text and "Extraction Failed" in text for text in texts)
+
+def _remote_ocr_succeeded(statuses: dict, keys) -> bool:
+    """Whether remote OCR answered every key ("ok" or "empty"); results with failed or missing keys are not cached."""
+    return all(statuses.get(key) in ("ok", "empty") for key in keys)
 
 def extract_highlights(
     pdf_path: str,
@@ -622,10 +2788,29 @@ def extract_highlights(
     olmocr_api_key: str = None,
     olmocr_model: str = "richardyoung/olmocr2:7b-q8",
     ocr_engine: str = "auto",
-    mistral_api_key: str = None
+    mistral_api_key: str = None,
+    workers: int = None,
+    ocr_batch_size: int = None,
+    ocr_batch_max_pixels: int = 16_000_000,
+    cache_dir: str = None,
+    cache_max_bytes: int = 2 * 1024 ** 3,
+    compiled_pdf_mode: str = "raster",
+    checkpoint_dir: str = None,
+    pipeline_ocr: bool = False,
+    pipeline_batch_size: int = 16
 ) -> list:
     """
     Core function to process the PDF and extract highlights with auto-detection.
+    Pass workers=N to parse the pages with a pool of N processes, and ocr_batch_size=N
+    to run EasyOCR on the crops in size-bucketed batches of up to N images.
+    With a cache_dir, results of identical PDFs and settings are served from the cache.
+    compiled_pdf_mode="vector" builds the compiled PDF (Mistral OCR's input) from vector
+    clips of the source pages, rasterising only pages without a text layer; olmOCR is sent
+    the crops themselves.
+    With a checkpoint_dir, finished pages and remote OCR chunks are recorded as they complete,
+    and a rerun on the same PDF and settings resumes from the first unfinished page.
+    With pipeline_ocr, olmOCR/Mistral OCR runs on batches of pipeline_batch_size crops while the
+    remaining pages are still being parsed (see RemoteOCRPipeline); results are the same.
     """
     # For backward compatibility, handle `olmocr` parameter
     if olmocr is True:
@@ -637,240 +2822,398 @@ def extract_highlights(
     if not pdf_path.exists():
         raise FileNotFoundError(f"PDF file not found: {pdf_path}")
         
+    # Prepare folder to save cropped highlight images if required
+    pdf_save_dir = None
+    if save_images:
+        pdf_save_dir = Path(save_dir) / pdf_path.stem
+        
+    # Settings that determine the result, shared by the result cache and checkpoint keys
+    result_params = {
+        "merge_threshold": merge_threshold,
+        "context": context,
+        "context_margin": context_margin,
+        "ocr_engine": ocr_engine,
+        "model": ocr_model_name(ocr_engine, olmocr_model),
+        "save_images": save_images,
+        "compiled_pdf_mode": compiled_pdf_mode
+    }
+    pdf_hash = hash_file(pdf_path) if cache_dir or checkpoint_dir else None
+        
+    # Serve identical documents processed with the same settings from the result cache
+    cache = None
+    cache_key = None
+    if cache_dir:
+        try:
+            cache = ResultCache(cache_dir, cache_max_bytes)
+            cache_key = document_cache_key(pdf_hash, "highlights", **result_params)
+            cached = cache.get(cache_key)
+            if cached:
+                logger.info(f"Result cache hit for {pdf_path.name} ({cache_key[:12]})")
+                return _restore_cached_highlights(*cached, pdf_save_dir, output_json_path, progress_callback)
+        except Exception as e:
+            logger.error(f"Result cache lookup failed: {e}")
+            cache = None
+
     try:
         doc = fitz.open(pdf_path)
     except Exception as e:
         logger.error(f"Failed to open PDF file {pdf_path}: {e}")
         raise
         
-    # Prepare folder to save cropped highlight images if required
-    pdf_save_dir = None
-    if save_images:
-        pdf_save_dir = Path(save_dir) / pdf_path.stem
-        
-    import json
-    extracted_data = []
     total_pages = len(doc)
     
-    for page_num in range(total_pages):
-        if progress_callback:
-            try:
-                pct = int((page_num + 1) / total_pages * 100)
-                progress_callback(page_num + 1, total_pages, phase="parsing", percent=pct)
-            except Exception as e:
-                logger.warning(f"Progress callback failed: {e}")
-                
-        page = doc.load_page(page_num)
-        
-        # Get all annotation rects that are of supported types
-        rects = []
-        for annot in page.annots():
-            type_id = get_annot_type_id(annot)
-            if type_id in SUPPORTED_ANNOT_TYPES:
-                rect = annot.rect
-                if rect.width > 0 and rect.height > 0:
-                    rects.append(rect)
-                    
-        if not rects:
-            continue
-            
-        # Merge close annotation rects into single blocks
-        merged_rects = merge_rects(rects, threshold=merge_threshold)
-        logger.info(f"Page {page_num + 1}: Found {len(rects)} highlights, merged into {len(merged_rects)} blocks")
-        
-        if save_images and pdf_save_dir:
-            pdf_save_dir.mkdir(parents=True, exist_ok=True)
-            
-        page_rect = page.rect
-        
-        # Render page at zoom 4.0 if save_images is True OR we might need OCR.
-        need_rendering = save_images or ocr_engine in ("auto", "easyocr", "olmocr", "mistralocr")
-        img_annots = None
-        if need_rendering:
-            try:
-                pix_annots = page.get_pixmap(matrix=fitz.Matrix(4.0, 4.0), annots=True)
-                img_annots = Image.frombytes("RGB", [pix_annots.width, pix_annots.height], pix_annots.samples)
-            except Exception as e:
-                logger.error(f"Failed to render page {page_num + 1}: {e}")
-            
-        for idx, rect in enumerate(merged_rects):
-            highlight_id = idx + 1
-            image_path = None
-            
-            # Save visual image (with highlights) if save_images is enabled
-            if save_images and img_annots:
-                try:
-                    vertical_margin = 15.0  # PDF points of extra padding top/bottom
-                    crop_y0 = max(page_rect.y0, rect.y0 - vertical_margin)
-                    crop_y1 = min(page_rect.y1, rect.y1 + vertical_margin)
-                    
-                    crop_box = (
-                        0.0,  # Full page width starting from left
-                        (crop_y0 - page_rect.y0) * 4.0,
-                        img_annots.width,  # Full page width ending at right
-                        (crop_y1 - page_rect.y0) * 4.0
-                    )
-                    styled_img = img_annots.crop(crop_box)
-                    image_filename = f"page_{page_num + 1}_highlight_{highlight_id}.png"
-                    img_path = pdf_save_dir / image_filename
-                    styled_img.save(img_path, format="PNG")
-                    image_path = str(img_path)
-                except Exception as e:
-                    logger.error(f"Error saving image for page {page_num + 1}, highlight {highlight_id}: {e}")
-            
-            # Extract native text
-            native_text = ""
-            try:
-                native_text = page.get_text("text", clip=rect).strip()
-            except Exception as e:
-                logger.error(f"Native text extraction failed for page {page_num + 1}: {e}")
-            
-            native_context = ""
-            if context:
-                try:
-                    c_rect = fitz.Rect(
-                        page_rect.x0,
-                        max(page_rect.y0, rect.y0 - context_margin),
-                        page_rect.x1,
-                        min(page_rect.y1, rect.y1 + context_margin)
-                    )
-                    native_context = page.get_text("text", clip=c_rect).strip()
-                except Exception as e:
-                    logger.error(f"Native context failed for page {page_num + 1}: {e}")
-
-            # Determine text content using fallback logic
-            extracted_text = native_text or "[No selectable text found]"
-            context_text = native_context or "[No selectable context found]" if context else None
-            current_engine = "native"
-
-            run_easyocr_for_quote = False
-            run_easyocr_for_context = False
-
-            if ocr_engine == "easyocr":
-                run_easyocr_for_quote = True
-                if context:
-                    run_easyocr_for_context = True
-            elif ocr_engine == "auto":
-                if not native_text or native_text == "[No selectable text found]" or has_arabic(native_text):
-                    run_easyocr_for_quote = True
-                if context and (not native_context or native_context == "[No selectable context found]" or has_arabic(native_context)):
-                    run_easyocr_for_context = True
-            elif ocr_engine == "olmocr":
-                if context and (not native_context or native_context == "[No selectable context found]" or has_arabic(native_context)):
-                    run_easyocr_for_context = True
-
-            if run_easyocr_for_quote and img_annots:
-                extracted_text = extract_text_via_easyocr(img_annots, page_rect, rect)
-                current_engine = "easyocr"
-                
-            if run_easyocr_for_context and img_annots:
-                context_text = extract_text_via_easyocr(img_annots, page_rect, rect, context_margin=context_margin)
-
-            result_item = {
-                "page": page_num + 1,
-                "rect": [rect.x0, rect.y0, rect.x1, rect.y1],
-                "image_path": image_path,
-                "text": extracted_text,
-                "ocr_engine": current_engine
-            }
-            if context:
-                result_item["context"] = context_text
-            extracted_data.append(result_item)
-            
-            # Save repeatedly to disk after each processed highlight block
-            if output_json_path:
-                try:
-                    with open(output_json_path, "w", encoding="utf-8") as f:
-                        json.dump(extracted_data, f, ensure_ascii=False, indent=2)
-                except Exception as e:
-                    logger.error(f"Failed to save repeated JSON update: {e}")
+    # Pages finished by an interrupted run of the same extraction are replayed from its checkpoint
+    checkpoint = None
+    resumed_pages = []
+    if checkpoint_dir:
+        try:
+            checkpoint = ExtractionCheckpoint(
+                checkpoint_dir,
+                document_cache_key(pdf_hash, "checkpoint", save_dir=str(pdf_save_dir), **result_params)
+            )
+            resumed_pages = checkpoint.load_pages()
+            if resumed_pages:
+                logger.info(f"Resuming {pdf_path.name} from page {len(resumed_pages) + 1} of {total_pages}")
+        except Exception as e:
+            logger.error(f"Failed to load extraction checkpoint: {e}")
+            checkpoint = None
+            resumed_pages = []
+    
+    extracted_data = []
+    page_options = {
+        "merge_threshold": merge_threshold,
+        "save_images": save_images,
+        "pdf_save_dir": pdf_save_dir,
+        "context": context,
+        "context_margin": context_margin,
+        "ocr_engine": ocr_engine
+    }
+    batch_options = None
+    if ocr_batch_size:
+        batch_options = {"batch_size": ocr_batch_size, "max_batch_pixels": ocr_batch_max_pixels}
+    
+    # Highlights are streamed to <output>.jsonl as they are found and compacted into the JSON array at the end
+    stream = None
+    if output_json_path:
+        try:
+            stream = HighlightStreamWriter(highlight_stream_path(output_json_path))
+        except Exception as e:
+            logger.error(f"Failed to open highlight stream for {output_json_path}: {e}")
+    
+    # Crops are appended to the compiled PDF as they arrive instead of being reloaded at the end
+    pdf_builder = None
+    if save_images and pdf_save_dir:
+        pdf_builder = HighlightsPDFBuilder(
+            pdf_save_dir / "compiled_highlights.pdf",
+            source_doc=doc if compiled_pdf_mode == "vector" else None
+        )
+    
+    # Remote OCR of the crops, started while parsing continues
+    remote_engine = ocr_engine if ocr_engine in ("olmocr", "mistralocr") and save_images and pdf_save_dir else None
+    ocr_pipeline = None
+    if pipeline_ocr and remote_engine:
+        import uuid
+        ocr_pipeline = RemoteOCRPipeline(
+            remote_engine,
+            batch_size=pipeline_batch_size,
+            source_doc=doc if compiled_pdf_mode == "vector" else None,
+            task_id=f"{pdf_path.stem}_{uuid.uuid4().hex[:8]}",
+            olmocr_server=olmocr_server,
+            olmocr_api_key=olmocr_api_key,
+            olmocr_model=olmocr_model,
+            mistral_api_key=mistral_api_key,
+            progress_callback=progress_callback,
+            checkpoint_path=checkpoint.ocr_path if checkpoint else None
+        )
+    
+    # Annotated pages are found up front from the page objects, so annotation-free pages are never loaded
+    page_weights = None
+    annot_index = prescan_annotations(doc)
+    if annot_index is not None:
+        page_weights = annotation_page_weights(annot_index)
+        logger.info(
+            f"Prescan of {pdf_path.name}: {sum(page_weights.values())} supported annotations "
+            f"on {len(page_weights)} of {total_pages} pages"
+        )
+    
+    ocr_texts = None
+    ocr_status = {}
+    try:
+        pages = iter_page_highlights(
+            doc, pdf_path, page_options, workers, progress_callback, batch_options,
+            start_page=len(resumed_pages), page_weights=page_weights
+        )
+        for page_num, page_results in itertools.chain(resumed_pages, pages):
+            if checkpoint and page_num >= len(resumed_pages):
+                checkpoint.record_page(page_num, page_results)
+            for result_item in page_results:
+                extracted_data.append(result_item)
+                if stream:
+                    stream.append(result_item)
+                if pdf_builder and result_item.get("image_path"):
+                    pdf_builder.add_highlight(result_item, len(extracted_data) - 1)
+                if ocr_pipeline:
+                    ocr_pipeline.add(len(extracted_data) - 1, result_item)
+        if ocr_pipeline:
+            ocr_texts = ocr_pipeline.finish()
+            ocr_status = ocr_pipeline.statuses
+    except Exception:
+        if stream:
+            stream.close()
+        if pdf_builder:
+            pdf_builder.discard()
+        if ocr_pipeline:
+            ocr_pipeline.close(cancel=True)
+        if checkpoint:
+            checkpoint.close()
+        raise
                         
-    doc.close()
+    if pdf_builder:
+        pdf_builder.close()
+    if checkpoint:
+        checkpoint.close()
     
-    # Compile images to a single PDF if save_images is enabled
-    compile_highlights_pdf(extracted_data, save_images, pdf_save_dir)
+    doc.close()
     
-    if ocr_engine == "olmocr" and save_images and pdf_save_dir:
-        compiled_pdf_path = pdf_save_dir / "compiled_highlights.pdf"
-        if compiled_pdf_path.exists():
+    if ocr_texts is not None:
+        # Already recognised by the pipeline, keyed by highlight index
+        pass
+    elif remote_engine == "olmocr":
+        image_paths = {idx: item["image_path"] for idx, item in enumerate(extracted_data) if item.get("image_path")}
+        if image_paths:
             import uuid
             task_id = f"{pdf_path.stem}_{uuid.uuid4().hex[:8]}"
             
-            # Run olmocr OCR
-            ocr_texts = run_olmocr_ocr(
-                compiled_pdf_path=str(compiled_pdf_path),
+            # Run olmocr OCR on the crops themselves, keyed by highlight index
+            ocr_texts = run_olmocr_crops(
+                image_paths,
                 task_id=task_id,
                 server=olmocr_server,
                 api_key=olmocr_api_key,
                 model=olmocr_model,
-                progress_callback=progress_callback
+                progress_callback=progress_callback,
+                checkpoint_path=checkpoint.ocr_path if checkpoint else None,
+                crop_status=ocr_status
             )
-            
-            # Update the text properties of highlights with OCR results
-            for idx, item in enumerate(extracted_data):
-                page_num_in_compiled = idx + 1
-                if page_num_in_compiled in ocr_texts:
-                    ocr_text = ocr_texts[page_num_in_compiled]
-                    if ocr_text:
-                        item["text"] = ocr_text
-                        item["ocr_engine"] = "olmocr"
-
-            # Re-save the final JSON results with updated OCR texts
-            if output_json_path:
-                try:
-                    with open(output_json_path, "w", encoding="utf-8") as f:
-                        json.dump(extracted_data, f, ensure_ascii=False, indent=2)
-                except Exception as e:
-                    logger.error(f"Failed to save final JSON update after olmocr: {e}")
-    elif ocr_engine == "mistralocr" and save_images and pdf_save_dir:
+    elif remote_engine == "mistralocr":
         compiled_pdf_path = pdf_save_dir / "compiled_highlights.pdf"
         if compiled_pdf_path.exists():
-            # Run Mistral OCR
-            ocr_texts = run_mistral_ocr(
-                compiled_pdf_path=str(compiled_pdf_path),
-                api_key=mistral_api_key,
-                progress_callback=progress_callback
+            # Run Mistral OCR; page N of the compiled PDF is highlight page_keys[N - 1], and is cached under the
+            # key of that highlight's crop, like the pipelined path does
+            page_keys = pdf_builder.page_keys
+            cache_keys = None
+            if get_ocr_cache():
+                model = ocr_model_name("mistralocr", olmocr_model)
+                cache_keys = {i + 1: crop_cache_key(extracted_data[idx]["image_path"], "mistralocr", model) for i, idx in enumerate(page_keys)}
+            page_status = {}
+            page_texts = run_remote_ocr(
+                compiled_pdf_path,
+                "mistralocr",
+                mistral_api_key=mistral_api_key,
+                progress_callback=progress_callback,
+                checkpoint_path=checkpoint.ocr_path if checkpoint else None,
+                page_status=page_status,
+                cache_keys=cache_keys
             )
-            
-            # Update the text properties of highlights with OCR results
-            for idx, item in enumerate(extracted_data):
-                page_num_in_compiled = idx + 1
-                if page_num_in_compiled in ocr_texts:
-                    ocr_text = ocr_texts[page_num_in_compiled]
-                    if ocr_text:
-                        item["text"] = ocr_text
-                        item["ocr_engine"] = "mistralocr"
-
-            # Re-save the final JSON results with updated OCR texts
-            if output_json_path:
-                try:
-                    with open(output_json_path, "w", encoding="utf-8") as f:
-                        json.dump(extracted_data, f, ensure_ascii=False, indent=2)
-                except Exception as e:
-                    logger.error(f"Failed to save final JSON update after mistralocr: {e}")
+            ocr_texts = {page_keys[page_num - 1]: text for page_num, text in page_texts.items() if 0 < page_num <= len(page_keys)}
+            ocr_status = {index: page_status.get(i + 1, "failed") for i, index in enumerate(page_keys)}
+    
+    # Update the text properties of highlights with OCR results
+    for idx, ocr_text in sorted((ocr_texts or {}).items()):
+        if ocr_text:
+            extracted_data[idx]["text"] = ocr_text
+            extracted_data[idx]["ocr_engine"] = remote_engine
+            if stream:
+                stream.update(idx, text=ocr_text, ocr_engine=remote_engine)
+    
+    # The extraction is complete, nothing is left to resume
+    if checkpoint:
+        checkpoint.remove()
+    
+    # Compact the stream into the final JSON array file
+    if stream:
+        stream.close()
+        try:
+            compact_highlight_stream(stream.path, output_json_path)
+        except Exception as e:
+            logger.error(f"Failed to compact highlight stream into {output_json_path}: {e}")
+    
+    # Results are cached only when the remote engine answered every crop; failed crops keep their native text
+    crop_indices = [idx for idx, item in enumerate(extracted_data) if item.get("image_path")] if remote_engine else []
+    if (
+        cache
+        and not _has_ocr_failures([t for item in extracted_data for t in (item["text"], item.get("context"))])
+        and _remote_ocr_succeeded(ocr_status, crop_indices)
+    ):
+        artifacts = [item["image_path"] for item in extracted_data if item.get("image_path")]
+        if pdf_save_dir and (pdf_save_dir / "compiled_highlights.pdf").exists():
+            artifacts.append(pdf_save_dir / "compiled_highlights.pdf")
+        cached_items = [
+            {**item, "image_path": Path(item["image_path"]).name if item.get("image_path") else None}
+            for item in extracted_data
+        ]
+        cache.put(cache_key, cached_items, artifacts, total_pages=total_pages)
     
     return extracted_data
 
+def _restore_cached_highlights(entry_dir: Path, meta: dict, pdf_save_dir: Path, output_json_path: str = None, progress_callback = None) -> list:
+    """Copies a cached result's artifacts into the save dir and rebuilds the highlight list."""
+    artifacts_dir = entry_dir / "artifacts"
+    if pdf_save_dir and any(artifacts_dir.iterdir()):
+        pdf_save_dir.mkdir(parents=True, exist_ok=True)
+        for artifact in artifacts_dir.iterdir():
+            shutil.copy2(artifact, pdf_save_dir / artifact.name)
+
+    extracted_data = []
+    for item in meta["result"]:
+        image_name = item.get("image_path")
+        extracted_data.append({**item, "image_path": str(pdf_save_dir / image_name) if image_name and pdf_save_dir else None})
+
+    if output_json_path and extracted_data:
+        tmp_path = Path(f"{output_json_path}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(extracted_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, output_json_path)
+
+    if progress_callback:
+        total_pages = meta.get("total_pages", 0)
+        try:
+            progress_callback(total_pages, total_pages, phase="parsing", percent=100)
+        except Exception as e:
+            logger.warning(f"Progress callback failed: {e}")
+    return extracted_data
+
+def render_page_for_easyocr(page):
+    """Renders the full page image at EasyOCR's render scale."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(EASYOCR_RENDER_SCALE, EASYOCR_RENDER_SCALE))
+    return Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+
 def run_easyocr_on_full_page(page, page_num: int, total_pages: int, progress_callback=None) -> str:
-    """Renders the full page image at zoom 4.0, runs EasyOCR on it, and returns sorted text."""
+    """Renders the full page image at EasyOCR's render scale, runs EasyOCR on it, and returns sorted text."""
     try:
         import numpy as np
-        pix = page.get_pixmap(matrix=fitz.Matrix(4.0, 4.0))
-        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-        
-        target_size = (int(img.width * 0.5), int(img.height * 0.5))
-        resized_img = img.resize(target_size, Image.Resampling.BILINEAR)
+        resized_img = render_page_for_easyocr(page)
 
         img_np = np.array(resized_img)
         reader = get_easyocr_reader()
-        ocr_res = reader.readtext(img_np)
-        blocks = get_easyocr_blocks(ocr_res)
-        text = sort_and_format_ocr_blocks(blocks)
-        return text.strip()
+        return _cached_easyocr_text(reader, img_np)
     except Exception as e:
         logger.error(f"EasyOCR full page extraction failed for page {page_num}: {e}")
         return f"[EasyOCR Extraction Failed on Page {page_num}]"
 
+def _run_full_ocr_pages(load_page, page_nums, ocr_engine: str, batch_options: dict = None):
+    """
+    Extracts the text of the given pages (native text layer and/or EasyOCR, depending on
+    ocr_engine) and yields (page_num, text) in order. With batch_options, pages needing EasyOCR
+    are held back until the batch holding them has been flushed.
+    """
+    batcher = EasyOCRBatcher(**batch_options) if batch_options else None
+    page_texts = {}
+    held = []
+    for page_num in page_nums:
+        page = load_page(page_num)
+
+        native_text = ""
+        try:
+            native_text = page.get_text("text").strip()
+        except Exception as e:
+            logger.error(f"Native text extraction failed for page {page_num + 1}: {e}")
+            
+        use_ocr = False
+        if ocr_engine == "easyocr":
+            use_ocr = True
+        elif ocr_engine == "auto":
+            if not native_text or has_arabic(native_text):
+                use_ocr = True
+        
+        if use_ocr and batcher:
+            failure_text = f"[EasyOCR Extraction Failed on Page {page_num + 1}]"
+            try:
+                batcher.add(render_page_for_easyocr(page), page_texts, page_num, failure_text=failure_text)
+            except Exception as e:
+                logger.error(f"EasyOCR full page extraction failed for page {page_num + 1}: {e}")
+                page_texts[page_num] = failure_text
+        elif use_ocr:
+            page_texts[page_num] = run_easyocr_on_full_page(page, page_num + 1, page.parent.page_count)
+        else:
+            page_texts[page_num] = native_text or "[No text found on this page]"
+        held.append(page_num)
+
+        if batcher is None or batcher.should_flush():
+            if batcher:
+                batcher.flush()
+            for held_num in held:
+                yield held_num, page_texts.pop(held_num)
+            held = []
+    if batcher:
+        batcher.flush()
+    for held_num in held:
+        yield held_num, page_texts.pop(held_num)
+
+def _full_ocr_page_range(page_nums: list, ocr_engine: str, batch_options: dict = None) -> list:
+    """Runs inside a pool worker and returns (page_num, text) pairs for the given pages."""
+    return list(_run_full_ocr_pages(_PAGE_WORKER_DOC.load_page, page_nums, ocr_engine, batch_options))
+
+def iter_full_ocr_pages(doc, pdf_path: Path, ocr_engine: str, workers: int = None, progress_callback = None, batch_options: dict = None, chunk_pages: int = 4):
+    """
+    Yields (page_num, text) for every page of the document in page order, extracting the text
+    locally (native text layer and/or EasyOCR).
+    With workers > 1, chunks of chunk_pages pages are processed by a process pool. At most
+    workers * 2 chunks are in flight or waiting in the reorder buffer for an earlier chunk,
+    so memory stays flat however long the document is. Progress is reported as pages complete.
+    """
+    import time
+    total_pages = len(doc)
+    started = time.time()
+    pages_done = 0
+
+    def report(done):
+        if progress_callback:
+            try:
+                progress_callback(done, total_pages, phase="full_ocr", percent=int(done / total_pages * 100))
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {e}")
+
+    if not workers or workers <= 1 or total_pages <= 1:
+        for page_num, text in _run_full_ocr_pages(doc.load_page, range(total_pages), ocr_engine, batch_options):
+            pages_done += 1
+            report(pages_done)
+            yield page_num, text
+    else:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+        chunks = [list(range(s, min(s + chunk_pages, total_pages))) for s in range(0, total_pages, chunk_pages)]
+        window = workers * 2
+        logger.info(f"Full OCR of {total_pages} pages with {workers} worker processes in {len(chunks)} chunks")
+
+        # EasyOCR/torch are not fork-safe, so the workers are always spawned
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_page_worker, initargs=(str(pdf_path),)) as executor:
+            in_flight = {}
+            buffered = {}
+            next_submit = 0
+            next_yield = 0
+            while next_yield < len(chunks):
+                # Submit chunks while the window (in flight + waiting to be written) has room
+                while next_submit < len(chunks) and len(in_flight) + len(buffered) < window:
+                    in_flight[executor.submit(_full_ocr_page_range, chunks[next_submit], ocr_engine, batch_options)] = next_submit
+                    next_submit += 1
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_idx = in_flight.pop(future)
+                    buffered[chunk_idx] = future.result()
+                    pages_done += len(chunks[chunk_idx])
+                    report(pages_done)
+                # Release finished chunks in page order
+                while next_yield in buffered:
+                    yield from buffered.pop(next_yield)
+                    next_yield += 1
+
+    elapsed = time.time() - started
+    if elapsed > 0:
+        logger.info(f"Full OCR extracted {total_pages} pages in {elapsed:.1f}s ({total_pages / elapsed:.2f} pages/s)")
+
 def ocr_full_pdf(
     pdf_path: str,
     ocr_engine: str = "auto",
@@ -878,83 +3221,212 @@ def ocr_full_pdf(
     olmocr_api_key: str = None,
     olmocr_model: str = "richardyoung/olmocr2:7b-q8",
     mistral_api_key: str = None,
-    progress_callback = None
+    progress_callback = None,
+    ocr_batch_size: int = None,
+    ocr_batch_max_pixels: int = 16_000_000,
+    cache_dir: str = None,
+    cache_max_bytes: int = 2 * 1024 ** 3,
+    workers: int = None,
+    output_path: str = None,
+    hybrid: bool = True
 ) -> str:
     """
     Runs OCR on all pages of the PDF, returning the full collated text.
+    With ocr_batch_size=N, pages needing EasyOCR are run in batches of up to N pages, and
+    with workers=N the pages are processed by a pool of N processes.
+    With olmOCR or Mistral OCR and hybrid=True, only pages whose text layer is empty,
+    Arabic-dominant or garbled are sent to the remote engine; the others keep their text.
+    With an output_path, pages are written to that file in page order as they complete
+    (the text is never held in memory as a whole) and the path is returned instead of the text.
+    With a cache_dir, the text of identical PDFs and settings is served from the cache.
+    """
+    cache = None
+    cache_key = None
+    if cache_dir:
+        try:
+            cache = ResultCache(cache_dir, cache_max_bytes)
+            cache_key = document_cache_key(
+                hash_file(pdf_path),
+                "full_ocr",
+                ocr_engine=ocr_engine,
+                model=ocr_model_name(ocr_engine, olmocr_model),
+                **({"hybrid": hybrid} if ocr_engine in ("olmocr", "mistralocr") else {})
+            )
+            cached = cache.get(cache_key)
+            if cached:
+                logger.info(f"Result cache hit for full OCR of {Path(pdf_path).name} ({cache_key[:12]})")
+                if progress_callback:
+                    total_pages = cached[1].get("total_pages", 0)
+                    progress_callback(total_pages, total_pages, phase="full_ocr", percent=100)
+                return _restore_cached_full_text(*cached, output_path)
+        except Exception as e:
+            logger.error(f"Result cache lookup failed: {e}")
+            cache = None
+
+    parts = []
+    out = None
+    tmp_path = Path(f"{output_path}.tmp") if output_path else None
+    failed = False
+    ocr_status = {}
+
+    def write_page(page_num, text):
+        nonlocal failed
+        failed = failed or _has_ocr_failures([text])
+        part = ("\n\n" if page_num else "") + f"--- Page {page_num + 1} ---\n" + text
+        if out:
+            out.write(part)
+            out.flush()
+        else:
+            parts.append(part)
+
+    try:
+        if tmp_path:
+            out = open(tmp_path, "w", encoding="utf-8")
+        total_pages = _ocr_full_pdf(
+            pdf_path,
+            write_page,
+            ocr_engine=ocr_engine,
+            olmocr_server=olmocr_server,
+            olmocr_api_key=olmocr_api_key,
+            olmocr_model=olmocr_model,
+            mistral_api_key=mistral_api_key,
+            progress_callback=progress_callback,
+            ocr_batch_size=ocr_batch_size,
+            ocr_batch_max_pixels=ocr_batch_max_pixels,
+            workers=workers,
+            hybrid=hybrid,
+            ocr_status=ocr_status
+        )
+        failed = failed or not _remote_ocr_succeeded(ocr_status, ocr_status)
+        if out:
+            out.close()
+            os.replace(tmp_path, output_path)
+    finally:
+        if out and not out.closed:
+            out.close()
+        if tmp_path and tmp_path.exists():
+            tmp_path.unlink()
+
+    if output_path:
+        if cache and total_pages and not failed:
+            cache.put(cache_key, None, [output_path], total_pages=total_pages, text_artifact=Path(output_path).name)
+        return str(output_path)
+
+    full_text = "".join(parts)
+    if cache and full_text and not failed:
+        cache.put(cache_key, full_text, total_pages=total_pages)
+    return full_text
+
+def _restore_cached_full_text(entry_dir: Path, meta: dict, output_path: str = None) -> str:
+    """Returns a cached full OCR text, or writes it to output_path and returns the path."""
+    text_artifact = entry_dir / "artifacts" / meta["text_artifact"] if meta.get("text_artifact") else None
+    if output_path:
+        if text_artifact:
+            shutil.copy2(text_artifact, output_path)
+        else:
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(meta["result"])
+        return str(output_path)
+    if text_artifact:
+        return text_artifact.read_text(encoding="utf-8")
+    return meta["result"]
+
+def _ocr_full_pdf(
+    pdf_path: str,
+    write_page,
+    ocr_engine: str = "auto",
+    olmocr_server: str = "http://localhost:11434/v1",
+    olmocr_api_key: str = None,
+    olmocr_model: str = "richardyoung/olmocr2:7b-q8",
+    mistral_api_key: str = None,
+    progress_callback = None,
+    ocr_batch_size: int = None,
+    ocr_batch_max_pixels: int = 16_000_000,
+    workers: int = None,
+    hybrid: bool = True,
+    ocr_status: dict = None
+) -> int:
+    """
+    Uncached implementation of ocr_full_pdf: calls write_page(page_num, text) for every page,
+    in page order, and returns the page count. If given, ocr_status is filled with the status
+    of every page sent to olmOCR or Mistral OCR ("ok", "empty" or "failed"), by page number.
     """
+    ocr_status = ocr_status if ocr_status is not None else {}
     pdf_path = Path(pdf_path)
     try:
         doc = fitz.open(pdf_path)
         total_pages = len(doc)
     except Exception as e:
         logger.error(f"Failed to open PDF for full OCR: {e}")
-        return ""
+        return 0
 
     if total_pages == 0:
-        return ""
-
-    # If it is olmocr, run the pipeline on the original PDF path
-    if ocr_engine == "olmocr":
-        import uuid
-        task_id = f"{pdf_path.stem}_full_{uuid.uuid4().hex[:8]}"
-        ocr_texts = run_olmocr_ocr(
-            compiled_pdf_path=str(pdf_path),
-            task_id=task_id,
-            server=olmocr_server,
-            api_key=olmocr_api_key,
-            model=olmocr_model,
-            progress_callback=progress_callback
-        )
-        full_text_list = []
-        for p in range(1, total_pages + 1):
-            full_text_list.append(f"--- Page {p} ---\n" + ocr_texts.get(p, "[No OCR text found for this page]"))
-        doc.close()
-        return "\n\n".join(full_text_list)
+        return 0
 
-    # If it is mistralocr, run mistral OCR on the original PDF path
-    if ocr_engine == "mistralocr":
-        ocr_texts = run_mistral_ocr(
-            compiled_pdf_path=str(pdf_path),
-            api_key=mistral_api_key,
-            progress_callback=progress_callback
-        )
-        full_text_list = []
-        for p in range(1, total_pages + 1):
-            full_text_list.append(f"--- Page {p} ---\n" + ocr_texts.get(p, "[No OCR text found for this page]"))
+    try:
+        # If it is olmocr or mistralocr, run the remote engine on the pages that need it
+        if ocr_engine in ("olmocr", "mistralocr"):
+            import uuid
+            native_texts = {}
+            remote_pages = list(range(1, total_pages + 1))
+            if hybrid:
+                routes = {}
+                for page_num in range(1, total_pages + 1):
+                    try:
+                        text = doc.load_page(page_num - 1).get_text("text").strip()
+                    except Exception as e:
+                        logger.error(f"Native text extraction failed for page {page_num}: {e}")
+                        text = ""
+                    routes[page_num] = classify_page_text(text)
+                    if routes[page_num] == "native":
+                        native_texts[page_num] = text
+                remote_pages = [p for p, route in routes.items() if route != "native"]
+                counts = {route: list(routes.values()).count(route) for route in ("native", "empty", "arabic", "garbled")}
+                logger.info(f"Full OCR routing of {total_pages} pages: {len(remote_pages)} to {ocr_engine} ({counts})")
+
+            ocr_texts = {}
+            if remote_pages:
+                remote_kwargs = {
+                    "task_id": f"{pdf_path.stem}_full_{uuid.uuid4().hex[:8]}",
+                    "olmocr_server": olmocr_server,
+                    "olmocr_api_key": olmocr_api_key,
+                    "olmocr_model": olmocr_model,
+                    "mistral_api_key": mistral_api_key,
+                    "progress_callback": progress_callback
+                }
+                if len(remote_pages) == total_pages:
+                    remote_status = {}
+                    ocr_texts = run_remote_ocr(pdf_path, ocr_engine, page_status=remote_status, **remote_kwargs)
+                    ocr_status.update({page_num: remote_status.get(page_num, "failed") for page_num in remote_pages})
+                else:
+                    # Pack the pages that need OCR into a subset PDF and map its pages back
+                    subset_path = pdf_path.parent / f"{pdf_path.stem}_ocr_subset_{uuid.uuid4().hex[:8]}.pdf"
+                    subset = fitz.open()
+                    for page_num in remote_pages:
+                        subset.insert_pdf(doc, from_page=page_num - 1, to_page=page_num - 1)
+                    subset.save(str(subset_path))
+                    subset.close()
+                    subset_status = {}
+                    try:
+                        subset_texts = run_remote_ocr(subset_path, ocr_engine, page_status=subset_status, **remote_kwargs)
+                    finally:
+                        subset_path.unlink(missing_ok=True)
+                    ocr_texts = {page_num: subset_texts[i + 1] for i, page_num in enumerate(remote_pages) if i + 1 in subset_texts}
+                    ocr_status.update({page_num: subset_status.get(i + 1, "failed") for i, page_num in enumerate(remote_pages)})
+            elif progress_callback:
+                progress_callback(total_pages, total_pages, phase="full_ocr", percent=100)
+
+            for p in range(1, total_pages + 1):
+                if p in native_texts:
+                    write_page(p - 1, native_texts.pop(p))
+                else:
+                    write_page(p - 1, ocr_texts.get(p, "[No OCR text found for this page]"))
+            return total_pages
+
+        # Otherwise (native, easyocr, auto), process page-by-page
+        batch_options = {"batch_size": ocr_batch_size, "max_batch_pixels": ocr_batch_max_pixels} if ocr_batch_size else None
+        for page_num, text in iter_full_ocr_pages(doc, pdf_path, ocr_engine, workers, progress_callback, batch_options):
+            write_page(page_num, text)
+        return total_pages
+    finally:
         doc.close()
-        return "\n\n".join(full_text_list)
-
-    # Otherwise (native, easyocr, auto), process page-by-page
-    full_text_list = []
-    for page_num in range(total_pages):
-        page = doc.load_page(page_num)
-        
-        # Report progress
-        if progress_callback:
-            pct = int((page_num + 1) / total_pages * 100)
-            progress_callback(page_num + 1, total_pages, phase="full_ocr", percent=pct)
-
-        native_text = ""
-        try:
-            native_text = page.get_text("text").strip()
-        except Exception as e:
-            logger.error(f"Native text extraction failed for page {page_num + 1}: {e}")
-            
-        use_ocr = False
-        if ocr_engine == "easyocr":
-            use_ocr = True
-        elif ocr_engine == "auto":
-            if not native_text or has_arabic(native_text):
-                use_ocr = True
-        
-        if use_ocr:
-            page_text = run_easyocr_on_full_page(page, page_num + 1, total_pages, progress_callback)
-        else:
-            page_text = native_text or "[No text found on this page]"
-
-        full_text_list.append(f"--- Page {page_num + 1} ---\n" + page_text)
-
-    doc.close()
-    return "\n\n".join(full_text_list)
-
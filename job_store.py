@@ -0,0 +1,263 @@
+import json
+import time
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Columns of a job record; "progress" and "result" hold JSON documents, "owner" names the process running the job
+JOB_FIELDS = ("status", "submitted_at", "started_at", "finished_at", "updated_at", "progress", "result", "error", "stream_path", "owner")
+JSON_FIELDS = ("progress", "result")
+
+ORPHANED_JOB_ERROR = "Extraction failed: the server process running this job stopped, please upload the file again"
+
+class JobStore:
+    """
+    Job state, progress, timing and result locations of extraction jobs.
+    Records that have not been updated for ttl seconds are evicted.
+    Every process touches its active jobs with heartbeat(); active jobs whose owner stopped
+    doing so are failed by fail_orphaned(), so jobs of a dead process do not stay pending.
+    Documents are held by one owner at a time with claim() and release(); heartbeat() keeps
+    the owner's claims alive as well, and claims of a dead owner can be taken over.
+    """
+    def __init__(self, ttl: float = 24 * 3600):
+        self.ttl = ttl
+
+    def create(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    def update(self, job_id: str, **fields):
+        raise NotImplementedError
+
+    def get(self, job_id: str):
+        """Returns the job record as a dict, or None if it is unknown or expired."""
+        raise NotImplementedError
+
+    def count(self, statuses) -> int:
+        """Number of jobs currently in one of the given statuses."""
+        raise NotImplementedError
+
+    def evict_expired(self) -> int:
+        raise NotImplementedError
+
+    def heartbeat(self, owner: str, statuses) -> int:
+        """Marks the owner's jobs in one of the given statuses and its claims as alive; returns how many jobs there are."""
+        raise NotImplementedError
+
+    def claim(self, key: str, owner: str, timeout: float) -> bool:
+        """Claims key for owner, unless another owner holds it and touched it within timeout seconds."""
+        raise NotImplementedError
+
+    def release(self, key: str, owner: str):
+        """Releases the owner's claim on key."""
+        raise NotImplementedError
+
+    def fail_orphaned(self, timeout: float, statuses) -> int:
+        """Fails jobs in one of the given statuses that have not been updated for timeout seconds."""
+        raise NotImplementedError
+
+    def get_progress(self, job_id: str):
+        job = self.get(job_id)
+        return job.get("progress") if job else None
+
+    def set_progress(self, job_id: str, progress: dict):
+        self.update(job_id, progress=progress)
+
+class MemoryJobStore(JobStore):
+    """Per-process store, for single-process deployments and the CLI."""
+    def __init__(self, ttl: float = 24 * 3600):
+        super().__init__(ttl)
+        self._jobs = {}
+        self._claims = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id: str, **fields):
+        now = time.time()
+        with self._lock:
+            self._jobs[job_id] = {"job_id": job_id, "submitted_at": now, **fields, "updated_at": now}
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {"job_id": job_id})
+            job.update(fields)
+            job["updated_at"] = time.time()
+
+    def get(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job["updated_at"] >= time.time() - self.ttl:
+                return dict(job)
+        return None
+
+    def count(self, statuses) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.get("status") in statuses and job["updated_at"] >= cutoff)
+
+    def evict_expired(self) -> int:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [k for k, job in self._jobs.items() if job["updated_at"] < cutoff]
+            for k in expired:
+                del self._jobs[k]
+        return len(expired)
+
+    def heartbeat(self, owner: str, statuses) -> int:
+        now = time.time()
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.get("owner") == owner and job.get("status") in statuses]
+            for job in jobs:
+                job["updated_at"] = now
+            for key, (claim_owner, _) in self._claims.items():
+                if claim_owner == owner:
+                    self._claims[key] = (owner, now)
+        return len(jobs)
+
+    def claim(self, key: str, owner: str, timeout: float) -> bool:
+        now = time.time()
+        with self._lock:
+            claim_owner, touched = self._claims.get(key, (owner, now))
+            if claim_owner != owner and touched >= now - timeout:
+                return False
+            self._claims[key] = (owner, now)
+        return True
+
+    def release(self, key: str, owner: str):
+        with self._lock:
+            if self._claims.get(key, (None, 0))[0] == owner:
+                del self._claims[key]
+
+    def fail_orphaned(self, timeout: float, statuses) -> int:
+        now = time.time()
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.get("status") in statuses and job["updated_at"] < now - timeout]
+            for job in jobs:
+                job.update(status="failed", finished_at=now, updated_at=now, error=ORPHANED_JOB_ERROR)
+        return len(jobs)
+
+class SQLiteJobStore(JobStore):
+    """
+    Store shared by every app process on the host, in SQLite (WAL mode).
+    Jobs are looked up by primary key; status and update time are indexed for
+    the pending-job count and TTL eviction.
+    """
+    def __init__(self, path, ttl: float = 24 * 3600):
+        super().__init__(ttl)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "job_id TEXT PRIMARY KEY, status TEXT, submitted_at REAL, started_at REAL, finished_at REAL, "
+                "updated_at REAL, progress TEXT, result TEXT, error TEXT, stream_path TEXT, owner TEXT)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS claims (key TEXT PRIMARY KEY, owner TEXT, updated_at REAL)")
+
+    @staticmethod
+    def _encode(fields: dict) -> dict:
+        unknown = set(fields) - set(JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+        return {k: json.dumps(v) if k in JSON_FIELDS and v is not None else v for k, v in fields.items()}
+
+    def create(self, job_id: str, **fields):
+        now = time.time()
+        fields = self._encode({"submitted_at": now, **fields, "updated_at": now})
+        columns = ", ".join(["job_id", *fields])
+        placeholders = ", ".join("?" * (len(fields) + 1))
+        with self._lock, self._conn:
+            self._conn.execute(f"INSERT OR REPLACE INTO jobs ({columns}) VALUES ({placeholders})", (job_id, *fields.values()))
+
+    def update(self, job_id: str, **fields):
+        fields = self._encode({**fields, "updated_at": time.time()})
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+            if cursor.rowcount == 0:
+                columns = ", ".join(["job_id", *fields])
+                placeholders = ", ".join("?" * (len(fields) + 1))
+                self._conn.execute(f"INSERT INTO jobs ({columns}) VALUES ({placeholders})", (job_id, *fields.values()))
+
+    def get(self, job_id: str):
+        with self._lock:
+            cursor = self._conn.execute(
+                "SELECT * FROM jobs WHERE job_id = ? AND updated_at >= ?", (job_id, time.time() - self.ttl)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            job = dict(zip([c[0] for c in cursor.description], row))
+        for k in JSON_FIELDS:
+            if job.get(k) is not None:
+                job[k] = json.loads(job[k])
+        return job
+
+    def count(self, statuses) -> int:
+        statuses = list(statuses)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN ({', '.join('?' * len(statuses))}) AND updated_at >= ?",
+                (*statuses, time.time() - self.ttl)
+            ).fetchone()[0]
+
+    def evict_expired(self) -> int:
+        with self._lock, self._conn:
+            removed = self._conn.execute("DELETE FROM jobs WHERE updated_at < ?", (time.time() - self.ttl,)).rowcount
+        if removed:
+            logger.info(f"Job store evicted {removed} expired jobs")
+        return removed
+
+    def heartbeat(self, owner: str, statuses) -> int:
+        statuses = list(statuses)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE claims SET updated_at = ? WHERE owner = ?", (now, owner))
+            return self._conn.execute(
+                f"UPDATE jobs SET updated_at = ? WHERE owner = ? AND status IN ({', '.join('?' * len(statuses))})",
+                (now, owner, *statuses)
+            ).rowcount
+
+    def claim(self, key: str, owner: str, timeout: float) -> bool:
+        now = time.time()
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "INSERT INTO claims (key, owner, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, updated_at = excluded.updated_at "
+                "WHERE claims.owner = excluded.owner OR claims.updated_at < ?",
+                (key, owner, now, now - timeout)
+            ).rowcount == 1
+
+    def release(self, key: str, owner: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM claims WHERE key = ? AND owner = ?", (key, owner))
+
+    def fail_orphaned(self, timeout: float, statuses) -> int:
+        statuses = list(statuses)
+        now = time.time()
+        with self._lock, self._conn:
+            failed = self._conn.execute(
+                f"UPDATE jobs SET status = 'failed', finished_at = ?, updated_at = ?, error = ? "
+                f"WHERE status IN ({', '.join('?' * len(statuses))}) AND updated_at < ?",
+                (now, now, ORPHANED_JOB_ERROR, *statuses, now - timeout)
+            ).rowcount
+        if failed:
+            logger.warning(f"Job store failed {failed} jobs whose process stopped responding")
+        return failed
+
+def create_job_store(kind: str = "sqlite", path: str = None, ttl: float = 24 * 3600) -> JobStore:
+    """Builds the job store selected by kind ("sqlite" or "memory")."""
+    if kind == "memory":
+        return MemoryJobStore(ttl)
+    if kind == "sqlite":
+        return SQLiteJobStore(path or "./cache/jobs.sqlite", ttl)
+    raise ValueError(f"Unknown job store: {kind}")
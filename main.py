@@ -2,12 +2,15 @@ import os
 import sys
 import json
 import argparse
+import threading
 from pathlib import Path
 from dotenv import load_dotenv
-from extractor import extract_highlights
+from extractor import extract_highlights, highlight_stream_path, read_highlight_stream, configure_ocr_cache, get_ocr_cache
 
 load_dotenv()
 
+# Progress labels of the remote OCR phase, by engine
+OCR_ENGINE_LABELS = {"olmocr": "olmOCR", "mistralocr": "Mistral OCR", "easyocr": "EasyOCR"}
 
 def main():
     parser = argparse.ArgumentParser(
@@ -84,6 +87,52 @@ def main():
         default="richardyoung/olmocr2:7b-q8",
         help="Model name to use for olmOCR (default: richardyoung/olmocr2:7b-q8).",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes used to parse pages in parallel (default: serial).",
+    )
+    parser.add_argument(
+        "--ocr-batch-size",
+        type=int,
+        default=None,
+        help="Run EasyOCR on the highlight crops in batches of this many images (default: one crop at a time).",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Directory of the result cache; identical PDFs and settings are served from it (default: disabled).",
+    )
+    parser.add_argument(
+        "--compiled-pdf-mode",
+        choices=["raster", "vector"],
+        default="raster",
+        help="Build the compiled highlights PDF sent to Mistral from raster crops or from vector clips "
+             "of the source pages; pages without a text layer are always rasterised (default: raster).",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        default=None,
+        help="Directory for page-level checkpoints; rerunning an interrupted extraction with the same "
+             "PDF and settings resumes from the first unfinished page (default: disabled).",
+    )
+    parser.add_argument(
+        "--pipeline-ocr",
+        action="store_true",
+        help="Start olmOCR/Mistral OCR on batches of highlight crops while the remaining pages are still being parsed.",
+    )
+    parser.add_argument(
+        "--pipeline-batch-size",
+        type=int,
+        default=16,
+        help="Highlight crops per remote OCR batch with --pipeline-ocr (default: 16).",
+    )
+    parser.add_argument(
+        "--ocr-cache",
+        default=None,
+        help="Path of the per-crop OCR cache database shared by all OCR engines (default: disabled).",
+    )
 
     args = parser.parse_args()
 
@@ -164,6 +213,9 @@ def main():
         if args.ocr_engine == "auto":
             args.ocr_engine = "native"
 
+    if args.ocr_cache:
+        configure_ocr_cache(args.ocr_cache)
+
     # Run extraction
     print(f"\nProcessing '{pdf_file.name}'...")
     print(f"Context Extraction: {args.context}")
@@ -175,11 +227,23 @@ def main():
     print(f"Save Cropped Images: {not args.no_images}")
     print()
 
+    # Tail the highlight stream written by the extractor to show a live highlight count. Progress is also
+    # reported from the pipelined OCR threads, so the stream is read under a lock
+    stream_path = highlight_stream_path(args.output)
+    stream_state = {"offset": 0, "count": 0}
+    stream_lock = threading.Lock()
+
     def progress_cb(current, total, phase="parsing", percent=None):
         pct = percent if percent is not None else (int(current / total * 100) if total > 0 else 0)
-        label = "Parsing pages" if phase == "parsing" else "olmOCR"
-        sys.stdout.write(f"\r[{label}] {current}/{total} ({pct}%)")
-        sys.stdout.flush()
+        label = {"parsing": "Parsing pages", "ocr": OCR_ENGINE_LABELS.get(args.ocr_engine, "OCR")}.get(phase, phase)
+        with stream_lock:
+            try:
+                entries, stream_state["offset"] = read_highlight_stream(stream_path, stream_state["offset"])
+                stream_state["count"] += sum(1 for entry in entries if "_update" not in entry)
+            except Exception:
+                pass
+            sys.stdout.write(f"\r[{label}] {current}/{total} ({pct}%) - {stream_state['count']} highlights")
+            sys.stdout.flush()
 
     try:
         highlights_data = extract_highlights(
@@ -196,12 +260,22 @@ def main():
             olmocr_api_key=args.olmocr_api_key,
             olmocr_model=args.olmocr_model,
             ocr_engine=args.ocr_engine,
+            workers=args.workers,
+            ocr_batch_size=args.ocr_batch_size,
+            cache_dir=args.cache_dir,
+            compiled_pdf_mode=args.compiled_pdf_mode,
+            checkpoint_dir=args.checkpoint_dir,
+            pipeline_ocr=args.pipeline_ocr,
+            pipeline_batch_size=args.pipeline_batch_size,
         )
     except Exception as e:
         print(f"\nExtraction failed: {e}")
         sys.exit(1)
 
     print()  # Newline after progress
+    if get_ocr_cache():
+        stats = get_ocr_cache().stats()
+        print(f"OCR cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries)")
 
     # Save to JSON file
     if highlights_data:
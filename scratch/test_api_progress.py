@@ -1,5 +1,3 @@
-import time
-import threading
 import requests
 import json
 from pathlib import Path
@@ -7,30 +5,28 @@ from pathlib import Path
 pdf_path = "/home/anondev/ai-lab/qayem/al-hayat_al-jensya_fi_mesr_al-qadima.pdf"
 task_id = "test_task_unique_123"
 
-def poll_progress():
-    print("[Poller] Starting progress polling...")
-    # Poll for 30 seconds max
-    for _ in range(30):
-        try:
-            r = requests.get(f"http://127.0.0.1:5000/api/progress?task_id={task_id}")
-            if r.status_code == 200:
-                data = r.json()
-                print(f"[Poller] Progress: {data.get('current')} / {data.get('total')}")
-            else:
-                print(f"[Poller] HTTP {r.status_code}: {r.text}")
-        except Exception as e:
-            print(f"[Poller] Error: {e}")
-        time.sleep(1.0)
+def stream_progress():
+    """Follows the job's Server-Sent Events until the "end" event; returns the final status."""
+    print("[Stream] Following progress...")
+    r = requests.get(f"http://127.0.0.1:5000/api/progress/stream?task_id={task_id}", stream=True, timeout=600)
+    event = None
+    for line in r.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            data = json.loads(line[len("data: "):])
+            if event == "end":
+                return data["status"]
+            print(f"[Stream] {data.get('phase', 'queued')}: {data.get('current')} / {data.get('total')}")
+        elif not line:
+            event = None
+    return None
 
 # Set keys to bad keys first to trigger fallback
 print("Setting invalid API keys to trigger Tesseract fallback warning...")
 requests.post("http://127.0.0.1:5000/api/settings", json={"ocr_space_key": "badkey1,badkey2"})
 
-# Start polling thread
-t = threading.Thread(target=poll_progress, daemon=True)
-t.start()
-
-# Make the POST request
+# Make the POST request; the extraction runs in the background as a job named after task_id
 print("Sending PDF highlight extraction request with task_id...")
 files = {
     "pdf": open(pdf_path, "rb")
@@ -49,14 +45,20 @@ data = {
 try:
     r = requests.post("http://127.0.0.1:5000/api/extract", files=files, data=data, timeout=60)
     print(f"\n[Extraction] Status Code: {r.status_code}")
-    res = r.json()
-    if res.get("success"):
-        print(f"[Extraction] Success! Extracted {len(res['highlights'])} highlights.")
-        print(f"[Extraction] Warnings: {res.get('warnings')}")
-        print("\nFirst Highlight Output Preview:")
-        print(json.dumps(res['highlights'][0], ensure_ascii=False, indent=2))
+    if r.status_code != 202:
+        print("[Extraction] API Error:", r.json().get("error"))
     else:
-        print("[Extraction] API Error:", res.get("error"))
+        status = stream_progress()
+        print(f"[Extraction] Job ended: {status}")
+        res = requests.get(f"http://127.0.0.1:5000/api/jobs/{task_id}/result", timeout=60).json()
+        if res.get("success"):
+            print(f"[Extraction] Success! Extracted {len(res['highlights'])} highlights.")
+            print(f"[Extraction] Warnings: {res.get('warnings')}")
+            if res["highlights"]:
+                print("\nFirst Highlight Output Preview:")
+                print(json.dumps(res['highlights'][0], ensure_ascii=False, indent=2))
+        else:
+            print("[Extraction] API Error:", res.get("error"))
 except Exception as e:
     print("[Extraction] Request failed:", e)
 
@@ -0,0 +1,70 @@
+import os
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fitz
+
+def make_pdf(path, num_pages):
+    """One highlighted line per page, except on every third page."""
+    doc = fitz.open()
+    for i in range(num_pages):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 100), f"Quote number {i + 1} on this page", fontsize=14)
+        if i % 3 != 2:
+            annot = page.add_highlight_annot(fitz.Rect(45, 85, 400, 105))
+            annot.update()
+    doc.save(path)
+    doc.close()
+    return path
+
+def test_checkpoint_resume(tmp):
+    import extractor
+    print("\n[Checkpoint] interrupting an extraction on page 5 and resuming it ...")
+    pdf_path = make_pdf(os.path.join(tmp, "book.pdf"), 8)
+    expected = extractor.extract_highlights(pdf_path, save_dir=os.path.join(tmp, "clean"), ocr_engine="native", context=True)
+
+    original = extractor.process_page_highlights
+    processed = []
+    def interrupted(page, page_num, **kwargs):
+        processed.append(page_num)
+        if page_num == 4:
+            raise RuntimeError("simulated crash")
+        return original(page, page_num, **kwargs)
+    extractor.process_page_highlights = interrupted
+    checkpoint_dir = os.path.join(tmp, "checkpoints")
+    save_dir = os.path.join(tmp, "resumed")
+    try:
+        extractor.extract_highlights(pdf_path, save_dir=save_dir, ocr_engine="native", context=True, checkpoint_dir=checkpoint_dir)
+        raise AssertionError("The simulated crash should stop the first run.")
+    except RuntimeError:
+        pass
+    print(f"  first run processed pages {processed}")
+
+    processed.clear()
+    def recording(page, page_num, **kwargs):
+        processed.append(page_num)
+        return original(page, page_num, **kwargs)
+    extractor.process_page_highlights = recording
+    try:
+        resumed = extractor.extract_highlights(pdf_path, save_dir=save_dir, ocr_engine="native", context=True, checkpoint_dir=checkpoint_dir)
+    finally:
+        extractor.process_page_highlights = original
+    print(f"  resumed run processed pages {processed}")
+    assert processed and min(processed) >= 4, "Pages finished before the crash should not be processed again."
+    normalise = lambda items: json.loads(json.dumps(items).replace(save_dir, "").replace(os.path.join(tmp, "clean"), ""))
+    assert normalise(resumed) == normalise(expected), "The resumed result should equal an uninterrupted run."
+    assert not any(Path(checkpoint_dir).iterdir()), "The checkpoint should be removed once the extraction completes."
+
+def main():
+    import extractor
+    extractor.configure_ocr_cache(None)
+    with tempfile.TemporaryDirectory() as tmp:
+        test_checkpoint_resume(tmp)
+    print("\nSUCCESS: Interrupted extractions resume from their checkpoint!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+class FakeReader:
+    """Stands in for easyocr.Reader: records every call and answers with each image's marker pixel."""
+    def __init__(self):
+        self.calls = []
+
+    def readtext(self, image):
+        self.calls.append(("readtext", [image.shape]))
+        return [([[0, 0], [1, 0], [1, 1], [0, 1]], f"crop {image[0, 0, 0]}", 1.0)]
+
+    def readtext_batched(self, images, batch_size=None):
+        self.calls.append(("readtext_batched", [image.shape for image in images]))
+        return [[([[0, 0], [1, 0], [1, 1], [0, 1]], f"crop {image[0, 0, 0]}", 1.0)] for image in images]
+
+def test_mixed_sizes_share_one_call():
+    from extractor import EasyOCRService
+    print("\n[EasyOCR service] four concurrent crops of different sizes ...")
+    reader = FakeReader()
+    service = EasyOCRService(max_batch=8, max_wait=0.5)
+    service._load_reader = lambda: reader
+    # Crops of the same 64 px size bucket (128 x 320); the first pixel tells the crops apart
+    sizes = [(100, 300), (110, 310), (120, 290), (97, 319)]
+    results = [None] * len(sizes)
+    start = threading.Barrier(len(sizes))
+
+    def submit(i):
+        image = np.full((*sizes[i], 3), 200, dtype=np.uint8)
+        image[0, 0, 0] = i
+        start.wait()
+        results[i] = service.readtext(image)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(len(sizes))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"  reader calls: {reader.calls}")
+    assert reader.calls == [("readtext_batched", [(128, 320, 3)] * len(sizes))], "Mixed-size crops should share one padded batch."
+    assert [r[0][1] for r in results] == [f"crop {i}" for i in range(len(sizes))], "Every caller should get its own result."
+
+def test_single_crop_is_not_padded():
+    from extractor import EasyOCRService
+    print("\n[EasyOCR service] a lone crop ...")
+    reader = FakeReader()
+    service = EasyOCRService(max_batch=8, max_wait=0.01)
+    service._load_reader = lambda: reader
+    service.readtext(np.full((100, 300, 3), 200, dtype=np.uint8))
+    print(f"  reader calls: {reader.calls}")
+    assert reader.calls == [("readtext", [(100, 300, 3)])], "A crop alone in its bucket should be read as it is."
+
+def main():
+    test_mixed_sizes_share_one_call()
+    test_single_crop_is_not_padded()
+    print("\nSUCCESS: The EasyOCR service batches crops of different sizes!")
+
+if __name__ == "__main__":
+    main()
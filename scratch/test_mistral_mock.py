@@ -0,0 +1,208 @@
+import os
+import re
+import sys
+import json
+import time
+import tempfile
+import threading
+import multiprocessing
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fitz
+
+# Mock Mistral API: files upload, signed URL, OCR and delete.
+# Every OCR'd page returns "page <height>" so results can be matched to the page they came from.
+MOCK = {
+    "fail_next": 0,          # number of OCR calls to answer with fail_status
+    "fail_status": 429,
+    "retry_after": None,     # Retry-After header sent with the failures
+    "max_pages": None,       # OCR calls with more pages than this fail with a 500
+    "bad_heights": set(),    # chunks holding a page of one of these heights always fail with a 500
+    "empty_heights": set(),  # pages of these heights come back without text
+    "ocr_calls": [],         # (time, page count, status) of every OCR call
+}
+MOCK_FILES = {}
+MOCK_LOCK = threading.Lock()
+
+class MockMistralServer(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, obj, headers=None):
+        body = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/files"):
+            file_id = f"file{len(MOCK_FILES)}"
+            MOCK_FILES[file_id] = re.search(rb"%PDF.*%%EOF\s*", body, re.S).group(0)
+            return self._send(200, {"id": file_id})
+        if self.path.endswith("/ocr"):
+            file_id = json.loads(body)["document"]["document_url"].rsplit("/", 1)[-1]
+            doc = fitz.open(stream=MOCK_FILES[file_id], filetype="pdf")
+            heights = [round(page.rect.height) for page in doc]
+            with MOCK_LOCK:
+                status = 200
+                if MOCK["fail_next"] > 0:
+                    MOCK["fail_next"] -= 1
+                    status = MOCK["fail_status"]
+                elif (MOCK["max_pages"] and len(heights) > MOCK["max_pages"]) or MOCK["bad_heights"] & set(heights):
+                    status = 500
+                MOCK["ocr_calls"].append((time.time(), len(heights), status))
+            if status != 200:
+                headers = {"Retry-After": str(MOCK["retry_after"])} if MOCK["retry_after"] is not None else None
+                return self._send(status, {"error": "mock failure"}, headers)
+            pages = [
+                {"index": i, "markdown": "" if h in MOCK["empty_heights"] else f"page {h}"}
+                for i, h in enumerate(heights)
+            ]
+            return self._send(200, {"pages": pages})
+        self._send(404, {"error": "not found"})
+
+    def do_GET(self):
+        file_id = self.path.split("/")[-2]
+        self._send(200, {"url": f"https://mock/{file_id}"})
+
+    def do_DELETE(self):
+        self._send(200, {"deleted": True})
+
+def start_mock_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockMistralServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def reset_mock(**settings):
+    MOCK.update(fail_next=0, fail_status=429, retry_after=None, max_pages=None, bad_heights=set(), empty_heights=set(), ocr_calls=[])
+    MOCK.update(settings)
+
+def make_pdf(path, num_pages):
+    """One page per simulated crop; page i is 100 + i points high."""
+    doc = fitz.open()
+    for i in range(num_pages):
+        page = doc.new_page(width=400, height=100 + i)
+        page.insert_text((20, 50), f"crop {i}")
+    doc.save(path)
+    doc.close()
+    return path
+
+def test_retry_after(pdf_path, base_url):
+    import extractor
+    print("\n[Retry-After] two 429 responses asking for 0.5 s ...")
+    reset_mock(fail_next=2, fail_status=429, retry_after=0.5)
+    texts = extractor.run_mistral_ocr(pdf_path, "mock-key", chunk_size=8, base_url=base_url)
+    calls = MOCK["ocr_calls"]
+    gaps = [round(b[0] - a[0], 2) for a, b in zip(calls, calls[1:])]
+    print(f"  OCR calls: {[c[2] for c in calls]}, gaps between them: {gaps}")
+    assert [c[2] for c in calls] == [429, 429, 200], "Should retry the same chunk until it succeeds."
+    assert all(gap >= 0.45 for gap in gaps), "Retries should wait for the Retry-After delay."
+    assert texts == {i + 1: f"page {100 + i}" for i in range(8)}, "Every page should get its own text."
+
+def test_split_to_single_pages(pdf_path, base_url):
+    import extractor
+    print("\n[Split] server rejects every call with more than one page ...")
+    reset_mock(max_pages=1)
+    status = {}
+    texts = extractor.run_mistral_ocr(pdf_path, "mock-key", chunk_size=8, base_url=base_url, page_status=status)
+    sizes = [c[1] for c in MOCK["ocr_calls"]]
+    print(f"  OCR call sizes: {sizes}")
+    assert 8 in sizes and 4 in sizes and 2 in sizes, "Failing chunks should be split in halves."
+    assert sizes.count(1) == 8, "Every page should end up being sent on its own."
+    assert texts == {i + 1: f"page {100 + i}" for i in range(8)}, "Every page should get its own text."
+    assert set(status.values()) == {"ok"}, "Every page should be reported as ok."
+
+def test_page_statuses(pdf_path, base_url):
+    import extractor
+    print("\n[Statuses] page 3 always fails, page 6 comes back empty ...")
+    reset_mock(bad_heights={102}, empty_heights={105})
+    status = {}
+    texts = extractor.run_mistral_ocr(pdf_path, "mock-key", chunk_size=8, base_url=base_url, page_status=status)
+    print(f"  page statuses: {dict(sorted(status.items()))}")
+    assert status[3] == "failed", "The page that always fails should be reported as failed."
+    assert status[6] == "empty", "The page without text should be reported as empty."
+    assert all(status[p] == "ok" for p in range(1, 9) if p not in (3, 6)), "The other pages should be ok."
+    assert all(texts[p] == f"page {99 + p}" for p in range(1, 9) if p not in (3, 6)), "Texts should stay on their pages."
+
+def _acquire_in_process(state_path, pages, ready, go, result_queue):
+    import extractor
+    limiter = extractor.TokenBucketRateLimiter(6000, state_path=state_path)
+    ready.set()
+    go.wait()
+    start = time.time()
+    limiter.acquire(pages)
+    result_queue.put(time.time() - start)
+
+def test_token_bucket_shared_by_processes(state_path):
+    import extractor
+    print("\n[Token bucket] 6000 pages/min budget shared by two processes ...")
+    ctx = multiprocessing.get_context("spawn")
+    ready, go, result_queue = ctx.Event(), ctx.Event(), ctx.Queue()
+    proc = ctx.Process(target=_acquire_in_process, args=(state_path, 45, ready, go, result_queue))
+    proc.start()
+    ready.wait(timeout=60)
+    limiter = extractor.TokenBucketRateLimiter(6000, state_path=state_path)
+    start = time.time()
+    limiter.acquire(limiter.burst)
+    assert time.time() - start < 0.2, "A full bucket (600 pages) should be available at once."
+    # The shared bucket is now empty, so the other process has to wait for 45 pages at 90 pages per second
+    go.set()
+    waited = result_queue.get(timeout=30)
+    proc.join()
+    print(f"  second process waited {waited:.2f}s")
+    assert 0.35 <= waited <= 1.5, "The second process should wait for the shared bucket to refill."
+
+def test_token_bucket_rolling_window():
+    import random
+    import extractor
+    print("\n[Token bucket] pages sent in any 60 s window, on a simulated clock ...")
+    clock = [1000.0]
+    real_time, real_sleep = time.time, time.sleep
+    time.time = lambda: clock[0]
+    time.sleep = lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+    try:
+        limiter = extractor.TokenBucketRateLimiter(500)
+        rng = random.Random(7)
+        sent = []
+        for _ in range(400):
+            # Chunks of up to 250 pages, sometimes after an idle spell that refills the bucket
+            if rng.random() < 0.1:
+                clock[0] += rng.uniform(30, 120)
+            pages = rng.randint(1, 250)
+            limiter.acquire(pages)
+            sent.append((clock[0], pages))
+    finally:
+        time.time, time.sleep = real_time, real_sleep
+    busiest = max(sum(p for t, p in sent if start <= t < start + 60) for start, _ in sent)
+    print(f"  {sum(p for _, p in sent)} pages over {sent[-1][0] - sent[0][0]:.0f}s, busiest 60 s window: {busiest} pages")
+    assert busiest <= 500, "No 60 s window may hold more than the per-minute budget."
+
+def main():
+    import extractor
+    extractor.MISTRAL_BACKOFF_BASE = 0.05
+    extractor.MISTRAL_MAX_RETRIES = 2
+    extractor.configure_ocr_cache(None)
+    server = start_mock_server()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = make_pdf(os.path.join(tmp, "compiled_highlights.pdf"), 8)
+        test_retry_after(pdf_path, base_url)
+        test_split_to_single_pages(pdf_path, base_url)
+        test_page_statuses(pdf_path, base_url)
+        test_token_bucket_shared_by_processes(os.path.join(tmp, "rate.sqlite"))
+    test_token_bucket_rolling_window()
+    server.shutdown()
+    print("\nSUCCESS: Mistral OCR retries, chunk splitting, page statuses and the shared rate limit are working!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image
+
+# Mock olmOCR (OpenAI-compatible) server that records how many requests it serves at once
+MOCK = {"delay": 0.1, "in_flight": 0, "max_in_flight": 0, "requests": 0}
+MOCK_LOCK = threading.Lock()
+
+class MockOlmOCRServer(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with MOCK_LOCK:
+            MOCK["in_flight"] += 1
+            MOCK["requests"] += 1
+            MOCK["max_in_flight"] = max(MOCK["max_in_flight"], MOCK["in_flight"])
+        time.sleep(MOCK["delay"])
+        with MOCK_LOCK:
+            MOCK["in_flight"] -= 1
+        content = "---\nprimary_language: en\nis_rotation_valid: true\nrotation_correction: 0\nis_table: false\nis_diagram: false\n---\nmock text"
+        body = json.dumps({"choices": [{"message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_mock_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockOlmOCRServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def test_aimd_limits():
+    from extractor import AIMDConcurrencyController
+    print("\n[AIMD] limit under steady, slow and failing requests ...")
+    controller = AIMDConcurrencyController(2, max_limit=8, name="test")
+    for _ in range(60):
+        controller.record(0.1)
+    print(f"  after fast replies: {controller.stats()}")
+    assert controller.stats()["limit"] == 8, "Fast replies should grow the limit up to max_limit."
+    for _ in range(8):
+        controller.record(1.0)
+    print(f"  after slow replies: {controller.stats()}")
+    assert controller.stats()["limit"] == 4, "Replies far above the baseline latency should halve the limit once."
+    for _ in range(4):
+        controller.record(ok=False)
+    print(f"  after overload errors: {controller.stats()}")
+    assert controller.stats()["limit"] == 2, "Overload errors should halve the limit."
+    fixed = AIMDConcurrencyController(3, min_limit=3, max_limit=3)
+    for _ in range(10):
+        fixed.record(ok=False)
+    assert fixed.stats()["limit"] == 3, "A fixed limit should never change."
+
+def test_fixed_cap_shared_by_jobs(server_url, crops_dir):
+    import extractor
+    print("\n[Fixed cap] two concurrent crop jobs with max_in_flight=2 on one server ...")
+    MOCK.update(max_in_flight=0, requests=0)
+    jobs = []
+    for job in range(2):
+        image_paths = {}
+        for i in range(8):
+            path = Path(crops_dir) / f"job{job}_crop{i}.png"
+            Image.new("RGB", (400, 60 + 8 * job + i), "white").save(path)
+            image_paths[i] = str(path)
+        jobs.append(image_paths)
+    results = [None, None]
+    def run(job):
+        results[job] = extractor.run_olmocr_crops(jobs[job], task_id=f"job{job}", server=server_url, api_key="mock-key", model="mock-model", max_in_flight=2)
+    threads = [threading.Thread(target=run, args=(job,)) for job in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"  requests: {MOCK['requests']}, most in flight at once: {MOCK['max_in_flight']}")
+    assert all(len(r) == 8 and set(r.values()) == {"mock text"} for r in results), "Every crop should be recognised."
+    assert MOCK["max_in_flight"] == 2, "The cap should hold across both jobs, not per job."
+
+def main():
+    import extractor
+    extractor.configure_ocr_cache(None)
+    server = start_mock_server()
+    test_aimd_limits()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_fixed_cap_shared_by_jobs(f"http://127.0.0.1:{server.server_port}/v1", tmp)
+    server.shutdown()
+    print("\nSUCCESS: olmOCR concurrency control is working!")
+
+if __name__ == "__main__":
+    main()
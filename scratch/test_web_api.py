@@ -1,3 +1,4 @@
+import time
 import requests
 import json
 from pathlib import Path
@@ -20,14 +21,32 @@ data = {
     "ocr_engine": "easyocr"
 }
 
+def wait_for_result(job_id, timeout=600):
+    """Polls the job until it is done or failed, then fetches its result once (like static/main.js)."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = requests.get(f"http://127.0.0.1:5000/api/jobs/{job_id}", timeout=30)
+        if job.status_code == 404 or job.json()["status"] in ("done", "failed"):
+            return requests.get(f"http://127.0.0.1:5000/api/jobs/{job_id}/result", timeout=30).json()
+        progress = job.json()["progress"]
+        print(f"  {job.json()['status']}: {progress.get('current')} / {progress.get('total')} ({progress.get('phase', 'queued')})")
+        time.sleep(0.7)
+    raise TimeoutError(f"Job {job_id} did not finish within {timeout}s")
+
 try:
     r = requests.post(url, files=files, data=data, timeout=30)
     print(f"Status Code: {r.status_code}")
-    res = r.json()
+    if r.status_code != 202:
+        print("API Error:", r.json().get("error"))
+        exit(1)
+    job_id = r.json()["job_id"]
+    print(f"Queued as job {job_id}, waiting for the result...")
+    res = wait_for_result(job_id)
     if res.get("success"):
         print(f"Success! Extracted {len(res['highlights'])} highlights.")
-        print("\nFirst Highlight Output Preview:")
-        print(json.dumps(res['highlights'][0], ensure_ascii=False, indent=2))
+        if res["highlights"]:
+            print("\nFirst Highlight Output Preview:")
+            print(json.dumps(res['highlights'][0], ensure_ascii=False, indent=2))
     else:
         print("API Error:", res.get("error"))
 except Exception as e:
@@ -184,85 +184,98 @@ document.addEventListener("DOMContentLoaded", () => {
 
         loaderText.textContent = "جاري تحميل وقراءة مستند PDF...";
 
-        // Poll progress API every 700ms
-        let pollInterval = setInterval(async () => {
-            try {
-                const progressRes = await fetch(`/api/progress?task_id=${taskId}`);
-                if (progressRes.ok) {
-                    const progressData = await progressRes.json();
-                    const phase = progressData.phase || "parsing";
-                    
-                    if (phase === "ocr") {
-                        let engineLabel = "EasyOCR";
-                        if (ocrEngine.value === "olmocr") {
-                            engineLabel = "olmOCR";
-                        } else if (ocrEngine.value === "mistralocr") {
-                            engineLabel = "Mistral OCR";
-                        }
-                        if (progressData.percent !== undefined) {
-                            const pct = progressData.percent;
-                            loaderProgressBar.style.width = `${pct}%`;
-                            loaderProgressText.textContent = `جاري تشغيل التعرف الضوئي (تظليلات - ${engineLabel}): الصفحة ${progressData.current} من ${progressData.total} (${pct}%)`;
-                        } else if (progressData.total > 0) {
-                            const pct = Math.round((progressData.current / progressData.total) * 100);
-                            loaderProgressText.textContent = `جاري تشغيل التعرف الضوئي (تظليلات - ${engineLabel}): الصفحة ${progressData.current} من ${progressData.total}`;
-                            loaderProgressBar.style.width = `${pct}%`;
-                        } else {
-                            loaderProgressText.textContent = `جاري تشغيل محرك التعرف الضوئي (تظليلات - ${engineLabel})...`;
-                            loaderProgressBar.style.width = `50%`;
-                        }
-                        loaderText.textContent = ocrEngine.value === "olmocr" 
-                            ? "جاري التعرف على النصوص باستخدام Vision-Language Model..." 
-                            : (ocrEngine.value === "mistralocr" 
-                               ? "جاري التعرف على النصوص باستخدام Mistral AI OCR..." 
-                               : "جاري التعرف على النصوص محلياً وبسرعة...");
-                    } else if (phase === "full_ocr") {
-                        let engineLabel = "EasyOCR";
-                        if (ocrEngine.value === "olmocr") {
-                            engineLabel = "olmOCR";
-                        } else if (ocrEngine.value === "mistralocr") {
-                            engineLabel = "Mistral OCR";
-                        } else if (ocrEngine.value === "native") {
-                            engineLabel = "مستخرج رقمي";
-                        }
-                        if (progressData.percent !== undefined) {
-                            const pct = progressData.percent;
-                            loaderProgressBar.style.width = `${pct}%`;
-                            loaderProgressText.textContent = `جاري استخراج النص الكامل للكتاب (${engineLabel}): الصفحة ${progressData.current} من ${progressData.total} (${pct}%)`;
-                        } else if (progressData.total > 0) {
-                            const pct = Math.round((progressData.current / progressData.total) * 100);
-                            loaderProgressText.textContent = `جاري استخراج النص الكامل للكتاب (${engineLabel}): الصفحة ${progressData.current} من ${progressData.total}`;
-                            loaderProgressBar.style.width = `${pct}%`;
-                        } else {
-                            loaderProgressText.textContent = `جاري استخراج النص الكامل للكتاب (${engineLabel})...`;
-                            loaderProgressBar.style.width = `50%`;
-                        }
-                        loaderText.textContent = "جاري التعرف وتحويل صفحات الكتاب بالكامل إلى ملف نصي...";
-                    } else {
-                        if (progressData.percent !== undefined) {
-                            const pct = progressData.percent;
-                            loaderProgressBar.style.width = `${pct}%`;
-                            loaderProgressText.textContent = `جاري قراءة صفحات الكتاب: ${progressData.current} من ${progressData.total} (${pct}%)`;
-                        } else if (progressData.total > 0) {
-                            const pct = Math.round((progressData.current / progressData.total) * 100);
-                            loaderProgressText.textContent = `جاري معالجة الصفحة ${progressData.current} من ${progressData.total}`;
-                            loaderProgressBar.style.width = `${pct}%`;
-                        }
-                        loaderText.textContent = "جاري تحميل وقراءة مستند PDF...";
-                    }
+        // Render a progress snapshot (from the SSE stream or the polling fallback)
+        const renderProgress = (progressData) => {
+            // With pipelined OCR, parsing and OCR overlap: show the OCR progress with the parsing progress alongside
+            const phases = progressData.phases || {};
+            const parsingReport = phases.parsing;
+            const pipelined = Boolean(phases.ocr && parsingReport && parsingReport.total > 0 && parsingReport.current < parsingReport.total);
+            if (pipelined && progressData.phase !== "ocr") {
+                progressData = { ...phases.ocr, phase: "ocr", phases };
+            }
+            const phase = progressData.phase || "parsing";
+        
+            if (phase === "ocr") {
+                let engineLabel = "EasyOCR";
+                if (ocrEngine.value === "olmocr") {
+                    engineLabel = "olmOCR";
+                } else if (ocrEngine.value === "mistralocr") {
+                    engineLabel = "Mistral OCR";
                 }
-            } catch (err) {
-                console.error("Error polling progress:", err);
+                if (progressData.percent !== undefined) {
+                    const pct = progressData.percent;
+                    loaderProgressBar.style.width = `${pct}%`;
+                    loaderProgressText.textContent = `جاري تشغيل التعرف الضوئي (تظليلات - ${engineLabel}): الصفحة ${progressData.current} من ${progressData.total} (${pct}%)`;
+                } else if (progressData.total > 0) {
+                    const pct = Math.round((progressData.current / progressData.total) * 100);
+                    loaderProgressText.textContent = `جاري تشغيل التعرف الضوئي (تظليلات - ${engineLabel}): الصفحة ${progressData.current} من ${progressData.total}`;
+                    loaderProgressBar.style.width = `${pct}%`;
+                } else {
+                    loaderProgressText.textContent = `جاري تشغيل محرك التعرف الضوئي (تظليلات - ${engineLabel})...`;
+                    loaderProgressBar.style.width = `50%`;
+                }
+                loaderText.textContent = ocrEngine.value === "olmocr" 
+                    ? "جاري التعرف على النصوص باستخدام Vision-Language Model..." 
+                    : (ocrEngine.value === "mistralocr" 
+                       ? "جاري التعرف على النصوص باستخدام Mistral AI OCR..." 
+                       : "جاري التعرف على النصوص محلياً وبسرعة...");
+            } else if (phase === "full_ocr") {
+                let engineLabel = "EasyOCR";
+                if (ocrEngine.value === "olmocr") {
+                    engineLabel = "olmOCR";
+                } else if (ocrEngine.value === "mistralocr") {
+                    engineLabel = "Mistral OCR";
+                } else if (ocrEngine.value === "native") {
+                    engineLabel = "مستخرج رقمي";
+                }
+                if (progressData.percent !== undefined) {
+                    const pct = progressData.percent;
+                    loaderProgressBar.style.width = `${pct}%`;
+                    loaderProgressText.textContent = `جاري استخراج النص الكامل للكتاب (${engineLabel}): الصفحة ${progressData.current} من ${progressData.total} (${pct}%)`;
+                } else if (progressData.total > 0) {
+                    const pct = Math.round((progressData.current / progressData.total) * 100);
+                    loaderProgressText.textContent = `جاري استخراج النص الكامل للكتاب (${engineLabel}): الصفحة ${progressData.current} من ${progressData.total}`;
+                    loaderProgressBar.style.width = `${pct}%`;
+                } else {
+                    loaderProgressText.textContent = `جاري استخراج النص الكامل للكتاب (${engineLabel})...`;
+                    loaderProgressBar.style.width = `50%`;
+                }
+                loaderText.textContent = "جاري التعرف وتحويل صفحات الكتاب بالكامل إلى ملف نصي...";
+            } else {
+                if (progressData.percent !== undefined) {
+                    const pct = progressData.percent;
+                    loaderProgressBar.style.width = `${pct}%`;
+                    loaderProgressText.textContent = `جاري قراءة صفحات الكتاب: ${progressData.current} من ${progressData.total} (${pct}%)`;
+                } else if (progressData.total > 0) {
+                    const pct = Math.round((progressData.current / progressData.total) * 100);
+                    loaderProgressText.textContent = `جاري معالجة الصفحة ${progressData.current} من ${progressData.total}`;
+                    loaderProgressBar.style.width = `${pct}%`;
+                }
+                loaderText.textContent = "جاري تحميل وقراءة مستند PDF...";
+            }
+            if (progressData.eta_seconds !== undefined && progressData.eta_seconds !== null) {
+                loaderProgressText.textContent += ` - ${formatEta(progressData.eta_seconds)}`;
             }
-        }, 700);
+            if (pipelined) {
+                loaderProgressText.textContent += ` | قراءة الصفحات: ${parsingReport.current} من ${parsingReport.total}`;
+            }
+        };
 
         try {
-            const res = await fetch("/api/extract", {
+            const submitRes = await fetch("/api/extract", {
                 method: "POST",
                 body: formData
             });
             
-            clearInterval(pollInterval);
+            if (!submitRes.ok) {
+                const errData = await submitRes.json();
+                throw new Error(errData.error || "فشلت عملية استخراج الاقتباسات");
+            }
+            
+            // The extraction runs as a background job; follow its progress and fetch the result once it ends
+            const { job_id: jobId } = await submitRes.json();
+            const res = await waitForJobResult(jobId, renderProgress);
+            
             loaderProgressContainer.style.display = "none";
             
             if (!res.ok) {
@@ -279,7 +292,6 @@ document.addEventListener("DOMContentLoaded", () => {
             showToast(`تمت المعالجة بنجاح! تم استخراج ${currentHighlights.length} اقتباسات.`);
             
         } catch (error) {
-            clearInterval(pollInterval);
             loaderProgressContainer.style.display = "none";
             showToast(error.message || "حدث خطأ غير متوقع أثناء المعالجة", "error");
             loader.style.display = "none";
@@ -289,6 +301,69 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     });
 
+    // --- Format an ETA in seconds for the progress text ---
+    function formatEta(seconds) {
+        const total = Math.round(seconds);
+        const minutes = Math.floor(total / 60);
+        const secs = total % 60;
+        return minutes > 0
+            ? `المتبقي تقريباً ${minutes} د ${secs} ث`
+            : `المتبقي تقريباً ${secs} ث`;
+    }
+
+    // --- Follow a background extraction job and fetch its result once it has ended ---
+    // Progress is pushed over Server-Sent Events; the job status is polled only when they are unavailable.
+    function waitForJobResult(jobId, onProgress) {
+        return new Promise((resolve, reject) => {
+            let progressSource = null;
+            let pollInterval = null;
+            let finished = false;
+            const stopProgress = () => {
+                if (progressSource) progressSource.close();
+                clearInterval(pollInterval);
+            };
+            const finish = () => {
+                if (finished) return;
+                finished = true;
+                stopProgress();
+                fetch(`/api/jobs/${jobId}/result`).then(resolve, reject);
+            };
+
+            // Poll the job every 700ms (fallback when Server-Sent Events are unavailable)
+            const startPolling = () => {
+                if (pollInterval || finished) return;
+                pollInterval = setInterval(async () => {
+                    try {
+                        const jobRes = await fetch(`/api/jobs/${jobId}`);
+                        if (jobRes.status === 404) {
+                            finish();
+                            return;
+                        }
+                        const job = await jobRes.json();
+                        onProgress(job.progress);
+                        if (job.status === "done" || job.status === "failed") {
+                            finish();
+                        }
+                    } catch (err) {
+                        console.error("Error polling progress:", err);
+                    }
+                }, 700);
+            };
+
+            if (window.EventSource) {
+                progressSource = new EventSource(`/api/progress/stream?task_id=${jobId}`);
+                progressSource.onmessage = (event) => onProgress(JSON.parse(event.data));
+                progressSource.addEventListener("end", finish);
+                progressSource.onerror = () => {
+                    progressSource.close();
+                    startPolling();
+                };
+            } else {
+                startPolling();
+            }
+        });
+    }
+
     // --- Render Results to UI ---
     function renderResults(highlights) {
         loader.style.display = "none";